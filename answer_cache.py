@@ -0,0 +1,167 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SEMANTIC, \
+    ANSWER_CACHE_SIMILARITY_THRESHOLD
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """
+    Normalize a question for exact-match caching: case, surrounding/repeated whitespace and trailing punctuation.
+
+    @param question: The raw user question.
+    @return: The normalized question.
+    """
+    return _WHITESPACE.sub(" ", question).strip().rstrip("?!. ").lower()
+
+
+class AnswerCache:
+    """
+    In-process cache of final answers, in front of the orchestrator.
+
+    - Exact tier: keyed on (normalized question, model, embedding model, graph version, ingestion mode).
+    - Semantic tier (optional): a near-duplicate question with the same models, graph version and
+      ingestion mode whose embedding has cosine similarity >= threshold, and that mentions exactly the same
+      entities (embeddings of "powers of Storm" and "powers of Cyclops" are near-identical).
+
+    Entries are evicted in LRU order beyond `max_entries` and expire after `ttl_seconds`.
+    The whole cache is dropped as soon as a different graph version is seen.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 semantic=ANSWER_CACHE_SEMANTIC, similarity_threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD):
+        """
+        @param max_entries: Maximum number of cached answers.
+        @param ttl_seconds: Seconds an answer stays valid (0 or None disables expiry).
+        @param semantic: Whether the semantic tier is enabled.
+        @param similarity_threshold: Minimum cosine similarity for a semantic hit.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._graph_version = None
+        self._lock = threading.Lock()
+
+    def _check_graph_version(self, graph_version):
+        # Caller holds the lock
+        if graph_version != self._graph_version:
+            self._entries.clear()
+            self._graph_version = graph_version
+
+    def _expired(self, entry, now):
+        return bool(self.ttl_seconds) and now - entry["created_at"] > self.ttl_seconds
+
+    def get(self, question, model, embedding_model, graph_version, ingestion_mode):
+        """
+        Exact-tier lookup.
+
+        @param question: The raw user question.
+        @param model: The LLM model name.
+        @param embedding_model: The embedding model name of the runtime that would answer.
+        @param graph_version: The current graph version.
+        @param ingestion_mode: The ingestion mode of the runtime that would answer.
+        @return: The cached answer, or None.
+        """
+        key = (normalize_question(question), model, embedding_model, graph_version, ingestion_mode)
+        now = time.time()
+        with self._lock:
+            self._check_graph_version(graph_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["answer"]
+
+    def get_similar(self, embedding, entities, model, embedding_model, graph_version, ingestion_mode):
+        """
+        Semantic-tier lookup: the most similar cached question above the similarity threshold that mentions
+        the same entities.
+
+        @param embedding: The query embedding of the new question.
+        @param entities: The entities the new question mentions (see `MarvelGraphOrchestrator.mentioned_entities`).
+        @param model: The LLM model name.
+        @param embedding_model: The embedding model name (the one that produced `embedding`).
+        @param graph_version: The current graph version.
+        @param ingestion_mode: The ingestion mode of the runtime that would answer.
+        @return: The cached answer, or None.
+        """
+        if not self.semantic or embedding is None or entities is None:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if not query_norm:
+            return None
+        now = time.time()
+        with self._lock:
+            self._check_graph_version(graph_version)
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if key[1:] == (model, embedding_model, graph_version, ingestion_mode)
+                and entry["entities"] == frozenset(entities)
+                and entry["embedding"] is not None
+                and len(entry["embedding"]) == len(query)
+                and not self._expired(entry, now)
+            ]
+            if not candidates:
+                return None
+            matrix = np.stack([entry["embedding"] for _, entry in candidates])
+            scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * query_norm + 1e-12)
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            return entry["answer"]
+
+    def put(self, question, model, embedding_model, graph_version, ingestion_mode, answer, embedding=None,
+            entities=None):
+        """
+        Store an answer.
+
+        @param question: The raw user question.
+        @param model: The LLM model name.
+        @param embedding_model: The embedding model name of the runtime that answered.
+        @param graph_version: The graph version the answer was generated from.
+        @param ingestion_mode: The ingestion mode of the runtime that answered.
+        @param answer: The final response text.
+        @param embedding: Optional query embedding, used by the semantic tier.
+        @param entities: The entities the question mentions; required (with `embedding`) for semantic hits.
+        @return: None
+        """
+        key = (normalize_question(question), model, embedding_model, graph_version, ingestion_mode)
+        vector = np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+        with self._lock:
+            self._check_graph_version(graph_version)
+            self._entries[key] = {"answer": answer, "embedding": vector, "created_at": time.time(),
+                                  "entities": frozenset(entities) if entities is not None else None}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop every cached answer.
+
+        @return: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._graph_version = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+answer_cache = AnswerCache()
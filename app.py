@@ -1,174 +1,421 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, g, Response, stream_with_context
+import asyncio
+import base64
+import hashlib
+import itertools
 import os
 import json
-import io
-import matplotlib.pyplot as plt
+import queue
+import sys
+from answer_cache import answer_cache
+from async_runtime import async_runtime, run_async
+from batch_questions import BatchRunner, iter_batch_results, parse_batch_items
 from cache_utils import clear_cache
-from config import OPENAI_API_KEY, CHOSEN_MODEL, CHOSEN_MODEL_EMBEDDINGS
+from config import OPENAI_API_KEY, CHOSEN_MODEL, CHOSEN_MODEL_EMBEDDINGS, INGESTION_MODE, INGESTION_MODES, \
+    REQUEST_TIMEOUT_SECONDS, GRAPH_PAGE_SIZE, GRAPH_MAX_PAGE_SIZE, GRAPH_MAX_HOPS, BATCH_CONCURRENCY, \
+    BATCH_MAX_CONCURRENCY, WARMUP_ON_START, VIZ_MAX_NODES
 from character_bios import CHARACTER_BIOS
-from cost_utils import calc_cost
-from graph_utils import build_and_save_mock_marvel_graph, extract_humanized_triplets_from_graph, \
-    filter_documents_by_rules
-from marvel_graph_orchestrator import MarvelGraphOrchestrator
-from llama_index.core.callbacks import TokenCountingHandler
-from llama_index.core.indices.property_graph import PropertyGraphIndex, SchemaLLMPathExtractor
-from llama_index.core.callbacks import CallbackManager
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.llms.openai import OpenAI
-from llama_index.core.schema import Document
-import asyncio
-from flask import send_from_directory
-import networkx as nx
+from cost_utils import calc_cost, token_usage_scope
+from extraction_cache import get_extraction_cache
+from graph_import import normalize_entity, normalize_relation
+from graph_utils import GRAPH_PATH, snapshot_path, load_graph_snapshot
+from graph_viz import graph_visualizer
+from index_store import has_index_snapshot
+from metrics import registry as metrics_registry, span, record_token_usage, record_build_status, \
+    record_cache_lookups, debug_print, REQUEST_DURATION, ANSWERS
+from pipeline_runtime import runtime_registry
+from question_pipeline import aanswer_with_runtime
+from static_assets import static_assets, compress_response, etag_matches, not_modified
 import time
 
 app = Flask(__name__)
 
-@app.route('/question', methods=['POST'])
-def question():
-    data = request.get_json()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_duration(response):
+    start = g.get("request_start")
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_DURATION.observe(time.perf_counter() - start, endpoint, str(response.status_code))
+    return response
+
+
+@app.after_request
+def compress(response):
+    # Registered last so it runs first: the request duration includes compression
+    return compress_response(response)
+
+
+def parse_question_request(data):
+    """
+    Validate a /question payload and fill in defaults.
+
+    @param data: The JSON request body.
+    @return: A tuple (params, error): params is a dictionary with question, api_key, model, embedding_model,
+             ingestion_mode and use_answer_cache; error is a (JSON payload, status) tuple or None.
+    """
+    data = data or {}
+    params, error = parse_client_params(data)
+    if error:
+        return None, error
     user_question = data.get('question', '')
+    if not user_question:
+        return None, ({'error': 'Missing question'}, 400)
+    return dict(params, question=user_question), None
+
+
+def parse_client_params(data):
+    """
+    Validate the API key, models and ingestion mode shared by /question and /questions, and fill in defaults.
+
+    @param data: The JSON request body.
+    @return: A tuple (params, error): params is a dictionary with api_key, model, embedding_model,
+             ingestion_mode and use_answer_cache; error is a (JSON payload, status) tuple or None.
+    """
     # --- API key fallback logic ---
     # 1. Use key from frontend if provided; 2. else use env variable; 3. else error
     api_key = data.get('api_key') or OPENAI_API_KEY
     if not api_key:
-        return jsonify({'error': 'Missing OpenAI API key. Please provide via UI or set OPENAI_API_KEY as an environment variable.'}), 400
-    if not user_question:
-        return jsonify({'error': 'Missing question'}), 400
-
-    # --- Cache status flags ---
-    graph_path = os.path.join('graphs', 'marvel_graph.gml')
-    triplets_path = os.path.join('cache', 'triplets.json')
-    index_path = os.path.join('cache', 'index.json')
-    graph_cached = os.path.exists(graph_path)
-    triplets_cached = os.path.exists(triplets_path)
-    index_cached = os.path.exists(index_path)
-
-    # Step 1: Build/load graph
-    t0 = time.time()
-    if graph_cached:
-        graph = nx.read_gml(graph_path)
-        graph_status = 'cached'
-    else:
-        graph = build_and_save_mock_marvel_graph()
-        graph_status = 'rebuilt'
-    print(f"⏱️ Graph load/build took {time.time() - t0:.2f} seconds")
-
-    # Step 2: Build/load triplets
-    t1 = time.time()
-    if triplets_cached:
-        with open(triplets_path, 'r', encoding='utf-8') as f:
-            triplet_texts = json.load(f)
-        triplets_status = 'cached'
-    else:
-        triplet_texts = extract_humanized_triplets_from_graph(graph)
-        os.makedirs('cache', exist_ok=True)
-        with open(triplets_path, 'w', encoding='utf-8') as f:
-            json.dump(triplet_texts, f)
-        triplets_status = 'rebuilt'
-    print(f"⏱️ Triplet extraction/load took {time.time() - t1:.2f} seconds")
-
-    # Step 3: Document filtering
-    t2 = time.time()
-    documents = [Document(text=t) for t in triplet_texts]
-    filtered_docs = filter_documents_by_rules(
-        documents,
-        include_keywords=None,
-        exclude_keywords=None,
-        max_documents=100
-    )
-    print(f"⏱️ Document filtering took {time.time() - t2:.2f} seconds")
-
-    # Step 4: Setup LLM, embedding, and callback manager
-    handler = TokenCountingHandler()
-    callback_manager = CallbackManager([handler])
-    model = data.get("llm_model", CHOSEN_MODEL)
-    embedding_model = data.get("'text-embedding-ada-002'", CHOSEN_MODEL_EMBEDDINGS)
-    llm = OpenAI(model=model, api_key=api_key, temperature=0.0, callback_manager=callback_manager)
-    embed_model = OpenAIEmbedding(model_name=embedding_model, api_key=api_key, callback_manager=callback_manager)
-
-    # Step 5: LLM path extraction
-    t3 = time.time()
-    extracted_nodes = asyncio.run(
-        SchemaLLMPathExtractor(llm=llm, strict=False).acall(filtered_docs, show_progress=False)
-    )
-    print(f"⏱️ LLM path extraction took {time.time() - t3:.2f} seconds")
-
-    # Step 6: Build/load index
-    t4 = time.time()
-    if index_cached:
-        with open(index_path, 'r', encoding='utf-8') as f:
-            # For demonstration, we just note the cache; actual index loading would require more logic
-            pass
-        index_status = 'cached'
-    else:
-        # Save a dummy file to indicate index was built (real index caching would be more complex)
-        os.makedirs('cache', exist_ok=True)
-        with open(index_path, 'w', encoding='utf-8') as f:
-            f.write('built')
-        index_status = 'rebuilt'
-    index = PropertyGraphIndex(
-        nodes=extracted_nodes,
-        embed_model=embed_model,
-        llm=llm,
-        show_progress=False,
-    )
-    query_engine = index.as_query_engine(
-        include_text=True,
-        similarity_top_k=3
-    )
-    print(f"⏱️ Index construction/load took {time.time() - t4:.2f} seconds")
+        return None, ({'error': 'Missing OpenAI API key. Please provide via UI or set OPENAI_API_KEY as an environment variable.'}, 400)
 
-    # Step 7: Run orchestrator and generate response
-    t5 = time.time()
-    orchestrator = MarvelGraphOrchestrator(query_engine)
-    modified_question = orchestrator.build_modified_prompt(user_question, CHARACTER_BIOS)
-    final_state = orchestrator.app.invoke({"query": modified_question})
-    response = final_state["final_response"]
-    print(f"⏱️ Final response generation took {time.time() - t5:.2f} seconds")
+    ingestion_mode = data.get("ingestion_mode", INGESTION_MODE)
+    if ingestion_mode not in INGESTION_MODES:
+        return None, ({'error': f"Unknown ingestion_mode '{ingestion_mode}'. Use one of: {', '.join(INGESTION_MODES)}."}, 400)
+
+    return {
+        "api_key": api_key,
+        "model": data.get("llm_model", CHOSEN_MODEL),
+        "embedding_model": data.get("embedding_model", CHOSEN_MODEL_EMBEDDINGS),
+        "ingestion_mode": ingestion_mode,
+        "use_answer_cache": data.get("use_answer_cache", True),
+    }, None
+
+
+def answer_cache_build_status(graph_status, ingestion_mode):
+    """
+    Build status for a request answered from the exact answer cache (no runtime involved).
+
+    @param graph_status: 'cached' or 'rebuilt', from `RuntimeRegistry.current_graph`.
+    @param ingestion_mode: The requested ingestion mode.
+    @return: A build_status dictionary.
+    """
+    return {
+        "graph": graph_status,
+        "triplets": "cached" if ingestion_mode == "llm" else "skipped",
+        "index": "cached",
+        "extraction": {"hits": 0, "misses": 0},
+        "ingestion": ingestion_mode,
+        "runtime": "skipped",
+    }
 
+
+def finish_question(params, usage, response, build_status, answer_source, answered_by=None):
+    """
+    Compute the cost of a finished question, record its metrics and build the response payload.
+
+    @param params: The parsed request (see `parse_question_request`).
+    @param usage: The TokenUsage collected for the request.
+    @param response: The final answer text.
+    @param build_status: The build_status dictionary for the request.
+    @param answer_source: "exact", "semantic", "miss" or "bypass".
+    @param answered_by: "graph" (fast path) or "llm" for freshly generated answers, None for cached ones.
+    @return: The JSON-serializable response payload.
+    """
     # Step 8: Calculate cost
-    prompt_tokens = handler.prompt_llm_token_count
-    completion_tokens = handler.completion_llm_token_count
-    embed_tokens = handler.total_embedding_token_count
+    model, embedding_model = params["model"], params["embedding_model"]
     cost_usd = calc_cost(
         model=model,
-        prompt=prompt_tokens,
-        completion=completion_tokens,
-        embed=embed_tokens,
-        embed_model=CHOSEN_MODEL_EMBEDDINGS
+        prompt=usage.prompt_llm_token_count,
+        completion=usage.completion_llm_token_count,
+        embed=usage.total_embedding_token_count,
+        embed_model=embedding_model
     )
+    embedding_cache = usage.embedding_cache_summary()
+    record_token_usage(usage, model, embedding_model, cost_usd)
+    record_build_status(build_status)
+    record_cache_lookups("embedding", embedding_cache["hits"], embedding_cache["misses"])
+    ANSWERS.inc(1, answered_by or "cache")
+    if answer_source != "bypass":
+        record_cache_lookups("answer", hits=int(answer_source != "miss"), misses=int(answer_source == "miss"))
 
-    build_status = {
-        "graph": graph_status,
-        "triplets": triplets_status,
-        "index": index_status
-    }
-
-    return jsonify({
+    return {
         "response": response,
         "cost_usd": cost_usd,
+        "embedding_cache": embedding_cache,
+        "answer_cache": answer_source,
+        "answered_by": answered_by,
         "build_status": build_status,
         "model_used": model
-    })
+    }
+
+
+@app.route('/question', methods=['POST'])
+def question():
+    params, error = parse_question_request(request.get_json())
+    if error:
+        return error
+    # This thread waits for the whole answer; async_server.py serves the same coroutine without holding a thread
+    payload, status = run_async(aanswer_question(params), timeout=None, limit=False)
+    return jsonify(payload), status
+
+
+async def aanswer_question(params):
+    """
+    Answer one question on the shared event loop (the /question logic, shared by app.py and async_server.py).
+
+    The exact answer cache tier is checked first; with a runtime (loaded in a worker thread), the rest of the
+    answer step is `question_pipeline.aanswer_with_runtime`, which batches share.
+
+    @param params: The parsed request (see `parse_question_request`).
+    @return: A tuple (payload, status): the JSON-serializable response and the HTTP status.
+    """
+    user_question, model, ingestion_mode = params["question"], params["model"], params["ingestion_mode"]
+    embedding_model, use_answer_cache = params["embedding_model"], params["use_answer_cache"]
+
+    with token_usage_scope() as usage:
+        # Step 0: Answer cache (exact tier needs only the graph version, not a runtime)
+        _, graph_version, graph_status = await asyncio.to_thread(runtime_registry.current_graph)
+        response, answer_source, answered_by = None, "bypass", None
+        if use_answer_cache:
+            response = answer_cache.get(user_question, model, embedding_model, graph_version, ingestion_mode)
+            answer_source = "exact" if response is not None else "miss"
+
+        if response is not None:
+            build_status = answer_cache_build_status(graph_status, ingestion_mode)
+        else:
+            # Steps 1-6: Get the warm runtime (graph, triplets, clients, index, orchestrator)
+            with span("runtime_lookup"):
+                runtime, build_status = await asyncio.to_thread(
+                    runtime_registry.get, params["api_key"], model, embedding_model, ingestion_mode)
+
+            # Step 7: Semantic answer cache, graph fast path, or the orchestrator
+            try:
+                response, answer_source, answered_by = await aanswer_with_runtime(
+                    runtime, user_question, use_answer_cache, answer_source)
+            except TimeoutError as e:
+                return {'error': str(e)}, 504
+
+    return finish_question(params, usage, response, build_status, answer_source, answered_by), 200
+
+
+def sse_event(event, payload):
+    """
+    Format one server-sent event.
+
+    @param event: The event name (progress, token, done or error).
+    @param payload: JSON-serializable event data.
+    @return: The encoded event string.
+    """
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def stream_question_events(params):
+    """
+    Generate the server-sent events for one streamed question.
+
+    Emits progress events per stage (graph, runtime/triplets/index, retrieval), then one token event per
+    LLM delta, then a final "done" event with the same payload as /question.
+
+    Any failure (runtime build, embedding, orchestrator) ends the stream with an "error" event.
+
+    @param params: The parsed request (see `parse_question_request`).
+    @return: A generator of SSE strings.
+    """
+    try:
+        yield from _question_events(params)
+    except Exception as e:
+        yield sse_event("error", {"error": str(e)})
+
+
+def _question_events(params):
+    user_question, model, ingestion_mode = params["question"], params["model"], params["ingestion_mode"]
+    embedding_model, use_answer_cache = params["embedding_model"], params["use_answer_cache"]
+
+    with token_usage_scope() as usage:
+        _, graph_version, graph_status = runtime_registry.current_graph()
+        yield sse_event("progress", {"stage": "graph", "status": graph_status})
+
+        response, answer_source = None, "bypass"
+        if use_answer_cache:
+            response = answer_cache.get(user_question, model, embedding_model, graph_version, ingestion_mode)
+            answer_source = "exact" if response is not None else "miss"
+        if response is not None:
+            yield sse_event("token", {"delta": response})
+            build_status = answer_cache_build_status(graph_status, ingestion_mode)
+            yield sse_event("done", finish_question(params, usage, response, build_status, answer_source))
+            return
+
+        yield sse_event("progress", {"stage": "runtime", "status": "loading"})
+        with span("runtime_lookup"):
+            runtime, build_status = runtime_registry.get(params["api_key"], model, params["embedding_model"],
+                                                         ingestion_mode)
+        yield sse_event("progress", {"stage": "triplets", "status": build_status["triplets"]})
+        yield sse_event("progress", {"stage": "index", "status": build_status["index"],
+                                     "extraction": build_status["extraction"]})
+
+        question_embedding = entities = None
+        if use_answer_cache and answer_cache.semantic:
+            question_embedding = runtime.embed_model.get_query_embedding(user_question)
+            entities = runtime.orchestrator.mentioned_entities(user_question)
+            response = answer_cache.get_similar(question_embedding, entities, model, embedding_model,
+                                                graph_version, ingestion_mode)
+            if response is not None:
+                answer_source = "semantic"
+                yield sse_event("token", {"delta": response})
+                yield sse_event("done", finish_question(params, usage, response, build_status, answer_source))
+                return
+
+        orchestrator = runtime.orchestrator
+        final_state = orchestrator.answer_from_graph(user_question)
+        if final_state is not None:
+            response = final_state["final_response"]
+            yield sse_event("progress", {"stage": "graph_lookup", "status": "answered"})
+            yield sse_event("token", {"delta": response})
+            if use_answer_cache:
+                answer_cache.put(user_question, model, embedding_model, runtime.graph_version, ingestion_mode,
+                                 response, embedding=question_embedding, entities=entities)
+            yield sse_event("done", finish_question(params, usage, response, build_status, answer_source, "graph"))
+            return
+
+        # Relay the orchestrator's async events from the shared loop to this (WSGI) thread
+        modified_question = orchestrator.build_modified_prompt(user_question, CHARACTER_BIOS)
+        events = queue.Queue()
+
+        async def produce():
+            try:
+                async for item in orchestrator.astream(modified_question, user_question):
+                    events.put(item)
+            finally:
+                events.put(None)
+
+        future, cancel = async_runtime.submit(produce())
+        deadline = time.monotonic() + REQUEST_TIMEOUT_SECONDS
+        final_state = None
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    cancel()
+                    yield sse_event("error", {"error": f"Request did not finish within {REQUEST_TIMEOUT_SECONDS} seconds."})
+                    return
+                if item is None:
+                    break
+                event, payload = item
+                if event == "token":
+                    yield sse_event("token", {"delta": payload})
+                elif event == "final":
+                    final_state = payload
+                else:
+                    yield sse_event(event, payload)
+            future.result()  # re-raise errors from the stream
+        except BaseException:
+            cancel()  # client went away, or the relay failed
+            raise
+
+        response = final_state["final_response"]
+        if use_answer_cache:
+            answer_cache.put(user_question, model, embedding_model, runtime.graph_version, ingestion_mode,
+                             response, embedding=question_embedding, entities=entities)
+    yield sse_event("done", finish_question(params, usage, response, build_status, answer_source,
+                                            final_state.get("answered_by")))
+
+
+@app.route('/question/stream', methods=['POST'])
+def question_stream():
+    """
+    Streaming variant of /question, as server-sent events (progress, token, done, error).
+    """
+    params, error = parse_question_request(request.get_json())
+    if error:
+        return error
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(stream_question_events(params)), mimetype='text/event-stream',
+                    headers=headers)
+
+
+@app.route('/questions', methods=['POST'])
+def questions():
+    """
+    Answer a batch of questions with one warm runtime, streaming JSON Lines as they complete.
+
+    Accepts the /question fields plus `questions` (strings or {"question", "id"} objects) and `concurrency`.
+    Each line is one result (id, response, cost_usd, tokens, latency_ms, attempts, error); the last line is
+    {"summary": ...}.
+    """
+    data = request.get_json(silent=True) or {}
+    params, error = parse_client_params(data)
+    if error:
+        return error
+    items, message = parse_batch_items(data.get('questions'))
+    if message:
+        return jsonify({'error': message}), 400
+    concurrency = data.get('concurrency', BATCH_CONCURRENCY)
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int) or not 1 <= concurrency <= BATCH_MAX_CONCURRENCY:
+        return jsonify({'error': f'concurrency must be an integer between 1 and {BATCH_MAX_CONCURRENCY}.'}), 400
+
+    # Built (or reused warm) once for the whole batch
+    with span("runtime_lookup"):
+        runtime, build_status = runtime_registry.get(params["api_key"], params["model"], params["embedding_model"],
+                                                     params["ingestion_mode"])
+    record_build_status(build_status)
+    runner = BatchRunner(runtime, concurrency=concurrency, use_answer_cache=params["use_answer_cache"])
+
+    def generate():
+        for result in iter_batch_results(runner, items):
+            if "summary" in result:
+                result["summary"]["build_status"] = build_status
+            yield json.dumps(result) + "\n"
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
+
+
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    """
+    Preload heavy imports, the graph snapshot, compressed static files and (with an API key) a warm runtime
+    before taking traffic.
+
+    Accepts the same optional api_key, llm_model, embedding_model and ingestion_mode as /question.
+    """
+    data = request.get_json(silent=True) or {}
+    ingestion_mode = data.get("ingestion_mode", INGESTION_MODE)
+    if ingestion_mode not in INGESTION_MODES:
+        return jsonify({'error': f"Unknown ingestion_mode '{ingestion_mode}'. Use one of: {', '.join(INGESTION_MODES)}."}), 400
+    report = runtime_registry.warmup(data.get('api_key'), data.get("llm_model", CHOSEN_MODEL),
+                                     data.get("embedding_model", CHOSEN_MODEL_EMBEDDINGS), ingestion_mode)
+    if report["build_status"] is not None:
+        record_build_status(report["build_status"])
+    report["static"] = static_assets.preload()
+    return jsonify(report)
 
 
 @app.route('/reset-cache', methods=['POST'])
 def reset_cache():
     clear_cache()
-    gml_path = os.path.join('graphs', 'marvel_graph.gml')
-    if os.path.exists(gml_path):
-        os.remove(gml_path)
-        print('✅ GML file deleted.')
+    get_extraction_cache().clear()
+    runtime_registry.reset()
+    answer_cache.clear()
+    for graph_file in (GRAPH_PATH, snapshot_path(GRAPH_PATH)):
+        if os.path.exists(graph_file):
+            os.remove(graph_file)
+            debug_print(f'✅ {graph_file} deleted.')
     return jsonify({"status": "cache cleared"})
 
 @app.route('/cache-status', methods=['GET'])
 def cache_status():
     # Check for key files
-    graph_exists = os.path.exists(os.path.join('graphs', 'marvel_graph.gml'))
+    graph_exists = os.path.exists(snapshot_path(GRAPH_PATH)) or os.path.exists(GRAPH_PATH)
     # You can expand this to check for other cache artifacts as needed
     # For now, just a simple example
     cache_files = os.listdir('cache') if os.path.exists('cache') else []
-    index_exists = any('index' in f for f in cache_files)
+    index_exists = has_index_snapshot()
     triplets_exists = any('triplet' in f for f in cache_files)
     return jsonify({
         "graph": graph_exists,
@@ -178,44 +425,243 @@ def cache_status():
 
 @app.route('/show-graph', methods=['GET'])
 def show_graph():
-    html_path = os.path.join('graphs', 'deliverable_marvel_graph_visual.html')
-    if not os.path.exists(html_path):
-        return "⚠️ Graph visualization not found. Please generate it first.", 404
-    with open(html_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    return html_content, 200, {'Content-Type': 'text/html'}
+    """
+    Interactive visualization of the current graph, drawn at server-computed layout positions.
+
+    Query parameters: center (an entity; shows its neighborhood), hops (1-GRAPH_MAX_HOPS), limit (maximum
+    nodes, default VIZ_MAX_NODES) and format (html or json). Without a center, large graphs are reduced to
+    their highest-degree nodes. Layouts and rendered views are cached per graph version, and responses carry an
+    ETag derived from the graph version and the parameters.
+    """
+    center = request.args.get('center') or None
+    fmt = request.args.get('format', 'html')
+    try:
+        hops = int(request.args.get('hops', 1))
+        limit = int(request.args.get('limit', VIZ_MAX_NODES))
+    except ValueError:
+        return jsonify({'error': 'hops and limit must be integers.'}), 400
+    if not 1 <= hops <= GRAPH_MAX_HOPS:
+        return jsonify({'error': f'hops must be between 1 and {GRAPH_MAX_HOPS}.'}), 400
+    if not 1 <= limit <= VIZ_MAX_NODES:
+        return jsonify({'error': f'limit must be between 1 and {VIZ_MAX_NODES}.'}), 400
+    if fmt not in ('html', 'json'):
+        return jsonify({'error': "format must be one of: html, json."}), 400
+
+    loaded = load_graph_snapshot(GRAPH_PATH)
+    if loaded is None:
+        return jsonify({"error": "Graph not yet initialized. Please submit a Marvel question once to create the graph."}), 404
+    snapshot = loaded["snapshot"]
+    etag = graph_etag(loaded["version"], "show-graph", center, hops, limit, fmt)
+    if etag_matches(etag):
+        return not_modified(etag)
+    if center is not None and center not in snapshot:
+        return jsonify({"error": f"Entity '{center}' not found in the Marvel graph."}), 404
+
+    with span("show_graph"):
+        body = graph_visualizer.render(snapshot, center, hops, limit, fmt)
+    response = Response(body, mimetype='text/html' if fmt == 'html' else 'application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # cache, but revalidate with the ETag
+    return response
+
+
+def graph_etag(graph_version, *params):
+    """
+    @return: The ETag of a graph response, derived from the graph version and the request parameters.
+    """
+    return hashlib.sha256(json.dumps([graph_version, *params], sort_keys=True).encode()).hexdigest()[:32]
+
+def parse_neighborhood_request(args):
+    """
+    Validate the /graph/<character> query string and fill in defaults.
+
+    @param args: The request query arguments.
+    @return: A tuple (params, error): params is a dictionary with hops, direction, relations, min_confidence,
+             limit and cursor; error is a (response, status) tuple or None.
+    """
+    try:
+        hops = int(args.get('hops', 1))
+        limit = int(args.get('limit', GRAPH_PAGE_SIZE))
+        min_confidence = float(args['min_confidence']) if 'min_confidence' in args else None
+    except ValueError:
+        return None, (jsonify({'error': 'hops and limit must be integers, min_confidence a number.'}), 400)
+    if not 1 <= hops <= GRAPH_MAX_HOPS:
+        return None, (jsonify({'error': f'hops must be between 1 and {GRAPH_MAX_HOPS}.'}), 400)
+    if not 1 <= limit <= GRAPH_MAX_PAGE_SIZE:
+        return None, (jsonify({'error': f'limit must be between 1 and {GRAPH_MAX_PAGE_SIZE}.'}), 400)
+    # Also rejects nan, which fails every comparison
+    if min_confidence is not None and not 0.0 <= min_confidence <= 1.0:
+        return None, (jsonify({'error': 'min_confidence must be between 0 and 1.'}), 400)
+    direction = args.get('direction', 'both')
+    if direction not in ('out', 'in', 'both'):
+        return None, (jsonify({'error': "direction must be one of: out, in, both."}), 400)
+    # ?relation=member_of&relation=has_mutation or ?relation=member_of,has_mutation
+    relations = sorted({r for value in args.getlist('relation') for r in value.split(',') if r}) or None
+
+    return {
+        "hops": hops,
+        "direction": direction,
+        "relations": relations,
+        "min_confidence": min_confidence,
+        "limit": limit,
+        "cursor": args.get('cursor'),
+    }, None
+
+
+def encode_cursor(graph_version, offset):
+    """
+    @return: An opaque cursor for the page starting at `offset` of this graph version's neighborhood listing.
+    """
+    return base64.urlsafe_b64encode(json.dumps({"v": graph_version, "o": offset}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, graph_version):
+    """
+    @param cursor: A cursor from a previous page (None for the first page).
+    @param graph_version: The current graph version.
+    @return: The offset to resume from.
+    @raise ValueError: If the cursor is malformed or belongs to another graph version.
+    """
+    if not cursor:
+        return 0
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if data.get("v") != graph_version or offset < 0:
+        raise ValueError("Cursor belongs to a previous version of the graph; restart from the first page.")
+    return offset
+
 
 @app.route('/graph/<character>', methods=['GET'])
 def graph_character(character):
+    """
+    Neighborhood of a graph entity: outgoing and incoming edges, up to `hops` away, paginated.
+
+    Query parameters: hops (1-GRAPH_MAX_HOPS), direction (out, in, both), relation (repeatable or
+    comma-separated), min_confidence, limit and cursor (from `next_cursor`). Responses carry an ETag
+    derived from the graph version and the parameters, so unchanged pages revalidate with a 304.
+    """
     import urllib.parse
-    graph_path = os.path.join('graphs', 'marvel_graph.gml')
-    # Only load if file exists; do not rebuild here
-    if not os.path.exists(graph_path):
-        print("[WARN] /graph/<character> called but marvel_graph.gml is missing. Graph not initialized.")
+    params, error = parse_neighborhood_request(request.args)
+    if error:
+        return error
+    # Only load if the graph exists; do not rebuild here (the snapshot is memory-mapped once per process)
+    loaded = load_graph_snapshot(GRAPH_PATH)
+    if loaded is None:
+        print("⚠️ /graph/<character> called but the graph is missing. Graph not initialized.", file=sys.stderr)
         return jsonify({"error": "Graph not yet initialized. Please submit a Marvel question once to create the graph."}), 404
-    G = nx.read_gml(graph_path)
+    snapshot, graph_version = loaded["snapshot"], loaded["version"]
     # Decode character name from URL
     character_decoded = urllib.parse.unquote(character)
-    if character_decoded not in G:
+
+    etag = graph_etag(graph_version, character_decoded, params)
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    if character_decoded not in snapshot:
         return jsonify({"error": f"Character '{character_decoded}' not found in the Marvel graph."}), 404
-    connections = []
-    for neighbor in G.neighbors(character_decoded):
-        edge_data = G.get_edge_data(character_decoded, neighbor)
-        relation = edge_data.get('relation', 'related_to') if edge_data else 'related_to'
-        connections.append({"entity": neighbor, "relation": relation})
-    return jsonify({
+    try:
+        offset = decode_cursor(params["cursor"], graph_version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    limit = params["limit"]
+    edges = snapshot.neighborhood(character_decoded, params["hops"], params["direction"], params["relations"],
+                                  params["min_confidence"], offset=offset)
+    # Read one extra edge to know whether there is a next page, without walking the rest
+    page = list(itertools.islice(edges, limit + 1))
+    connections = [dict(edge, relation=edge["relation"] or 'related_to') for edge in page[:limit]]
+    out_degree, in_degree = snapshot.degree(character_decoded)
+
+    response = jsonify({
         "character": character_decoded,
-        "connections": connections
+        "degree": {"out": out_degree, "in": in_degree},
+        "connections": connections,
+        "next_cursor": encode_cursor(graph_version, offset + limit) if len(page) > limit else None,
+        "graph_version": graph_version,
     })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # cache, but revalidate with the ETag
+    return response
+
+def parse_edge_mutations(data):
+    """
+    Validate a /graph/edges payload.
+
+    @param data: The JSON request body: {"upsert": [{source, target, relation, confidence?}, ...],
+                 "remove": [{source, target}, ...]}.
+    @return: A tuple (changes, error): changes is a tuple (upserts, removals) of edge tuples (names and
+             relations normalized like the edge-list importer); error is a (JSON payload, status) tuple or None.
+    """
+    data = data or {}
+    upserts, removals = [], []
+    for edge in data.get('upsert') or []:
+        if not isinstance(edge, dict):
+            return None, (jsonify({'error': 'Each upserted edge must be an object.'}), 400)
+        source, target = normalize_entity(edge.get('source') or ''), normalize_entity(edge.get('target') or '')
+        relation = normalize_relation(edge.get('relation') or '')
+        if not source or not target or not relation:
+            return None, (jsonify({'error': 'Each upserted edge needs a source, target and relation.'}), 400)
+        confidence = edge.get('confidence')
+        if confidence is not None and (isinstance(confidence, bool) or not isinstance(confidence, (int, float))
+                                       or not 0 <= confidence <= 1):
+            return None, (jsonify({'error': 'confidence must be a number between 0 and 1.'}), 400)
+        upserts.append((source, target, relation, confidence))
+    for edge in data.get('remove') or []:
+        if not isinstance(edge, dict):
+            return None, (jsonify({'error': 'Each removed edge must be an object.'}), 400)
+        source, target = normalize_entity(edge.get('source') or ''), normalize_entity(edge.get('target') or '')
+        if not source or not target:
+            return None, (jsonify({'error': 'Each removed edge needs a source and target.'}), 400)
+        removals.append((source, target))
+    if not upserts and not removals:
+        return None, (jsonify({'error': "Nothing to change: send 'upsert' and/or 'remove' edge lists."}), 400)
+    return (upserts, removals), None
+
+
+@app.route('/graph/edges', methods=['POST'])
+def graph_edges():
+    """
+    Add, update and remove graph edges in one batch.
+
+    The batch produces one new graph version. Warm runtimes re-index only the changed triplets instead
+    of being rebuilt, and answers cached for the previous version are no longer served.
+    """
+    changes, error = parse_edge_mutations(request.get_json(silent=True))
+    if error:
+        return error
+    upserts, removals = changes
+    with span("graph_edges"):
+        report = runtime_registry.mutate_edges(upserts, removals)
+    return jsonify(report)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Expose stage latencies, request latencies, token/cost counters and cache hit counts for Prometheus.
+    """
+    return metrics_registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
 @app.route('/')
 def serve_index():
-    return send_from_directory('frontend', 'index.html')
+    return static_assets.serve('frontend', 'index.html')
+
+@app.route('/lib/<path:path>')
+def serve_lib_file(path):
+    # Local vis-network assets used by /show-graph
+    return static_assets.serve('lib', path)
 
 @app.route('/<path:path>')
 def serve_static_file(path):
-    return send_from_directory('frontend', path)
+    return static_assets.serve('frontend', path)
+
 
+if WARMUP_ON_START:
+    # Runs when the worker imports the app, i.e. before it takes traffic
+    runtime_registry.warmup()
+    static_assets.preload()
 
 
 if __name__ == '__main__':
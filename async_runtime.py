@@ -0,0 +1,171 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+
+from config import MAX_INFLIGHT_REQUESTS, REQUEST_TIMEOUT_SECONDS
+
+# Marker for "use the runtime's default timeout" (None means wait without a timeout)
+DEFAULT_TIMEOUT = object()
+
+
+class AsyncRuntime:
+    """
+    A single long-lived event loop, running in a daemon thread, shared by every request.
+
+    Request threads hand coroutines to the loop with `run` and wait for the result, so all
+    in-flight LLM, embedding and query-engine calls are multiplexed on one loop (and its
+    long-lived async HTTP clients) instead of creating and tearing down a loop per request.
+    """
+
+    def __init__(self, max_inflight=MAX_INFLIGHT_REQUESTS, default_timeout=REQUEST_TIMEOUT_SECONDS):
+        """
+        @param max_inflight: Maximum number of coroutines running on the loop at once; others wait their turn.
+        @param default_timeout: Seconds `run` waits for a result unless told otherwise (None waits forever).
+        """
+        self.max_inflight = max_inflight
+        self.default_timeout = default_timeout
+        self._loop = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        """
+        Start the loop thread on first use.
+
+        @return: The running event loop.
+        """
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def serve():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_inflight)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=serve, name="marvel-event-loop", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    @property
+    def loop(self):
+        """
+        The shared event loop (started on first use), for servers that run on it (see async_server.py).
+        """
+        return self._ensure_loop()
+
+    async def _limited(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    async def limited(self, coro, timeout=DEFAULT_TIMEOUT):
+        """
+        Await a coroutine from code already running on the shared loop, under the same in-flight limit and
+        timeout as `run`.
+
+        @param coro: The coroutine to run.
+        @param timeout: Seconds to wait (defaults to `default_timeout`, None waits forever); the coroutine is
+                        cancelled on timeout.
+        @return: The coroutine's result.
+        @raise TimeoutError: If the coroutine did not finish in time.
+        """
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        try:
+            return await asyncio.wait_for(self._limited(coro), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Request did not finish within {timeout} seconds.")
+
+    def submit(self, coro, limit=True):
+        """
+        Schedule a coroutine on the shared loop without waiting for it.
+
+        The coroutine runs in a copy of the caller's context, so context variables such as the
+        active `token_usage_scope` still apply to the calls it makes.
+
+        @param coro: The coroutine to run.
+        @param limit: Count the coroutine against `max_inflight` (False for coroutines that apply the limit
+                      themselves with `limited`).
+        @return: A tuple (future, cancel): a concurrent.futures.Future with the coroutine's result,
+                 and a thread-safe callable that cancels the coroutine.
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread().name == "marvel-event-loop":
+            coro.close()
+            raise RuntimeError("AsyncRuntime cannot be waited on from the event loop thread; await instead.")
+
+        context = contextvars.copy_context()
+        result = concurrent.futures.Future()
+        task_holder = {}
+
+        def transfer(task):
+            if task.cancelled():
+                result.set_exception(concurrent.futures.CancelledError())
+            elif task.exception() is not None:
+                result.set_exception(task.exception())
+            else:
+                result.set_result(task.result())
+
+        def start():
+            if not result.set_running_or_notify_cancel():
+                coro.close()
+                return
+            task = loop.create_task(self._limited(coro) if limit else coro, context=context)
+            task_holder["task"] = task
+            task.add_done_callback(transfer)
+
+        def cancel():
+            if not result.cancel():
+                loop.call_soon_threadsafe(lambda: task_holder.get("task") and task_holder["task"].cancel())
+
+        loop.call_soon_threadsafe(start)
+        return result, cancel
+
+    def run(self, coro, timeout=DEFAULT_TIMEOUT, limit=True):
+        """
+        Run a coroutine on the shared loop and wait for its result (see `submit`).
+
+        @param coro: The coroutine to run.
+        @param timeout: Seconds to wait (defaults to `default_timeout`, None waits forever); the coroutine is
+                        cancelled on timeout.
+        @param limit: Count the coroutine against `max_inflight` (see `submit`).
+        @return: The coroutine's result.
+        @raise TimeoutError: If the coroutine did not finish in time.
+        """
+        future, cancel = self.submit(coro, limit=limit)
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            cancel()
+            raise TimeoutError(f"Request did not finish within {timeout} seconds.")
+
+    def shutdown(self):
+        """
+        Stop the loop thread (a new one is started on the next `run`).
+
+        @return: None
+        """
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+async_runtime = AsyncRuntime()
+
+
+def run_async(coro, timeout=DEFAULT_TIMEOUT, limit=True):
+    """
+    Run a coroutine on the process-wide shared event loop (see `AsyncRuntime.run`).
+
+    @param coro: The coroutine to run.
+    @param timeout: Seconds to wait before cancelling it (defaults to `config.REQUEST_TIMEOUT_SECONDS`,
+                    None waits forever).
+    @param limit: Count the coroutine against `config.MAX_INFLIGHT_REQUESTS`.
+    @return: The coroutine's result.
+    """
+    return async_runtime.run(coro, timeout=timeout, limit=limit)
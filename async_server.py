@@ -0,0 +1,194 @@
+"""
+Async HTTP server for the Marvel GraphRAG app.
+
+`POST /question` is answered by `app.aanswer_question` directly on the shared event loop (async_runtime.py), so a
+request waiting on the LLM holds no thread: concurrent questions are bounded by MAX_INFLIGHT_REQUESTS instead of
+the number of server threads. Every other route (UI, static files, streaming, graph API) is served by the Flask
+app, each request in one of ASYNC_SERVER_WSGI_THREADS worker threads.
+
+Usage:
+    python async_server.py
+"""
+import asyncio
+import concurrent.futures
+import io
+import sys
+import threading
+import time
+from urllib.parse import unquote
+
+from aiohttp import web
+
+from app import app as flask_app, aanswer_question, parse_question_request
+from async_runtime import async_runtime
+from config import ASYNC_SERVER_HOST, ASYNC_SERVER_PORT, ASYNC_SERVER_WSGI_THREADS
+from metrics import REQUEST_DURATION
+
+# Headers owned by the HTTP connection, set by aiohttp itself
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade"}
+
+_wsgi_executor = concurrent.futures.ThreadPoolExecutor(max_workers=ASYNC_SERVER_WSGI_THREADS,
+                                                       thread_name_prefix="marvel-wsgi")
+
+
+async def question(request):
+    start = time.perf_counter()
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+        params, error = None, ({'error': 'Request body must be JSON.'}, 400)
+    else:
+        params, error = parse_question_request(data)
+    if error:
+        payload, status = error
+    else:
+        payload, status = await aanswer_question(params)
+    REQUEST_DURATION.observe(time.perf_counter() - start, "/question", str(status))
+    return web.json_response(payload, status=status)
+
+
+def wsgi_environ(request, body):
+    """
+    @param request: The aiohttp request.
+    @param body: The request body.
+    @return: The WSGI environ for the request.
+    """
+    path, _, query = request.raw_path.partition("?")
+    host, _, port = (request.host or ASYNC_SERVER_HOST).partition(":")
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": unquote(path, encoding="latin-1"),
+        "QUERY_STRING": query,
+        "SERVER_NAME": host,
+        "SERVER_PORT": port or str(ASYNC_SERVER_PORT),
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name in request.headers:
+        key = name.upper().replace("-", "_")
+        if key == "CONTENT_LENGTH":
+            continue
+        if key != "CONTENT_TYPE":
+            key = f"HTTP_{key}"
+        environ[key] = ",".join(request.headers.getall(name))
+    return environ
+
+
+def run_wsgi(environ, loop, chunks, stop):
+    """
+    Call the Flask app in a worker thread and hand its output to the loop: ("start", status, headers), then the
+    body chunks, then None (or the exception that ended the response).
+
+    The whole response is produced in this one thread, as Flask's streamed responses expect.
+
+    @param environ: The WSGI environ.
+    @param loop: The event loop serving the request.
+    @param chunks: The asyncio.Queue the handler reads from.
+    @param stop: Set when the client went away: the response is closed after its current chunk.
+    @return: None
+    """
+    def put(item):
+        loop.call_soon_threadsafe(chunks.put_nowait, item)
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = status, headers
+        return lambda data: put(data)
+
+    try:
+        iterable = flask_app(environ, start_response)
+        try:
+            put(("start", started["status"], started["headers"]))
+            for chunk in iterable:
+                if chunk:
+                    put(chunk)
+                if stop.is_set():
+                    break
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+        put(None)
+    except Exception as e:
+        put(e)
+
+
+async def wsgi_fallback(request):
+    body = await request.read()
+    loop = asyncio.get_running_loop()
+    chunks, stop = asyncio.Queue(), threading.Event()
+    worker = loop.run_in_executor(_wsgi_executor, run_wsgi, wsgi_environ(request, body), loop, chunks, stop)
+    try:
+        item = await chunks.get()
+        if isinstance(item, Exception):
+            raise item
+        _, status, headers = item
+        code, _, reason = status.partition(" ")
+        response = web.StreamResponse(status=int(code), reason=reason or None)
+        for name, value in headers:
+            if name.lower() not in HOP_BY_HOP_HEADERS:
+                response.headers.add(name, value)
+        await response.prepare(request)
+        while True:
+            item = await chunks.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                # Headers are already sent: end the response early
+                print(f"❌ Error while streaming {request.path}: {item}", file=sys.stderr)
+                break
+            await response.write(item)
+        await response.write_eof()
+        return response
+    finally:
+        stop.set()
+        await asyncio.shield(worker)
+
+
+def create_app():
+    """
+    @return: The aiohttp application: native /question, Flask for everything else.
+    """
+    server = web.Application(client_max_size=64 * 1024 ** 2)
+    server.router.add_post("/question", question)
+    server.router.add_route("*", "/{tail:.*}", wsgi_fallback)
+    return server
+
+
+def serve(host=ASYNC_SERVER_HOST, port=ASYNC_SERVER_PORT):
+    """
+    Serve the app on the shared event loop (the one the LLM and embedding clients live on) until interrupted.
+
+    @param host: Interface to bind.
+    @param port: Port to bind.
+    @return: None
+    """
+    loop = async_runtime.loop
+    runner = web.AppRunner(create_app())
+
+    async def start():
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+
+    asyncio.run_coroutine_threadsafe(start(), loop).result()
+    print(f"🚀 Serving on http://{host}:{port} (async /question, Flask in {ASYNC_SERVER_WSGI_THREADS} threads)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(timeout=10)
+
+
+if __name__ == "__main__":
+    serve()
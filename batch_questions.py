@@ -0,0 +1,318 @@
+"""
+Batch question answering for evaluation sets and bulk FAQ generation.
+
+The graph, index and orchestrator are built (or reused warm) once for the whole batch. Questions run
+concurrently on the shared event loop, up to a concurrency limit, with retry and backoff on rate limits
+and transient API errors. Results are produced as JSON Lines in completion order, with per-item cost
+and latency, followed by a summary line.
+
+Usage:
+    python batch_questions.py questions.txt --concurrency 8 --output results.jsonl
+    MARVEL_LLM_BACKEND=stub python batch_questions.py questions.jsonl
+"""
+import argparse
+import asyncio
+import json
+import queue
+import random
+import sys
+import time
+
+from answer_cache import answer_cache
+from async_runtime import async_runtime
+from config import OPENAI_API_KEY, CHOSEN_MODEL, CHOSEN_MODEL_EMBEDDINGS, INGESTION_MODE, INGESTION_MODES, \
+    LLM_BACKEND, REQUEST_TIMEOUT_SECONDS, BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY, BATCH_MAX_QUESTIONS, \
+    BATCH_MAX_RETRIES, BATCH_RETRY_BASE_SECONDS
+from cost_utils import calc_cost, token_usage_scope
+from metrics import record_token_usage, ANSWERS
+from question_pipeline import aanswer_with_runtime
+
+
+def parse_batch_items(questions):
+    """
+    Validate the questions of a batch.
+
+    @param questions: A list of question strings or {"question": ..., "id": ...} objects.
+    @return: A tuple (items, error): items is a list of {"id", "question"} dictionaries (the id defaults to
+             the position in the batch); error is a message string or None.
+    """
+    if not isinstance(questions, list) or not questions:
+        return None, "Missing questions: send a non-empty 'questions' list."
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return None, f"Too many questions: at most {BATCH_MAX_QUESTIONS} per batch."
+    items = []
+    for position, entry in enumerate(questions):
+        if isinstance(entry, dict):
+            question, item_id = entry.get("question"), entry.get("id", position)
+        else:
+            question, item_id = entry, position
+        if not isinstance(question, str) or not question.strip():
+            return None, f"Question {position} is empty or not a string."
+        items.append({"id": item_id, "question": question})
+    return items, None
+
+
+def is_retryable(error):
+    """
+    @param error: An exception raised while answering a question.
+    @return: True for rate limits (HTTP 429), server errors (5xx) and connection errors.
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("RateLimitError", "APIConnectionError", "APITimeoutError")
+
+
+def is_rate_limited(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_delay(error, attempt, base_seconds=BATCH_RETRY_BASE_SECONDS):
+    """
+    @param error: The retryable exception.
+    @param attempt: Number of failed attempts so far (0 for the first retry).
+    @param base_seconds: Backoff for the first retry.
+    @return: Seconds to wait: the server's Retry-After if it sent one, else exponential backoff with jitter.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return base_seconds * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))] if ordered else 0.0
+
+
+class BatchRunner:
+    """
+    Answers a batch of questions with one warm runtime, at most `concurrency` at a time.
+
+    Each question goes through the same steps as /question: the exact answer cache, then the shared answer
+    step (`question_pipeline.aanswer_with_runtime`: semantic answer cache, graph fast path, then the LangGraph
+    workflow under the MAX_INFLIGHT_REQUESTS limit). A rate limit pauses every worker until the backoff (or
+    Retry-After) has passed, instead of letting each one keep hitting the API.
+    """
+
+    def __init__(self, runtime, concurrency=BATCH_CONCURRENCY, use_answer_cache=True, max_retries=BATCH_MAX_RETRIES,
+                 retry_base_seconds=BATCH_RETRY_BASE_SECONDS, timeout=REQUEST_TIMEOUT_SECONDS):
+        """
+        @param runtime: The MarvelRuntime to answer with (see `RuntimeRegistry.get`).
+        @param concurrency: Maximum questions in flight at once.
+        @param use_answer_cache: Whether to read and fill the answer cache (exact and semantic tiers).
+        @param max_retries: Retries per question on retryable errors.
+        @param retry_base_seconds: Backoff before the first retry (doubled on each retry).
+        @param timeout: Seconds allowed for each workflow attempt.
+        """
+        self.runtime = runtime
+        self.concurrency = concurrency
+        self.use_answer_cache = use_answer_cache
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.timeout = timeout
+        self._resume_at = 0.0  # loop time before which no workflow attempt starts (set by rate limits)
+
+    async def run(self, items):
+        """
+        Answer every item, yielding results as they complete, then a {"summary": ...} result.
+
+        @param items: A list of {"id", "question"} dictionaries (see `parse_batch_items`).
+        @return: An async generator of result dictionaries.
+        """
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(position, item):
+            async with semaphore:
+                return await self._answer(position, item)
+
+        tasks = [asyncio.create_task(bounded(position, item)) for position, item in enumerate(items)]
+        latencies, errors, cost_usd = [], 0, 0.0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                latencies.append(result["latency_ms"])
+                errors += result["error"] is not None
+                cost_usd += result["cost_usd"]
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield {"summary": {
+            "questions": len(items),
+            "answered": len(items) - errors,
+            "errors": errors,
+            "cost_usd": round(cost_usd, 6),
+            "seconds": round(time.perf_counter() - start, 3),
+            "latency_ms": {"p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95)},
+            "concurrency": self.concurrency,
+            "graph_version": self.runtime.graph_version,
+        }}
+
+    async def _answer(self, position, item):
+        runtime = self.runtime
+        question = item["question"]
+        start = time.perf_counter()
+        response, answer_source, answered_by, attempts, error = None, "bypass", None, 0, None
+        # Entered inside this question's task, so concurrent questions count their own tokens
+        with token_usage_scope() as usage:
+            try:
+                if self.use_answer_cache:
+                    response = answer_cache.get(question, runtime.model, runtime.embedding_model,
+                                                runtime.graph_version, runtime.ingestion_mode)
+                    answer_source = "exact" if response is not None else "miss"
+                if response is None:
+                    async def invoke(prompt, question):
+                        nonlocal attempts
+                        final_state, attempts = await self._invoke(prompt, question)
+                        return final_state
+
+                    response, answer_source, answered_by = await aanswer_with_runtime(
+                        runtime, question, self.use_answer_cache, answer_source, invoke)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+
+        cost_usd = calc_cost(
+            model=runtime.model,
+            prompt=usage.prompt_llm_token_count,
+            completion=usage.completion_llm_token_count,
+            embed=usage.total_embedding_token_count,
+            embed_model=runtime.embedding_model
+        )
+        record_token_usage(usage, runtime.model, runtime.embedding_model, cost_usd)
+        if error is None:
+            ANSWERS.inc(1, answered_by or "cache")
+        return {
+            "index": position,
+            "id": item["id"],
+            "question": question,
+            "response": response,
+            "answered_by": answered_by,
+            "answer_cache": answer_source,
+            "cost_usd": cost_usd,
+            "tokens": {
+                "prompt": usage.prompt_llm_token_count,
+                "completion": usage.completion_llm_token_count,
+                "embedding": usage.total_embedding_token_count,
+            },
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "attempts": attempts,
+            "error": error,
+        }
+
+    async def _invoke(self, prompt, question):
+        """
+        Run the workflow under the shared in-flight limit, retrying retryable errors with backoff.
+
+        @return: A tuple (final_state, attempts).
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            pause = self._resume_at - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            try:
+                final_state = await async_runtime.limited(
+                    self.runtime.orchestrator.ainvoke(prompt, question), self.timeout)
+                return final_state, attempt + 1
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_delay(e, attempt, self.retry_base_seconds)
+                attempt += 1
+                if is_rate_limited(e):
+                    # Shared pause: the other workers would hit the same limit
+                    self._resume_at = max(self._resume_at, loop.time() + delay)
+                    print(f"⏳ Rate limited, pausing batch for {delay:.1f}s (retry {attempt}/{self.max_retries})",
+                          file=sys.stderr)
+                else:
+                    await asyncio.sleep(delay)
+
+
+def iter_batch_results(runner, items):
+    """
+    Run a batch on the shared event loop and yield its results in this (caller) thread.
+
+    @param runner: The BatchRunner.
+    @param items: A list of {"id", "question"} dictionaries.
+    @return: A generator of result dictionaries, as they complete, ending with the summary.
+    """
+    results = queue.Queue()
+
+    async def produce():
+        try:
+            async for result in runner.run(items):
+                results.put(result)
+        finally:
+            results.put(None)
+
+    # The batch itself does not hold a MAX_INFLIGHT_REQUESTS slot: each of its workflow calls takes one
+    future, cancel = async_runtime.submit(produce(), limit=False)
+    try:
+        while True:
+            result = results.get()
+            if result is None:
+                break
+            yield result
+        future.result()  # re-raise errors from the batch itself
+    except GeneratorExit:
+        cancel()  # consumer went away
+        raise
+
+
+def read_questions(path):
+    """
+    @param path: A text file with one question per line, or a .jsonl file of {"question", "id"} objects.
+    @return: The list of questions for `parse_batch_items`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if path.endswith((".jsonl", ".ndjson")):
+        return [json.loads(line) for line in lines]
+    return lines
+
+
+def main(argv=None):
+    from pipeline_runtime import runtime_registry
+
+    parser = argparse.ArgumentParser(description="Answer a batch of Marvel questions with one warm pipeline.")
+    parser.add_argument("path", help="Questions: one per line (.txt) or JSON Lines with 'question' and 'id'")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSON Lines results file")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Questions in flight at once")
+    parser.add_argument("--model", default=CHOSEN_MODEL, help="LLM model")
+    parser.add_argument("--embedding-model", default=CHOSEN_MODEL_EMBEDDINGS, help="Embedding model")
+    parser.add_argument("--ingestion-mode", choices=INGESTION_MODES, default=INGESTION_MODE)
+    parser.add_argument("--no-answer-cache", action="store_true", help="Do not read or fill the answer cache")
+    args = parser.parse_args(argv)
+
+    items, error = parse_batch_items(read_questions(args.path))
+    if error:
+        parser.error(error)
+    if not 1 <= args.concurrency <= BATCH_MAX_CONCURRENCY:
+        parser.error(f"--concurrency must be between 1 and {BATCH_MAX_CONCURRENCY}.")
+    api_key = OPENAI_API_KEY or ("stub" if LLM_BACKEND == "stub" else None)
+    if not api_key:
+        parser.error("Set OPENAI_API_KEY (or MARVEL_LLM_BACKEND=stub to run offline).")
+
+    runtime, _ = runtime_registry.get(api_key, args.model, args.embedding_model, args.ingestion_mode)
+    runner = BatchRunner(runtime, concurrency=args.concurrency, use_answer_cache=not args.no_answer_cache)
+    with open(args.output, "w", encoding="utf-8") as f:
+        for result in iter_batch_results(runner, items):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            if "summary" in result:
+                summary = result["summary"]
+                print(f"✅ {summary['answered']}/{summary['questions']} answered in {summary['seconds']}s "
+                      f"(p50 {summary['latency_ms']['p50']} ms, ${summary['cost_usd']:.4f}) -> {args.output}")
+            elif result["error"]:
+                print(f"❌ [{result['id']}] {result['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,689 @@
+"""
+Offline benchmark harness for the /question pipeline.
+
+Measures worker boot (`import app` in a fresh interpreter, with and without warmup), then runs every stage
+(graph load from GML vs. the binary snapshot, edge-list import, path queries, triplet extraction, filtering,
+path extraction, index build, orchestrator invoke) and the /question and /graph/<character> endpoints against
+synthetic graphs of increasing size, using the stub LLM and embedding backends (no network, no OpenAI cost).
+Reports p50/p95/p99 latency, throughput and peak RSS per stage as JSON, plus the entity vector index's
+exact vs. IVF search latency and recall@k on a large synthetic embedding matrix, and concurrent /question
+throughput over HTTP from a thread-pooled WSGI server vs. async_server.py.
+
+Usage:
+    python benchmark_runner.py --sizes 50,500,2000 --iterations 20 --output bench.json
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+import networkx as nx
+import numpy as np
+
+import config
+
+# Must be set before the pipeline modules create any clients
+config.LLM_BACKEND = "stub"
+
+from character_bios import CHARACTER_BIOS  # noqa: E402
+from extraction_cache import ExtractionCache, acached_extract  # noqa: E402
+from document_index import DocumentIndex  # noqa: E402
+from bm25_index import BM25Index  # noqa: E402
+from graph_import import import_edge_list  # noqa: E402
+from graph_snapshot import GraphSnapshot  # noqa: E402
+from graph_viz import LayoutCache  # noqa: E402
+from path_engine import PathEngine  # noqa: E402
+from vector_index import MatrixIndex, MatrixVectorStore  # noqa: E402
+from graph_utils import GRAPH_PATH, extract_humanized_triplets_from_graph, filter_documents_by_rules, \
+    build_triplet_documents, build_property_graph_nodes, save_graph, snapshot_path, compute_graph_version  # noqa: E402
+
+SAMPLE_QUESTIONS = [
+    "What gene gives {c} their powers?",
+    "Which team is {c} a member of?",
+    "Trace the mutation and power path that links {c} to their abilities.",
+]
+
+# Modules that must not be loaded by `import app` (they are imported lazily on the paths that use them)
+BOOT_HEAVY_MODULES = ("llama_index.core", "langgraph", "openai", "matplotlib", "networkx", "httpx")
+
+# Run in a fresh interpreter by bench_boot: times `import app`, optionally followed by a warmup
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+if sys.argv[1] == "warmup":
+    app.runtime_registry.warmup()
+print(json.dumps({"import_s": imported - start, "total_s": time.perf_counter() - start,
+                  "heavy_modules": [m for m in %r if m in sys.modules]}))
+""" % (BOOT_HEAVY_MODULES,)
+
+RELATION_WEIGHTS = [("possesses_power", 2), ("has_mutation", 1), ("member_of", 1), ("friend_and_rival_of", 1)]
+
+
+def build_synthetic_marvel_graph(num_characters, seed=42):
+    """
+    Build a random graph with the same shape as the mock Marvel graph, at a chosen size.
+
+    Characters get powers, genes, a team and the occasional rival; genes confer powers.
+
+    @param num_characters: Number of character nodes.
+    @param seed: Random seed, so runs are comparable.
+    @return: A NetworkX DiGraph with 'relation' and 'confidence' edge attributes.
+    """
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    num_genes = max(1, num_characters // 3)
+    num_powers = max(1, num_characters // 4)
+    num_teams = max(1, num_characters // 50)
+
+    characters = [f"Character {i:05d}" for i in range(num_characters)]
+    genes = [f"Gene {i:05d}" for i in range(num_genes)]
+    powers = [f"Power {i:05d}" for i in range(num_powers)]
+    teams = [f"Team {i:03d}" for i in range(num_teams)]
+
+    def conf():
+        return round(rng.uniform(0.6, 1.0), 2)
+
+    for gene in genes:
+        G.add_edge(gene, rng.choice(powers), relation="confers", confidence=conf())
+    for character in characters:
+        G.add_edge(character, rng.choice(teams), relation="member_of", confidence=1.0)
+        G.add_edge(character, rng.choice(genes), relation="has_mutation", confidence=conf())
+        for _ in range(rng.randint(1, 2)):
+            G.add_edge(character, rng.choice(powers), relation="possesses_power", confidence=conf())
+        if rng.random() < 0.2:
+            other = rng.choice(characters)
+            if other != character:
+                G.add_edge(character, other, relation="friend_and_rival_of", confidence=conf())
+    return G
+
+
+def _reset_peak_rss():
+    """
+    Reset the kernel's peak-RSS high-water mark for this process (Linux only; no-op elsewhere).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    """
+    Return the peak resident set size since the last reset, in MB.
+
+    Falls back to the process-lifetime peak when /proc is not available.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    @param values: The samples.
+    @param p: The percentile, between 0 and 100.
+    @return: The percentile value (0.0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def measure(fn, iterations, items=1, setup=None):
+    """
+    Time a stage over several iterations.
+
+    @param fn: The stage to run; receives the result of `setup` if given.
+    @param iterations: Number of timed runs.
+    @param items: Work items processed per run (edges, documents, requests), for throughput.
+    @param setup: Optional untimed callable run before each iteration.
+    @return: A dictionary with latency percentiles (ms), throughput (items/s) and peak RSS (MB).
+    """
+    latencies = []
+    _reset_peak_rss()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(iterations):
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            fn(arg) if setup else fn()
+            latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "throughput_per_s": round(items * iterations / total, 2) if total else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def check_filter_equivalence(documents):
+    """
+    Check that keyword filtering through a DocumentIndex returns exactly what the scan returns.
+
+    @param documents: The triplet Documents.
+    @return: None; raises AssertionError on the first rule set whose results differ.
+    """
+    index = DocumentIndex(documents)
+    rule_sets = [
+        (None, None), (["gene"], None), (None, ["team"]), (["gene", "power"], ["team 000"]),
+        (["POWER"], ["Character 1"]), (["e"], ["x"]), (["", "zz"], None), (["possesses power the entity"], []),
+        (["no such keyword"], None), (["en"], ["gene", "member of"]),
+    ]
+    for include, exclude in rule_sets:
+        for max_documents in (None, 0, 1, 100):
+            expected = filter_documents_by_rules(documents, include, exclude, max_documents)
+            actual = filter_documents_by_rules(index, include, exclude, max_documents)
+            assert [d.id_ for d in actual] == [d.id_ for d in expected], \
+                f"Indexed filtering differs for include={include}, exclude={exclude}, max={max_documents}"
+
+
+def bench_stages(graph, iterations, heavy_iterations, max_documents):
+    """
+    Benchmark each pipeline stage in isolation on one graph.
+
+    @param graph: The synthetic graph.
+    @param iterations: Iterations for cheap stages.
+    @param heavy_iterations: Iterations for extraction and index build.
+    @param max_documents: Documents sent to path extraction (the app caps this at 100).
+    @return: A dictionary of stage name to measurement.
+    """
+    from llama_index.core.callbacks import CallbackManager
+    from llama_index.core.indices.property_graph import PropertyGraphIndex, SchemaLLMPathExtractor, \
+        ImplicitPathExtractor
+    from llama_index.core.schema import QueryBundle
+    from token_counting import ScopedTokenCountingHandler
+    from marvel_graph_orchestrator import MarvelGraphOrchestrator, build_workflow
+    from state_models import MarvelState
+    from client_registry import create_llm, create_embed_model
+    from pipeline_runtime import create_query_engine
+
+    stages = {}
+    edges = graph.number_of_edges()
+
+    save_graph(graph, GRAPH_PATH)
+    stages["graph_load_gml"] = measure(lambda: nx.read_gml(GRAPH_PATH), iterations, items=edges)
+    stages["graph_load_snapshot"] = measure(lambda: GraphSnapshot.load(snapshot_path(GRAPH_PATH)).out_edges(
+        next(iter(graph.nodes))), iterations, items=edges)
+    stages["graph_materialize"] = measure(lambda: GraphSnapshot.load(snapshot_path(GRAPH_PATH)).to_networkx(),
+                                          iterations, items=edges)
+
+    edge_list = os.path.join(tempfile.mkdtemp(dir="."), "edges.csv")
+    with open(edge_list, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "relation", "target", "confidence"])
+        writer.writerows((u, d.get("relation"), v, d.get("confidence")) for u, v, d in graph.edges(data=True))
+    stages["edge_import"] = measure(
+        lambda: import_edge_list(edge_list, output=os.path.join(os.path.dirname(edge_list), "edges.bin"),
+                                 progress=False),
+        iterations, items=edges,
+    )
+
+    stages["triplet_extraction"] = measure(lambda: list(extract_humanized_triplets_from_graph(graph)), iterations,
+                                           items=edges)
+
+    characters = [n for n in graph.nodes if str(n).startswith("Character")] or list(graph.nodes)
+    powers = [v for _, v, d in graph.edges(data=True) if d.get("relation") == "confers"] or list(graph.nodes)
+    path_rng = random.Random(5)
+    # Uncached path queries (fresh engine per run): mutation patterns, then any path up to PATH_MAX_HOPS
+    stages["path_query"] = measure(
+        lambda engine: engine.trace([path_rng.choice(characters), path_rng.choice(powers)]),
+        iterations, setup=lambda: PathEngine(graph),
+    )
+
+    snapshot = GraphSnapshot.from_networkx(graph, version=compute_graph_version(graph))
+    # Fresh layout cache per run (untimed); the incremental run starts from the layout of the graph without
+    # ~1% of its characters, i.e. the state after a small /graph/edges mutation
+    stages["layout_full"] = measure(lambda cache: cache.get(snapshot), heavy_iterations, items=snapshot.num_nodes,
+                                    setup=lambda: LayoutCache(tempfile.mkdtemp(dir=".")))
+    previous = graph.copy()
+    previous.remove_nodes_from(characters[::100])
+    previous_snapshot = GraphSnapshot.from_networkx(previous, version=compute_graph_version(previous))
+
+    def incremental_setup():
+        cache = LayoutCache(tempfile.mkdtemp(dir="."))
+        cache.get(previous_snapshot)
+        return cache
+
+    def incremental(cache):
+        _, status = cache.get(snapshot)
+        assert status == 'incremental', status
+
+    stages["layout_incremental"] = measure(incremental, heavy_iterations, items=snapshot.num_nodes,
+                                           setup=incremental_setup)
+
+    documents = list(build_triplet_documents(extract_humanized_triplets_from_graph(graph)))
+    stages["filtering"] = measure(
+        lambda: filter_documents_by_rules(documents, include_keywords=["gene", "power"],
+                                          exclude_keywords=["team 000"], max_documents=None),
+        iterations, items=len(documents),
+    )
+    check_filter_equivalence(documents)
+    stages["filter_index_build"] = measure(lambda: DocumentIndex(documents), iterations, items=len(documents))
+    # Fresh index per run (untimed), so keyword posting lists are not served from its memo
+    stages["filtering_indexed"] = measure(
+        lambda index: filter_documents_by_rules(index, include_keywords=["gene", "power"],
+                                                exclude_keywords=["team 000"], max_documents=None),
+        iterations, items=len(documents), setup=lambda: DocumentIndex(documents),
+    )
+
+    handler = ScopedTokenCountingHandler()
+    callback_manager = CallbackManager([handler])
+    llm = create_llm(config.CHOSEN_MODEL, "stub", callback_manager)
+    embed_model = create_embed_model(config.CHOSEN_MODEL_EMBEDDINGS, "stub", callback_manager)
+
+    extract_docs = documents[:max_documents]
+    stages["extraction"] = measure(
+        lambda cache: asyncio.run(
+            acached_extract(SchemaLLMPathExtractor(llm=llm, strict=False),
+                            list(build_triplet_documents(d.text for d in extract_docs)), config.CHOSEN_MODEL,
+                            cache=cache)
+        ),
+        heavy_iterations, items=len(extract_docs),
+        setup=lambda: ExtractionCache(os.path.join(tempfile.mkdtemp(dir="."), "extractions.json")),
+    )
+
+    built = {}
+
+    def build_index(nodes):
+        built["index"] = PropertyGraphIndex(
+            nodes=nodes, llm=llm, embed_model=embed_model, kg_extractors=[ImplicitPathExtractor()],
+            vector_store=MatrixVectorStore(), callback_manager=callback_manager, show_progress=False,
+        )
+
+    stages["index_build"] = measure(build_index, heavy_iterations, items=edges,
+                                    setup=lambda: list(build_property_graph_nodes(graph)))
+
+    query_engine = create_query_engine(built["index"], llm, embed_model, callback_manager)
+    # The entity vector search fused with triplet BM25, without the LLM synonym retriever
+    hybrid_retriever = query_engine.retriever.sub_retrievers[-1]
+    hybrid_rng = random.Random(3)
+    stages["hybrid_retrieve"] = measure(
+        lambda: hybrid_retriever.retrieve(QueryBundle(hybrid_rng.choice(SAMPLE_QUESTIONS).format(
+            c=hybrid_rng.choice(characters)))),
+        iterations,
+    )
+    # Compiled once per process by the app; measured here to show what a per-request compile would cost
+    stages["workflow_compile"] = measure(build_workflow, iterations)
+    orchestrator = MarvelGraphOrchestrator(query_engine)
+    rng = random.Random(7)
+
+    def invoke():
+        question = rng.choice(SAMPLE_QUESTIONS).format(c=rng.choice(characters))
+        prompt = orchestrator.build_modified_prompt(question, CHARACTER_BIOS)
+        orchestrator.invoke(prompt, question)
+
+    stages["orchestrator_invoke"] = measure(invoke, iterations)
+
+    # All retrieval branches (hybrid vector + BM25, graph neighborhood) awaited concurrently
+    graph_orchestrator = MarvelGraphOrchestrator(query_engine, graph=graph)
+
+    def retrieve():
+        question = rng.choice(SAMPLE_QUESTIONS).format(c=rng.choice(characters))
+        state = MarvelState(query=graph_orchestrator.build_modified_prompt(question, CHARACTER_BIOS),
+                            question=question)
+        asyncio.run(graph_orchestrator.aretrieve(state, query_engine))
+
+    stages["retrieval_branches"] = measure(retrieve, iterations)
+    stages["keyword_index_build"] = measure(lambda: BM25Index(extract_humanized_triplets_from_graph(graph)),
+                                            heavy_iterations, items=edges)
+    return stages
+
+
+def bench_vector_search(rows, dim, nprobes, queries=200, top_k=10, seed=13):
+    """
+    Benchmark the entity vector index on clustered synthetic embeddings: exact search vs. IVF at several
+    `nprobe` values, with IVF recall@k measured against the exact results.
+
+    @param rows: Number of embeddings.
+    @param dim: Embedding dimension.
+    @param nprobes: The IVF lists probed per query to try.
+    @param queries: Number of queries (perturbed rows of the matrix).
+    @param top_k: The k of recall@k.
+    @param seed: Random seed.
+    @return: A dictionary with the IVF build time and, per variant, latency percentiles and recall@k.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, rows // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), rows)] + rng.normal(size=(rows, dim)).astype(np.float32)
+    exact_index = MatrixIndex().with_added([f"e{i}" for i in range(rows)], vectors)
+    query_vectors = vectors[rng.integers(0, rows, queries)] + 0.5 * rng.normal(size=(queries, dim))
+
+    start = time.perf_counter()
+    ivf_index = exact_index.build_ivf()
+    results = {"rows": rows, "dim": dim, "top_k": top_k, "nlist": len(ivf_index.centroids),
+               "ivf_build_ms": round((time.perf_counter() - start) * 1000, 3)}
+    truth = [set(exact_index.ids[row] for row in exact_index.search(q, top_k)[0].tolist()) for q in query_vectors]
+    cycle = itertools.cycle(query_vectors)
+    results["exact"] = measure(lambda: exact_index.search(next(cycle), top_k), queries)
+    for nprobe in nprobes:
+        found = [set(ivf_index.ids[row] for row in ivf_index.search(q, top_k, nprobe)[0].tolist())
+                 for q in query_vectors]
+        results[f"ivf_nprobe_{nprobe}"] = dict(
+            measure(lambda: ivf_index.search(next(cycle), top_k, nprobe), queries),
+            recall_at_k=round(sum(len(f & t) for f, t in zip(found, truth)) / (top_k * queries), 4),
+        )
+    return results
+
+
+def bench_boot(iterations):
+    """
+    Benchmark worker boot in fresh interpreters: `import app` alone (heavy modules must stay unloaded), and
+    followed by a warmup without an API key (heavy imports and graph snapshot, no runtime).
+
+    @param iterations: Interpreter launches per variant.
+    @return: A dictionary of variant name to latency percentiles (ms) and the heavy modules loaded.
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)), MARVEL_LLM_BACKEND="stub",
+               OPENAI_API_KEY="", MARVEL_WARMUP="0")
+    results = {}
+    for variant in ("import", "warmup"):
+        samples = []
+        for _ in range(iterations):
+            completed = subprocess.run([sys.executable, "-c", BOOT_SCRIPT, variant], env=env, capture_output=True,
+                                       text=True, check=True)
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        latencies = [s["total_s"] for s in samples]
+        results[f"boot_{variant}"] = {
+            "iterations": iterations,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "heavy_modules_after_import": samples[-1]["heavy_modules"] if variant == "import" else None,
+        }
+    return results
+
+
+def bench_endpoints(graph, iterations, ingestion_mode):
+    """
+    Benchmark the Flask endpoints end to end through the test client.
+
+    @param graph: The synthetic graph (saved as the app's GML export and snapshot).
+    @param iterations: Iterations per endpoint.
+    @param ingestion_mode: Ingestion mode sent with /question.
+    @return: A dictionary of endpoint name to measurement.
+    """
+    import app as marvel_app
+    from pipeline_runtime import runtime_registry
+
+    runtime_registry.reset()
+    save_graph(graph, GRAPH_PATH)
+
+    client = marvel_app.app.test_client()
+    characters = [n for n in graph.nodes if str(n).startswith("Character")] or list(graph.nodes)
+    rng = random.Random(11)
+
+    def ask():
+        question = rng.choice(SAMPLE_QUESTIONS).format(c=rng.choice(characters))
+        response = client.post('/question', json={"question": question, "api_key": "stub",
+                                                  "ingestion_mode": ingestion_mode})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def neighbors():
+        response = client.get(f"/graph/{rng.choice(characters)}")
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    asset = "/lib/vis-9.1.2/vis-network.min.js"
+    asset_etag = client.get(asset).headers.get("ETag")
+
+    def static_asset():
+        response = client.get(asset, headers={"Accept-Encoding": "gzip, br"})
+        assert response.status_code == 200 and response.headers.get("Content-Encoding"), response.status_code
+
+    def static_asset_revalidate():
+        response = client.get(asset, headers={"If-None-Match": asset_etag})
+        assert response.status_code == 304, response.status_code
+
+    def show_graph():
+        response = client.get(f"/show-graph?center={rng.choice(characters)}&hops=2")
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    return {
+        "question_cold": measure(ask, 1),
+        "question_warm": measure(ask, iterations),
+        "graph_character": measure(neighbors, iterations),
+        "show_graph": measure(show_graph, iterations),
+        "static_asset": measure(static_asset, iterations),
+        "static_asset_304": measure(static_asset_revalidate, iterations),
+    }
+
+
+def bench_concurrency(graph, requests, concurrency, wsgi_threads, llm_latency_ms, ingestion_mode):
+    """
+    Benchmark concurrent /question throughput over real HTTP: the Flask app behind a WSGI server with a fixed
+    thread pool (each request holds a thread for the whole LLM round trip) vs. async_server.py (the request
+    awaits on the shared event loop). Questions take the LLM path (no graph fast path, no answer cache) against a
+    stub LLM with `llm_latency_ms` per call. Each server starts from a cold runtime, and the async server also
+    reports how late the shared loop ran a 10 ms timer during its run: CPU work left on the loop shows up there.
+
+    @param graph: The synthetic graph (already saved as the app's GML export by `bench_endpoints`).
+    @param requests: Requests sent to each server.
+    @param concurrency: Requests the client keeps in flight.
+    @param wsgi_threads: Threads of the WSGI server.
+    @param llm_latency_ms: Stub LLM latency per call.
+    @param ingestion_mode: Ingestion mode sent with /question.
+    @return: A dictionary of server name to throughput and latency percentiles.
+    """
+    import aiohttp
+    from aiohttp import web
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    import app as marvel_app
+    import async_server
+    from async_runtime import async_runtime
+    from client_registry import client_registry
+    from pipeline_runtime import runtime_registry
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """Werkzeug server handling each connection in a fixed thread pool (like gunicorn's gthread worker)."""
+
+        def __init__(self, *args, threads, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self._pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    saved_latency = config.STUB_LLM_LATENCY_MS
+    config.STUB_LLM_LATENCY_MS = llm_latency_ms
+    client_registry.reset()
+    runtime_registry.reset()
+    characters = [n for n in graph.nodes if str(n).startswith("Character")] or list(graph.nodes)
+    questions = [f"Trace the mutation and power path that links {characters[i % len(characters)]} to their "
+                 f"abilities (request {i})." for i in range(requests)]
+
+    async def load(url):
+        latencies = []
+        gate = asyncio.Semaphore(concurrency)
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+            async def ask(question):
+                async with gate:
+                    start = time.perf_counter()
+                    async with session.post(url, json={"question": question, "api_key": "stub",
+                                                       "ingestion_mode": ingestion_mode,
+                                                       "use_answer_cache": False}) as response:
+                        body = await response.text()
+                        assert response.status == 200, body
+                    latencies.append(time.perf_counter() - start)
+
+            await ask(questions[0])  # warm the runtime and the connection
+            latencies.clear()
+            start = time.perf_counter()
+            await asyncio.gather(*(ask(question) for question in questions))
+            elapsed = time.perf_counter() - start
+        return {
+            "requests": requests,
+            "concurrency": concurrency,
+            "throughput_rps": round(requests / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        }
+
+    async def watch_loop_lag(stop, interval=0.01):
+        lags = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(max(0.0, time.perf_counter() - start - interval))
+        return lags
+
+    results = {}
+    try:
+        wsgi_server = PooledWSGIServer("127.0.0.1", 0, marvel_app.app, handler=QuietRequestHandler,
+                                       threads=wsgi_threads)
+        threading.Thread(target=wsgi_server.serve_forever, daemon=True).start()
+        try:
+            results[f"question_wsgi_{wsgi_threads}_threads"] = asyncio.run(
+                load(f"http://127.0.0.1:{wsgi_server.server_port}/question"))
+        finally:
+            wsgi_server.shutdown()
+            wsgi_server.server_close()
+
+        runner = web.AppRunner(async_server.create_app())
+
+        async def start_async_server():
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", 0).start()
+            return runner.addresses[0][1]
+
+        port = asyncio.run_coroutine_threadsafe(start_async_server(), async_runtime.loop).result()
+        runtime_registry.reset()
+        stop = threading.Event()
+        watcher = asyncio.run_coroutine_threadsafe(watch_loop_lag(stop), async_runtime.loop)
+        try:
+            results["question_async_server"] = asyncio.run(load(f"http://127.0.0.1:{port}/question"))
+            stop.set()
+            lags = watcher.result(timeout=10)
+            results["question_async_server"].update({
+                "loop_lag_p99_ms": round(percentile(lags, 99) * 1000, 3),
+                "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 3),
+            })
+        finally:
+            stop.set()
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), async_runtime.loop).result(timeout=10)
+    finally:
+        config.STUB_LLM_LATENCY_MS = saved_latency
+        client_registry.reset()
+        runtime_registry.reset()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the Marvel GraphRAG pipeline.")
+    parser.add_argument("--sizes", default="50,500,2000", help="Comma-separated character counts.")
+    parser.add_argument("--iterations", type=int, default=20, help="Iterations for cheap stages and endpoints.")
+    parser.add_argument("--heavy-iterations", type=int, default=3, help="Iterations for extraction/index build.")
+    parser.add_argument("--max-documents", type=int, default=100, help="Documents sent to path extraction.")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Stub LLM latency per call.")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Stub embedding latency per call.")
+    parser.add_argument("--boot-iterations", type=int, default=5, help="Fresh interpreters per boot benchmark.")
+    parser.add_argument("--vector-rows", type=int, default=100_000, help="Embeddings in the vector index benchmark.")
+    parser.add_argument("--vector-dim", type=int, default=128, help="Embedding dimension of that benchmark.")
+    parser.add_argument("--vector-nprobes", default="4,8,16,32", help="Comma-separated IVF nprobe values to try.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent /question requests (0 = skip).")
+    parser.add_argument("--concurrency-requests", type=int, default=128, help="Requests per server in that test.")
+    parser.add_argument("--wsgi-threads", type=int, default=8, help="Threads of the WSGI server it compares with.")
+    parser.add_argument("--concurrency-llm-latency-ms", type=float, default=1000.0,
+                        help="Stub LLM latency per call in that test.")
+    parser.add_argument("--ingestion-mode", default=config.INGESTION_MODE, choices=config.INGESTION_MODES)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    config.STUB_LLM_LATENCY_MS = args.llm_latency_ms
+    config.STUB_EMBED_LATENCY_MS = args.embed_latency_ms
+
+    report = {
+        "backend": "stub",
+        "llm_latency_ms": args.llm_latency_ms,
+        "embed_latency_ms": args.embed_latency_ms,
+        "ingestion_mode": args.ingestion_mode,
+        "results": [],
+    }
+
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="marvel-bench-")
+    os.chdir(workdir)
+    try:
+        report["boot"] = bench_boot(args.boot_iterations)
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"✅ Benchmarked boot: import {report['boot']['boot_import']['p50_ms']} ms, "
+          f"import + warmup {report['boot']['boot_warmup']['p50_ms']} ms", file=sys.stderr)
+
+    report["vector_search"] = bench_vector_search(args.vector_rows, args.vector_dim,
+                                                  [int(n) for n in args.vector_nprobes.split(",") if n.strip()])
+    vector_search = report["vector_search"]
+    print(f"✅ Benchmarked vector search ({args.vector_rows} rows): exact {vector_search['exact']['p50_ms']} ms, "
+          + ", ".join(f"nprobe={n} {vector_search[f'ivf_nprobe_{n}']['p50_ms']} ms "
+                      f"(recall@{vector_search['top_k']} {vector_search[f'ivf_nprobe_{n}']['recall_at_k']})"
+                      for n in args.vector_nprobes.split(",") if n.strip()), file=sys.stderr)
+
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        graph = build_synthetic_marvel_graph(size)
+        workdir = tempfile.mkdtemp(prefix="marvel-bench-")
+        os.chdir(workdir)  # keep graphs/ and cache/ artifacts out of the repo
+        try:
+            stages = bench_stages(graph, args.iterations, args.heavy_iterations, args.max_documents)
+            stages.update(bench_endpoints(graph, args.iterations, args.ingestion_mode))
+            if args.concurrency > 0:
+                stages.update(bench_concurrency(graph, args.concurrency_requests, args.concurrency, args.wsgi_threads,
+                                                args.concurrency_llm_latency_ms, args.ingestion_mode))
+        finally:
+            os.chdir(original_cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+        report["results"].append({
+            "characters": size,
+            "nodes": graph.number_of_nodes(),
+            "edges": graph.number_of_edges(),
+            "stages": stages,
+        })
+        print(f"✅ Benchmarked {size} characters ({graph.number_of_edges()} edges)", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import re
+
+import numpy as np
+
+from config import BM25_K1, BM25_B
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    @param text: Any text.
+    @return: Its lowercased alphanumeric tokens.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 keyword index over a fixed list of texts (e.g. triplet sentences).
+
+    Postings are stored per term in CSR form (document ids and term frequencies in two NumPy arrays),
+    and the per-document length normalization is precomputed, so a query only touches the postings of
+    its own terms.
+    """
+
+    def __init__(self, texts, k1=BM25_K1, b=BM25_B):
+        """
+        @param texts: Iterable of texts (consumed once; order gives the document ids).
+        @param k1: Term frequency saturation.
+        @param b: Document length normalization (0 = none, 1 = full).
+        """
+        self.texts = []
+        self.k1 = k1
+        vocabulary = {}
+        doc_ids, term_ids, lengths = [], [], []
+        for doc_id, text in enumerate(texts):
+            self.texts.append(text)
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for token in tokens:
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc_id)
+        self.vocabulary = vocabulary
+
+        num_docs, num_terms = len(self.texts), len(vocabulary)
+        # One posting per (term, document) pair, with its term frequency, grouped by term
+        pairs = np.unique(np.array(term_ids, dtype=np.int64) * max(num_docs, 1) + np.array(doc_ids, dtype=np.int64),
+                          return_counts=True)
+        keys, counts = pairs
+        posting_terms = keys // max(num_docs, 1)
+        self.doc_ids = (keys % max(num_docs, 1)).astype(np.int32)
+        self.term_freqs = counts.astype(np.float32)
+        self.indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=num_terms), out=self.indptr[1:])
+
+        document_freqs = np.diff(self.indptr)
+        self.idf = np.log1p((num_docs - document_freqs + 0.5) / (document_freqs + 0.5)).astype(np.float32)
+        lengths = np.array(lengths, dtype=np.float32)
+        average = float(lengths.mean()) if num_docs else 0.0
+        self.length_norm = (k1 * (1 - b + b * lengths / (average or 1.0))).astype(np.float32)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def scores(self, query):
+        """
+        @param query: The query text.
+        @return: A float32 array with the BM25 score of every document (0 when no query term matches).
+        """
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs, tf = self.doc_ids[start:end], self.term_freqs[start:end]
+            # Each document appears once per term, so plain fancy-index accumulation is exact
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, query, top_k=5):
+        """
+        @param query: The query text.
+        @param top_k: Maximum number of results.
+        @return: A list of (document id, score) tuples with a positive score, best first.
+        """
+        scores = self.scores(query)
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in best if scores[doc_id] > 0]
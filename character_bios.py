@@ -38,3 +38,19 @@ CHARACTER_BIOS = {
     ),
 }
 
+
+# Other names a question may use for a character (alias -> key in CHARACTER_BIOS)
+CHARACTER_ALIASES = {
+    "Logan": "Wolverine",
+    "James Howlett": "Wolverine",
+    "Ororo Munroe": "Storm",
+    "Ororo": "Storm",
+    "Charles Xavier": "Professor X",
+    "Professor Xavier": "Professor X",
+    "Xavier": "Professor X",
+    "Erik Lehnsherr": "Magneto",
+    "Scott Summers": "Cyclops",
+    "Phoenix": "Jean Grey",
+    "Hank McCoy": "Beast",
+    "Raven Darkholme": "Mystique",
+}
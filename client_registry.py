@@ -0,0 +1,181 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from config import CLIENT_POOL_MAX_ENTRIES, CLIENT_IDLE_SECONDS, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, \
+    HTTP_KEEPALIVE_SECONDS
+from metrics import debug_print, record_cache_lookups
+
+
+def api_key_fingerprint(api_key):
+    """
+    Hash an API key so it can be used in cache keys without keeping the key itself around.
+
+    The full digest is used, so two different keys can never map to the same clients or runtime.
+
+    @param api_key: The OpenAI API key.
+    @return: The hex SHA-256 digest of the key.
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def create_http_clients():
+    """
+    Create a keep-alive connection pool for the OpenAI clients of one API key.
+
+    @return: A tuple (http_client, async_http_client). The async client is only used on the shared event loop
+        (see async_runtime.py), since its connections are bound to the loop that opened them.
+    """
+    import httpx
+
+    limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                          max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                          keepalive_expiry=HTTP_KEEPALIVE_SECONDS)
+    return httpx.Client(limits=limits), httpx.AsyncClient(limits=limits)
+
+
+def create_llm(model, api_key, callback_manager, http_client=None, async_http_client=None):
+    """
+    Create the LLM client for the configured backend (`config.LLM_BACKEND`).
+
+    @param model: The LLM model name.
+    @param api_key: The OpenAI API key (ignored by the stub backend).
+    @param callback_manager: Callback manager carrying the token counting handler.
+    @param http_client: Optional pooled httpx.Client (see `create_http_clients`).
+    @param async_http_client: Optional pooled httpx.AsyncClient.
+    @return: An llama_index LLM instance.
+    """
+    if config.LLM_BACKEND == "stub":
+        from stub_backends import StubLLM
+        return StubLLM(model_name=model, latency_ms=config.STUB_LLM_LATENCY_MS,
+                       token_latency_ms=config.STUB_TOKEN_LATENCY_MS, callback_manager=callback_manager)
+    from llama_index.llms.openai import OpenAI
+    return OpenAI(model=model, api_key=api_key, temperature=0.0, callback_manager=callback_manager,
+                  http_client=http_client, async_http_client=async_http_client)
+
+
+def create_embed_model(embedding_model, api_key, callback_manager, http_client=None, async_http_client=None):
+    """
+    Create the embedding client for the configured backend (`config.LLM_BACKEND`).
+
+    @param embedding_model: The embedding model name.
+    @param api_key: The OpenAI API key (ignored by the stub backend).
+    @param callback_manager: Callback manager carrying the token counting handler.
+    @param http_client: Optional pooled httpx.Client (see `create_http_clients`).
+    @param async_http_client: Optional pooled httpx.AsyncClient.
+    @return: An llama_index embedding model instance.
+    """
+    if config.LLM_BACKEND == "stub":
+        from stub_backends import StubEmbedding
+        return StubEmbedding(model_name=embedding_model, latency_ms=config.STUB_EMBED_LATENCY_MS,
+                             callback_manager=callback_manager)
+    from llama_index.embeddings.openai import OpenAIEmbedding
+    return OpenAIEmbedding(model_name=embedding_model, api_key=api_key, callback_manager=callback_manager,
+                           http_client=http_client, async_http_client=async_http_client)
+
+
+class ClientEntry:
+    """
+    The LLM and (cached) embedding clients for one (API key, model, embedding model), with their own
+    token counting handler.
+    """
+
+    def __init__(self, key_digest, llm, embed_model, handler, callback_manager):
+        self.key_digest = key_digest
+        self.llm = llm
+        self.embed_model = embed_model
+        self.handler = handler
+        self.callback_manager = callback_manager
+        self.last_used = time.monotonic()
+
+
+class ClientRegistry:
+    """
+    Process-level pool of OpenAI clients, keyed by (API key digest, model, embedding model).
+
+    Every entry built for the same API key shares one keep-alive HTTP connection pool, so runtimes that are
+    rebuilt (new graph version, other ingestion mode, `/reset-cache`) reuse open TCP/TLS connections.
+    Clients and pools are never shared across API keys. Entries are evicted in LRU order beyond
+    `max_entries` and when unused for `idle_seconds`; evicted clients stay usable by runtimes that still hold
+    them and their connections go away with them.
+    """
+
+    def __init__(self, max_entries=CLIENT_POOL_MAX_ENTRIES, idle_seconds=CLIENT_IDLE_SECONDS):
+        """
+        @param max_entries: Maximum number of pooled client entries.
+        @param idle_seconds: Seconds an unused entry is kept (0 or None disables idle eviction).
+        """
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self._entries = OrderedDict()
+        self._http_clients = {}
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # Caller holds the lock
+        if self.idle_seconds:
+            for key in [key for key, entry in self._entries.items() if now - entry.last_used > self.idle_seconds]:
+                del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        in_use = {entry.key_digest for entry in self._entries.values()}
+        for key_digest in [k for k in self._http_clients if k not in in_use]:
+            del self._http_clients[key_digest]
+
+    def get(self, api_key, model, embedding_model):
+        """
+        Return the pooled clients for an API key and models, creating them on first use.
+
+        @param api_key: The OpenAI API key.
+        @param model: The LLM model name.
+        @param embedding_model: The embedding model name.
+        @return: A tuple (entry, status) where entry is a ClientEntry and status is 'reused' or 'created'.
+        """
+        key_digest = api_key_fingerprint(api_key)
+        key = (key_digest, model, embedding_model)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = now
+                self._entries.move_to_end(key)
+                record_cache_lookups("clients", hits=1)
+                return entry, 'reused'
+
+            from llama_index.core.callbacks import CallbackManager
+            from embedding_cache import CachedEmbedding
+            from token_counting import ScopedTokenCountingHandler
+
+            http_clients = self._http_clients.get(key_digest)
+            if http_clients is None and config.LLM_BACKEND != "stub":
+                http_clients = self._http_clients[key_digest] = create_http_clients()
+            http_client, async_http_client = http_clients or (None, None)
+
+            handler = ScopedTokenCountingHandler()
+            callback_manager = CallbackManager([handler])
+            llm = create_llm(model, api_key, callback_manager, http_client, async_http_client)
+            # Only cache misses reach the wrapped model, so its handler counts real API tokens only
+            embed_model = CachedEmbedding(create_embed_model(embedding_model, api_key, callback_manager,
+                                                             http_client, async_http_client))
+            entry = ClientEntry(key_digest, llm, embed_model, handler, callback_manager)
+            self._entries[key] = entry
+            self._evict(now)
+        record_cache_lookups("clients", misses=1)
+        debug_print(f"🔌 New clients for {model} / {embedding_model} ({len(self._entries)} pooled)")
+        return entry, 'created'
+
+    def reset(self):
+        """
+        Drop every pooled client, so the next runtime build creates new ones.
+
+        @return: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._http_clients.clear()
+
+
+client_registry = ClientRegistry()
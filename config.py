@@ -23,4 +23,135 @@ CHOSEN_MODEL_EMBEDDINGS = "text-embedding-ada-002"
 QUERY_ROUTING_RULES = {
     "mutation_path": ["gene", "mutation", "power", "confers"],
     "team_lookup": ["team", "x-men", "brotherhood", "avengers"]
-}
\ No newline at end of file
+}
+
+# Retrieval branches run concurrently before generation and merged into one context:
+#   "vector"       - the index's hybrid retriever (entity embeddings fused with triplet BM25, hybrid_retriever.py)
+#   "neighborhood" - the edges of the entities the question mentions, straight from the graph
+RETRIEVAL_BRANCHES = ("vector", "neighborhood")
+RETRIEVAL_NEIGHBORHOOD_MAX_EDGES = 10
+RETRIEVAL_MAX_CONTEXT_NODES = 15
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Entity vector index of the PropertyGraphIndex (vector_index.py): "exact" scans the whole embedding matrix,
+# "ivf" probes VECTOR_IVF_NPROBE of VECTOR_IVF_NLIST inverted lists (None = sqrt of the row count; more probes =
+# better recall, slower), "auto" switches to IVF from VECTOR_IVF_MIN_ROWS rows. Rows added after training are
+# scanned exactly until they exceed VECTOR_IVF_RETRAIN_TAIL of the index, which then retrains its lists.
+VECTOR_INDEX = os.getenv("MARVEL_VECTOR_INDEX", "auto")
+VECTOR_IVF_MIN_ROWS = 50_000
+VECTOR_IVF_NLIST = None
+VECTOR_IVF_NPROBE = int(os.getenv("MARVEL_VECTOR_NPROBE", "16"))
+VECTOR_IVF_TRAIN_ITERATIONS = 10
+VECTOR_IVF_RETRAIN_TAIL = 0.2
+
+# Hybrid entity retrieval (hybrid_retriever.py): vector and triplet-text BM25 candidates per result, fused with
+# weighted reciprocal rank fusion (the vector ranking has weight 1). An entity found only by BM25 scores below
+# every vector candidate, so the best HYBRID_KEYWORD_SLOTS BM25 entities are always kept (at most top_k - 1).
+HYBRID_CANDIDATES = 4
+HYBRID_KEYWORD_WEIGHT = float(os.getenv("MARVEL_HYBRID_KEYWORD_WEIGHT", "0.5"))
+HYBRID_KEYWORD_SLOTS = int(os.getenv("MARVEL_HYBRID_KEYWORD_SLOTS", "1"))
+HYBRID_RRF_K = 60
+
+# Maximum number of warm pipeline runtimes (graph + index + query engine) kept per process
+MAX_WARM_RUNTIMES = 8
+
+# How graph edges become property-graph nodes:
+#   "llm"   - humanized triplet sentences parsed back by SchemaLLMPathExtractor
+#   "graph" - edges converted directly into EntityNode/Relation objects (no LLM calls)
+INGESTION_MODES = ("llm", "graph")
+INGESTION_MODE = os.getenv("MARVEL_INGESTION_MODE", "llm")
+
+# LLM/embedding backend: "openai" for real calls, "stub" for offline deterministic stand-ins
+# (see stub_backends.py); stub latencies are in milliseconds.
+LLM_BACKEND = os.getenv("MARVEL_LLM_BACKEND", "openai")
+STUB_LLM_LATENCY_MS = float(os.getenv("MARVEL_STUB_LLM_LATENCY_MS", "0"))
+STUB_EMBED_LATENCY_MS = float(os.getenv("MARVEL_STUB_EMBED_LATENCY_MS", "0"))
+STUB_TOKEN_LATENCY_MS = float(os.getenv("MARVEL_STUB_TOKEN_LATENCY_MS", "0"))
+
+# Verbose per-call prints (cost breakdowns, node traces, stage timings); metrics are always collected
+DEBUG_LOGGING = os.getenv("MARVEL_DEBUG", "0").lower() in ("1", "true", "yes")
+
+# Answer cache in front of the orchestrator: exact tier on (normalized question, model, embedding model, graph
+# version), optional semantic tier on query-embedding cosine similarity between questions mentioning the same entities.
+ANSWER_CACHE_MAX_ENTRIES = 512
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("MARVEL_ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SEMANTIC = os.getenv("MARVEL_ANSWER_CACHE_SEMANTIC", "0").lower() in ("1", "true", "yes")
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("MARVEL_ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Shared event loop for the /question path: max concurrently running requests on the loop and
+# per-request timeout (seconds) for the orchestrator round trip.
+MAX_INFLIGHT_REQUESTS = int(os.getenv("MARVEL_MAX_INFLIGHT_REQUESTS", "64"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("MARVEL_REQUEST_TIMEOUT_SECONDS", "120"))
+
+# Async server (async_server.py): /question is answered on the shared event loop without holding a thread; every
+# other route is served by the Flask app in a pool of ASYNC_SERVER_WSGI_THREADS threads.
+ASYNC_SERVER_HOST = os.getenv("MARVEL_HOST", "127.0.0.1")
+ASYNC_SERVER_PORT = int(os.getenv("MARVEL_PORT", "5000"))
+ASYNC_SERVER_WSGI_THREADS = 32
+
+# Facts below this confidence must be phrased with uncertainty and quote their score
+# (same rule the LLM prompt enforces; also used by the graph fast path)
+LOW_CONFIDENCE_THRESHOLD = 0.8
+
+# /graph/<character> neighborhood API: default and maximum page size, and maximum hops
+GRAPH_PAGE_SIZE = 50
+GRAPH_MAX_PAGE_SIZE = 500
+GRAPH_MAX_HOPS = 3
+
+# Multi-hop path engine (mutation_path route): maximum hops without a relation pattern, partial paths
+# kept per search layer, and memoized queries per graph version
+PATH_MAX_HOPS = 3
+PATH_BEAM_WIDTH = 2000
+PATH_CACHE_MAX_ENTRIES = 1024
+
+# Graph visualization (graph_viz.py): force layout iterations (full and after a small graph change), largest
+# graph laid out with exact node-to-node repulsion, largest share of new nodes for an incremental layout,
+# nodes and edges drawn per view, and rendered views cached per graph version
+LAYOUT_ITERATIONS = 50
+LAYOUT_INCREMENTAL_ITERATIONS = 15
+LAYOUT_EXACT_MAX_NODES = 1000
+LAYOUT_INCREMENTAL_MAX_CHANGED = 0.1
+VIZ_MAX_NODES = 500
+VIZ_MAX_EDGES = 2000
+VIZ_CACHE_MAX_ENTRIES = 128
+
+# Streaming edge-list importer (graph_import.py): rows read and merged per chunk
+IMPORT_CHUNK_SIZE = 50_000
+
+# Keyword rules applied to triplet documents before LLM path extraction (filter_documents_by_rules).
+# With include/exclude keywords, the rules are answered from an inverted index built once per graph version.
+EXTRACTION_INCLUDE_KEYWORDS = None
+EXTRACTION_EXCLUDE_KEYWORDS = None
+EXTRACTION_MAX_DOCUMENTS = 100
+
+# Batch question answering (/questions and batch_questions.py): default questions in flight, batch size
+# limit, and retries with exponential backoff on rate limits and transient API errors
+BATCH_CONCURRENCY = int(os.getenv("MARVEL_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = 64
+BATCH_MAX_QUESTIONS = 1000
+BATCH_MAX_RETRIES = 4
+BATCH_RETRY_BASE_SECONDS = 1.0
+
+# Pooled OpenAI clients (client_registry.py): entries kept per (API key, model, embedding model) and seconds an
+# unused entry is kept; each API key gets its own keep-alive HTTP connection pool.
+CLIENT_POOL_MAX_ENTRIES = 32
+CLIENT_IDLE_SECONDS = int(os.getenv("MARVEL_CLIENT_IDLE_SECONDS", "1800"))
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_SECONDS = 60.0
+
+# Static files and HTTP compression (static_assets.py): served roots, browser cache lifetime of versioned assets
+# (e.g. lib/vis-9.1.2/), smallest body worth compressing, and gzip/brotli levels for assets compressed once
+# vs. per-response (graph HTML/JSON). Brotli is used only if the `brotli` package is installed.
+STATIC_ROOTS = {"frontend": "frontend", "lib": "lib"}
+STATIC_IMMUTABLE_MAX_AGE = 31_536_000
+COMPRESS_MIN_BYTES = 1024
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+DYNAMIC_GZIP_LEVEL = 6
+DYNAMIC_BROTLI_QUALITY = 5
+
+# Warm the worker when app.py is imported (heavy imports, graph snapshot, compressed static files and, with
+# OPENAI_API_KEY, a runtime); otherwise each loads on first use. POST /warmup does the same on demand.
+WARMUP_ON_START = os.getenv("MARVEL_WARMUP", "0").lower() in ("1", "true", "yes")
@@ -1,4 +1,8 @@
+import contextvars
+from contextlib import contextmanager
+
 from config import MODEL_COST
+from metrics import debug_print
 
 
 def calc_cost(model, prompt=0, completion=0, embed=0, embed_model="text-embedding-ada-002"):
@@ -12,12 +16,12 @@ def calc_cost(model, prompt=0, completion=0, embed=0, embed_model="text-embeddin
     @param embed_model: The embedding model used (default is "text-embedding-ada-002").
     @return: Total estimated cost in USD (rounded to 5 decimal places).
     """
-    print(f"🧮 calc_cost() called with:")
-    print(f"   🔹 model = {model}")
-    print(f"   🔹 prompt tokens = {prompt}")
-    print(f"   🔹 completion tokens = {completion}")
-    print(f"   🔹 embedding tokens = {embed}")
-    print(f"   🔹 embed_model = {embed_model}")
+    debug_print(f"🧮 calc_cost() called with:")
+    debug_print(f"   🔹 model = {model}")
+    debug_print(f"   🔹 prompt tokens = {prompt}")
+    debug_print(f"   🔹 completion tokens = {completion}")
+    debug_print(f"   🔹 embedding tokens = {embed}")
+    debug_print(f"   🔹 embed_model = {embed_model}")
 
     cost = 0.0
 
@@ -26,32 +30,32 @@ def calc_cost(model, prompt=0, completion=0, embed=0, embed_model="text-embeddin
         if "input" in m:
             input_cost = (prompt / 1000) * m["input"]
             cost += input_cost
-            print(f"   ➕ Prompt cost = {input_cost:.5f} USD")
+            debug_print(f"   ➕ Prompt cost = {input_cost:.5f} USD")
         else:
-            print(f"   ⚠️ No 'input' rate defined for model: {model}")
+            debug_print(f"   ⚠️ No 'input' rate defined for model: {model}")
 
         if "output" in m:
             output_cost = (completion / 1000) * m["output"]
             cost += output_cost
-            print(f"   ➕ Completion cost = {output_cost:.5f} USD")
+            debug_print(f"   ➕ Completion cost = {output_cost:.5f} USD")
         else:
-            print(f"   ⚠️ No 'output' rate defined for model: {model}")
+            debug_print(f"   ⚠️ No 'output' rate defined for model: {model}")
     else:
-        print(f"   ❌ Model '{model}' not found in MODEL_COST!")
+        debug_print(f"   ❌ Model '{model}' not found in MODEL_COST!")
 
     if embed_model in MODEL_COST:
         em = MODEL_COST[embed_model]
         if "input" in em:
             embed_cost = (embed / 1000) * em["input"]
             cost += embed_cost
-            print(f"   ➕ Embedding cost = {embed_cost:.5f} USD")
+            debug_print(f"   ➕ Embedding cost = {embed_cost:.5f} USD")
         else:
-            print(f"   ⚠️ No 'input' rate defined for embedding model: {embed_model}")
+            debug_print(f"   ⚠️ No 'input' rate defined for embedding model: {embed_model}")
     else:
-        print(f"   ❌ Embedding model '{embed_model}' not found in MODEL_COST!")
+        debug_print(f"   ❌ Embedding model '{embed_model}' not found in MODEL_COST!")
 
     total = round(cost, 5)
-    print(f"💰 Total estimated cost = ${total:.5f} USD\n")
+    debug_print(f"💰 Total estimated cost = ${total:.5f} USD\n")
     return total
 
 
@@ -83,3 +87,93 @@ def print_cost_breakdown(handler, model="gpt-3.5-turbo-0125", embed_model="text-
 
     print(f"💸 Total Estimated Cost: ${total_cost:.5f} USD ({total_cost * 100:.2f}¢)")
 
+
+
+_active_usage = contextvars.ContextVar("active_token_usage", default=None)
+
+
+class TokenUsage:
+    """
+    Token counts collected for a single request while a `token_usage_scope` is active.
+
+    Exposes the same counters as `TokenCountingHandler`, so it can be passed wherever a handler is read.
+    """
+
+    def __init__(self):
+        self.llm_token_counts = []
+        self.embedding_token_counts = []
+        self.embedding_cache_hits = 0
+        self.embedding_cache_misses = 0
+        self.embedding_tokens_saved = 0
+
+    @property
+    def prompt_llm_token_count(self):
+        return sum(x.prompt_token_count for x in self.llm_token_counts)
+
+    @property
+    def completion_llm_token_count(self):
+        return sum(x.completion_token_count for x in self.llm_token_counts)
+
+    @property
+    def total_llm_token_count(self):
+        return sum(x.total_token_count for x in self.llm_token_counts)
+
+    @property
+    def total_embedding_token_count(self):
+        return sum(x.total_token_count for x in self.embedding_token_counts)
+
+    def embedding_cache_summary(self):
+        """
+        Summarize embedding cache usage for this scope.
+
+        @return: A dictionary with hits, misses, hit_ratio and tokens_saved.
+        """
+        lookups = self.embedding_cache_hits + self.embedding_cache_misses
+        return {
+            "hits": self.embedding_cache_hits,
+            "misses": self.embedding_cache_misses,
+            "hit_ratio": round(self.embedding_cache_hits / lookups, 4) if lookups else 0.0,
+            "tokens_saved": self.embedding_tokens_saved,
+        }
+
+
+def current_token_usage():
+    """
+    @return: The TokenUsage of the active `token_usage_scope`, or None outside a scope.
+    """
+    return _active_usage.get()
+
+
+@contextmanager
+def token_usage_scope():
+    """
+    Collect token counts from every `ScopedTokenCountingHandler` into a fresh TokenUsage.
+
+    Scopes follow the current context (thread or asyncio task), so concurrent requests that share
+    the same LLM clients and handler still get their own, correct counts.
+
+    @return: A context manager yielding the TokenUsage for this scope.
+    """
+    usage = TokenUsage()
+    token = _active_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _active_usage.reset(token)
+
+
+def record_embedding_cache_usage(hits, misses, tokens_saved):
+    """
+    Add embedding cache lookups to the active `token_usage_scope` (no-op outside a scope).
+
+    @param hits: Number of embeddings served from the cache.
+    @param misses: Number of embeddings that had to be computed.
+    @param tokens_saved: Embedding tokens that the cache hits did not send to the API.
+    @return: None
+    """
+    usage = _active_usage.get()
+    if usage is None:
+        return
+    usage.embedding_cache_hits += hits
+    usage.embedding_cache_misses += misses
+    usage.embedding_tokens_saved += tokens_saved
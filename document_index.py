@@ -0,0 +1,119 @@
+import threading
+from array import array
+
+# Keywords shorter than this cannot be looked up by trigram and are answered by scanning the cached texts
+_GRAM = 3
+
+
+class DocumentIndex:
+    """
+    Inverted trigram index over a fixed corpus of Documents, for keyword include/exclude rules.
+
+    Built once: the lowercased text of every document is cached and each distinct trigram maps to the
+    sorted ids of the documents containing it. A keyword's candidates are the intersection of its
+    trigrams' posting lists, verified with a substring check on the cached text, so matching is exactly
+    `keyword.lower() in doc.text.lower()` (substrings and phrases included). Keyword results are memoized.
+    """
+
+    def __init__(self, docs):
+        """
+        @param docs: Iterable of Document objects (consumed once; order is kept).
+        """
+        self.docs = []
+        self.texts = []
+        self._postings = {}
+        self._matches = {}
+        self._lock = threading.Lock()
+        postings = self._postings
+        for doc_id, doc in enumerate(docs):
+            text = doc.text.lower()
+            self.docs.append(doc)
+            self.texts.append(text)
+            for gram in {text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1)}:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("i")
+                posting.append(doc_id)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def matching(self, keyword):
+        """
+        @param keyword: A keyword or phrase (case-insensitive substring).
+        @return: The frozenset of ids of documents whose text contains the keyword.
+        """
+        keyword = keyword.lower()
+        with self._lock:
+            cached = self._matches.get(keyword)
+        if cached is not None:
+            return cached
+
+        texts = self.texts
+        if len(keyword) < _GRAM:
+            ids = frozenset(i for i, text in enumerate(texts) if keyword in text)
+        else:
+            grams = {keyword[i:i + _GRAM] for i in range(len(keyword) - _GRAM + 1)}
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            ids = frozenset(i for i in candidates if keyword in texts[i])
+
+        with self._lock:
+            self._matches[keyword] = ids
+        return ids
+
+    def filter(self, include_keywords=None, exclude_keywords=None, max_documents=100):
+        """
+        Same rules and results as `filter_documents_by_rules` over the indexed documents.
+
+        @param include_keywords: Only keep docs that contain ANY of these keywords (case-insensitive).
+        @param exclude_keywords: Remove docs that contain ANY of these keywords (case-insensitive).
+        @param max_documents: Optional limit to number of docs returned. If None, returns all.
+        @return: The matching Documents, in corpus order.
+        """
+        if include_keywords:
+            included = set()
+            for keyword in include_keywords:
+                included |= self.matching(keyword)
+            ids = sorted(included)
+        else:
+            ids = range(len(self.docs))
+
+        excluded = set()
+        for keyword in exclude_keywords or ():
+            excluded |= self.matching(keyword)
+
+        filtered = []
+        for i in ids:
+            if max_documents is not None and len(filtered) >= max_documents:
+                break
+            if i not in excluded:
+                filtered.append(self.docs[i])
+        return filtered
+
+
+_index_cache = {}
+_index_cache_lock = threading.Lock()
+
+
+def get_document_index(key, docs):
+    """
+    Return the DocumentIndex for a corpus, building it on first use.
+
+    Only the most recent corpus is kept (the key is typically the graph version).
+
+    @param key: Identifies the corpus.
+    @param docs: Iterable of Documents, only consumed if the index has to be built.
+    @return: The DocumentIndex.
+    """
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            index = DocumentIndex(docs)
+            _index_cache.clear()
+            _index_cache[key] = index
+        return index
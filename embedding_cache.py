@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, List
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.utils import get_tokenizer
+
+from cache_utils import CACHE_DIR
+from cost_utils import record_embedding_cache_usage
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, "embeddings")
+
+
+def embedding_cache_key(model_name, text, kind="text"):
+    """
+    Build the cache key for one embedding.
+
+    @param model_name: The embedding model name.
+    @param text: The embedded text.
+    @param kind: "text" or "query"; some models embed queries differently from documents.
+    @return: A hex digest of (model, kind, text).
+    """
+    payload = f"{model_name}\x00{kind}\x00{text}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Append-only, memory-mapped store of float32 embedding vectors for a single model.
+
+    Vectors live in one contiguous `<model>.f32` file (row i is the i-th stored vector) and an append-only
+    `<model>.keys.log` journal lists the key of every row: a JSON header line with the dimension, then one
+    key per line. Readers memory-map the vector file, so several worker processes can share it without each
+    loading it into RAM, and parse only the journal lines appended since their last refresh. Writers append
+    vectors, then keys, under a file lock, so each write costs the new rows only; rows beyond the journal
+    and a torn last journal line (from a crashed writer) are ignored and overwritten by the next write.
+    """
+
+    def __init__(self, model_name, directory=EMBEDDING_CACHE_DIR):
+        """
+        @param model_name: The embedding model the vectors belong to.
+        @param directory: Directory holding the vector and key files.
+        """
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, f"{safe}.f32")
+        self.journal_path = os.path.join(directory, f"{safe}.keys.log")
+        self.lock_path = os.path.join(directory, f"{safe}.lock")
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.dim = None
+        self._rows = {}
+        self._matrix = None
+        self._offset = 0  # journal bytes parsed so far (complete lines only)
+        self._inode = None
+
+    def _refresh(self):
+        """
+        Parse the journal lines appended since the last refresh and re-map the vector file if rows were added.
+        """
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._reset()  # the journal was replaced or removed (e.g., cache reset)
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+        with open(self.journal_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return
+        lines = data[:end].decode('utf-8').splitlines()
+        if self._offset == 0:
+            self.dim = json.loads(lines.pop(0))["dim"]
+        for key in lines:
+            self._rows[key] = len(self._rows)
+        self._offset += end
+        if self._rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r',
+                                     shape=(len(self._rows), self.dim))
+
+    def get_many(self, keys):
+        """
+        Look up vectors by key.
+
+        @param keys: List of embedding cache keys.
+        @return: A list aligned with `keys` holding a vector (list of floats) or None for misses.
+        """
+        with self._lock:
+            self._refresh()
+            rows = self._rows
+            matrix = self._matrix
+        return [matrix[rows[k]].tolist() if k in rows else None for k in keys]
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put_many(self, keys, vectors):
+        """
+        Append new vectors to the store (keys that are already present are skipped).
+
+        @param keys: List of embedding cache keys.
+        @param vectors: List of embedding vectors aligned with `keys`.
+        @return: None
+        """
+        if not keys:
+            return
+        with self._lock, self._file_lock():
+            self._refresh()
+            dim = self.dim or len(vectors[0])
+            new_keys, new_vectors, seen = [], [], set(self._rows)
+            for key, vector in zip(keys, vectors):
+                if key in seen or len(vector) != dim:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_vectors.append(vector)
+            if not new_keys:
+                return
+
+            # Drop any torn tail left by a crashed writer before appending; vectors go first, so every
+            # key a reader sees has its row
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(len(self._rows) * dim * 4)
+                f.write(np.asarray(new_vectors, dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            header = "" if self._offset else json.dumps({"dim": dim}) + "\n"
+            with open(self.journal_path, 'ab') as f:
+                f.truncate(self._offset)
+                f.write((header + "".join(f"{key}\n" for key in new_keys)).encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that serves vectors from an EmbeddingStore and batches the misses.
+
+    Only cache misses reach the wrapped model, in a single batched call per request, so the
+    wrapped model's callback manager (and its TokenCountingHandler) only sees real API usage.
+    Hits, misses and the tokens they saved are recorded in the active `token_usage_scope`.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _store: EmbeddingStore = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+
+    def __init__(self, inner, store=None, **kwargs):
+        """
+        @param inner: The embedding model used for cache misses (e.g., OpenAIEmbedding).
+        @param store: The EmbeddingStore to use (defaults to one for the inner model's name).
+        """
+        super().__init__(model_name=inner.model_name, embed_batch_size=2048, **kwargs)
+        self._inner = inner
+        self._store = store or EmbeddingStore(inner.model_name)
+        self._tokenizer = get_tokenizer()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _lookup(self, texts, kind):
+        keys = [embedding_cache_key(self.model_name, t, kind) for t in texts]
+        vectors = self._store.get_many(keys)
+        misses = [i for i, v in enumerate(vectors) if v is None]
+        return keys, vectors, misses
+
+    def _finish(self, texts, keys, vectors, misses, fetched):
+        for i, vector in zip(misses, fetched):
+            vectors[i] = vector
+        self._store.put_many([keys[i] for i in misses], fetched)
+        missed = set(misses)
+        hit_texts = [t for i, t in enumerate(texts) if i not in missed]
+        tokens_saved = sum(len(self._tokenizer(t)) for t in hit_texts)
+        record_embedding_cache_usage(len(hit_texts), len(misses), tokens_saved)
+        return vectors
+
+    def get_text_embedding_batch(self, texts: List[str], show_progress: bool = False, **kwargs: Any):
+        keys, vectors, misses = self._lookup(texts, "text")
+        fetched = []
+        if misses:
+            fetched = self._inner.get_text_embedding_batch([texts[i] for i in misses], show_progress=show_progress)
+        return self._finish(texts, keys, vectors, misses, fetched)
+
+    async def aget_text_embedding_batch(self, texts: List[str], show_progress: bool = False, **kwargs: Any):
+        keys, vectors, misses = self._lookup(texts, "text")
+        fetched = []
+        if misses:
+            fetched = await self._inner.aget_text_embedding_batch(
+                [texts[i] for i in misses], show_progress=show_progress
+            )
+        return self._finish(texts, keys, vectors, misses, fetched)
+
+    def get_text_embedding(self, text: str):
+        return self.get_text_embedding_batch([text])[0]
+
+    async def aget_text_embedding(self, text: str):
+        return (await self.aget_text_embedding_batch([text]))[0]
+
+    def get_query_embedding(self, query: str):
+        keys, vectors, misses = self._lookup([query], "query")
+        fetched = [self._inner.get_query_embedding(query)] if misses else []
+        return self._finish([query], keys, vectors, misses, fetched)[0]
+
+    async def aget_query_embedding(self, query: str):
+        keys, vectors, misses = self._lookup([query], "query")
+        fetched = [await self._inner.aget_query_embedding(query)] if misses else []
+        return self._finish([query], keys, vectors, misses, fetched)[0]
+
+    # Abstract hooks; the public methods above never fall through to them.
+    def _get_query_embedding(self, query: str):
+        return self.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str):
+        return await self.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str):
+        return self.get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]):
+        return self.get_text_embedding_batch(texts)
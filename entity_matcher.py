@@ -0,0 +1,143 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher (Aho-Corasick automaton).
+
+    Built once over all patterns; a search is a single pass over the text, whatever the number of patterns.
+    Matching is case-insensitive.
+    """
+
+    def __init__(self, patterns):
+        """
+        @param patterns: A dictionary mapping pattern strings to the value reported when they match.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern.lower(), value)
+        self._build_failure_links()
+
+    def _add(self, pattern, value):
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                # Inherit the matches of the longest proper suffix
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text):
+        """
+        Yield every pattern occurrence in the text.
+
+        @param text: The text to search.
+        @return: A generator of (start, end, value) tuples, with `end` exclusive.
+        """
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, value in self._out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+class EntityMatcher:
+    """
+    Finds the graph entities and characters a question mentions, including aliases (e.g., "Logan" -> Wolverine).
+
+    Only whole-word matches count, and overlapping matches resolve to the leftmost, then longest one,
+    so "Magnetism Gene" wins over "Magnetism".
+    """
+
+    def __init__(self, names, aliases=None):
+        """
+        @param names: Canonical entity names (bio keys, graph node labels).
+        @param aliases: Optional dictionary mapping alias -> canonical name.
+        """
+        patterns = {name: name for name in names}
+        for alias, canonical in (aliases or {}).items():
+            patterns.setdefault(alias, canonical)
+        self._automaton = AhoCorasick(patterns)
+
+    def find(self, text):
+        """
+        Return the canonical names mentioned in the text, in order of first appearance.
+
+        @param text: The text to search (e.g., the user's question).
+        @return: A list of unique canonical names.
+        """
+        text = text.lower()
+        matches = [
+            (start, end, value) for start, end, value in self._automaton.iter_matches(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+        ]
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+
+        found, covered_until = [], 0
+        for start, end, value in matches:
+            if start < covered_until:
+                continue
+            covered_until = end
+            if value not in found:
+                found.append(value)
+        return found
+
+
+def build_entity_matcher(bios_dict, aliases=None, graph=None):
+    """
+    Build an EntityMatcher over the bio keys, their aliases and (optionally) every graph node label.
+
+    @param bios_dict: A dictionary mapping character names to their biography strings.
+    @param aliases: Optional dictionary mapping alias -> canonical character name.
+    @param graph: Optional NetworkX graph whose node labels are matched too.
+    @return: The EntityMatcher.
+    """
+    names = list(bios_dict)
+    if graph is not None:
+        names.extend(str(node) for node in graph.nodes)
+    return EntityMatcher(names, aliases)
+
+
+def select_bios(question, bios_dict, matcher, graph=None):
+    """
+    Pick the bios relevant to a question: characters it mentions plus their one-hop graph neighbors.
+
+    @param question: The user's question.
+    @param bios_dict: A dictionary mapping character names to their biography strings.
+    @param matcher: An EntityMatcher built with `build_entity_matcher`.
+    @param graph: Optional NetworkX graph used for the one-hop expansion (in both edge directions).
+    @return: A dictionary of the selected character -> bio entries, in match order.
+    """
+    mentioned = matcher.find(question)
+    selected = [name for name in mentioned if name in bios_dict]
+    if graph is not None:
+        for name in mentioned:
+            if name not in graph:
+                continue
+            neighbors = list(graph.successors(name)) + list(graph.predecessors(name)) \
+                if graph.is_directed() else list(graph.neighbors(name))
+            selected.extend(n for n in neighbors if n in bios_dict)
+    return {name: bios_dict[name] for name in dict.fromkeys(selected)}
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from cache_utils import CACHE_DIR
+
+EXTRACTION_CACHE_PATH = os.path.join(CACHE_DIR, "extractions.json")
+
+
+def extractor_fingerprint(extractor):
+    """
+    Hash the configuration of a path extractor so cached results are dropped when it changes.
+
+    Covers the extractor class, its prompt, its output schema and its validation settings.
+
+    @param extractor: A llama_index path extractor (e.g., SchemaLLMPathExtractor).
+    @return: A hex digest of the extractor configuration.
+    """
+    schema_cls = getattr(extractor, "kg_schema_cls", None)
+    prompt = getattr(extractor, "extract_prompt", None)
+    config = {
+        "class": type(extractor).__name__,
+        "prompt": getattr(prompt, "template", str(prompt)),
+        "schema": schema_cls.model_json_schema() if schema_cls is not None else None,
+        "strict": getattr(extractor, "strict", None),
+        "max_triplets_per_chunk": getattr(extractor, "max_triplets_per_chunk", None),
+    }
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def extraction_cache_key(text, model, fingerprint):
+    """
+    Build the content-addressed cache key for a single document extraction.
+
+    @param text: The document text sent to the extractor.
+    @param model: The LLM model name used for extraction.
+    @param fingerprint: The extractor configuration fingerprint.
+    @return: A hex digest uniquely identifying this (text, model, config) combination.
+    """
+    payload = f"{model}\x00{fingerprint}\x00{text}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _dump_kg_node(node):
+    data = node.model_dump()
+    data["embedding"] = None
+    data["cls"] = type(node).__name__
+    return data
+
+
+def _load_kg_node(data):
+    from llama_index.core.graph_stores.types import EntityNode, ChunkNode
+    data = dict(data)
+    cls = ChunkNode if data.pop("cls", "EntityNode") == "ChunkNode" else EntityNode
+    return cls(**data)
+
+
+class ExtractionCache:
+    """
+    Persistent cache of path-extraction results, stored as a single JSON file.
+
+    Each entry maps an extraction cache key to the KG nodes and relations the extractor
+    produced for that document, so unchanged documents never go back to the LLM.
+    """
+
+    def __init__(self, path=EXTRACTION_CACHE_PATH):
+        """
+        @param path: Location of the JSON file backing the cache.
+        """
+        self.path = path
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable extraction cache '{self.path}': {e}", file=sys.stderr)
+
+    def get(self, key):
+        """
+        Look up a cached extraction.
+
+        @param key: The extraction cache key.
+        @return: A (kg_nodes, kg_relations) tuple, or None on a cache miss.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        from llama_index.core.graph_stores.types import Relation
+        nodes = [_load_kg_node(n) for n in entry["nodes"]]
+        relations = [Relation(**r) for r in entry["relations"]]
+        return nodes, relations
+
+    def put(self, key, kg_nodes, kg_relations):
+        """
+        Store the extraction result for a document.
+
+        @param key: The extraction cache key.
+        @param kg_nodes: The KG nodes extracted from the document.
+        @param kg_relations: The KG relations extracted from the document.
+        @return: None
+        """
+        entry = {
+            "nodes": [_dump_kg_node(n) for n in kg_nodes],
+            "relations": [r.model_dump() for r in kg_relations],
+        }
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[key] = entry
+            self._dirty = True
+
+    def save(self):
+        """
+        Write pending entries to disk atomically.
+
+        @return: None
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def clear(self):
+        """
+        Drop all in-memory entries (the backing file is left to `clear_cache`).
+
+        @return: None
+        """
+        with self._lock:
+            self._entries = None
+            self._dirty = False
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+
+_extraction_cache = ExtractionCache()
+
+
+def get_extraction_cache():
+    """
+    Return the process-wide extraction cache.
+
+    @return: The shared ExtractionCache instance.
+    """
+    return _extraction_cache
+
+
+async def acached_extract(extractor, docs, model, cache=None, show_progress=False):
+    """
+    Run a path extractor over documents, serving unchanged documents from the extraction cache.
+
+    Only documents whose (text, model, extractor config) key is not cached are sent to the LLM;
+    their results are then added to the cache and persisted.
+
+    @param extractor: The path extractor to run on cache misses (e.g., SchemaLLMPathExtractor).
+    @param docs: The documents to extract KG nodes and relations from.
+    @param model: The LLM model name the extractor uses (part of the cache key).
+    @param cache: The ExtractionCache to use (defaults to the process-wide cache).
+    @param show_progress: Whether to show extractor progress for the cache misses.
+    @return: A tuple (nodes, stats) where nodes carry KG metadata like the extractor's output
+             and stats is a dict with 'hits' and 'misses' counts.
+    """
+    from llama_index.core.graph_stores.types import KG_NODES_KEY, KG_RELATIONS_KEY
+
+    cache = cache or get_extraction_cache()
+    fingerprint = extractor_fingerprint(extractor)
+
+    keys = []
+    misses = []
+    for doc in docs:
+        key = extraction_cache_key(doc.text, model, fingerprint)
+        keys.append(key)
+        cached = cache.get(key)
+        if cached is None:
+            misses.append(doc)
+        else:
+            doc.metadata[KG_NODES_KEY], doc.metadata[KG_RELATIONS_KEY] = cached
+
+    if misses:
+        extracted = await extractor.acall(misses, show_progress=show_progress)
+        extracted_by_id = {node.id_: node for node in extracted}
+        for doc, key in zip(docs, keys):
+            node = extracted_by_id.get(doc.id_)
+            if node is None:
+                continue
+            cache.put(key, node.metadata.get(KG_NODES_KEY, []), node.metadata.get(KG_RELATIONS_KEY, []))
+            doc.metadata[KG_NODES_KEY] = node.metadata.get(KG_NODES_KEY, [])
+            doc.metadata[KG_RELATIONS_KEY] = node.metadata.get(KG_RELATIONS_KEY, [])
+        cache.save()
+
+    stats = {"hits": len(docs) - len(misses), "misses": len(misses)}
+    return list(docs), stats
@@ -22,7 +22,7 @@ form.addEventListener('submit', async function (e) {
 
     setLoading(true);
     try {
-        const response = await fetch('/question', {
+        const response = await fetch('/question/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -32,14 +32,16 @@ form.addEventListener('submit', async function (e) {
                 embedding_model: embeddingModel
             })
         });
-        const data = await response.json();
-        if (response.ok) {
-            showResult(data.response, data.cost_usd, data.build_status, data.model_used);
-        } else if (response.status === 400 && data.error && data.error.startsWith('Missing OpenAI API key')) {
-            // Show error only if backend says key is missing
-            showToast(data.error, 'danger');
+        if (!response.ok) {
+            const data = await response.json();
+            if (response.status === 400 && data.error && data.error.startsWith('Missing OpenAI API key')) {
+                // Show error only if backend says key is missing
+                showToast(data.error, 'danger');
+            } else {
+                showResult('Error: ' + (data.error || 'Unknown error'), null, null, null);
+            }
         } else {
-            showResult('Error: ' + (data.error || 'Unknown error'), null, null, null);
+            await readAnswerStream(response);
         }
     } catch (err) {
         showResult('Network error. Please try again.', null, null, null);
@@ -47,6 +49,62 @@ form.addEventListener('submit', async function (e) {
     setLoading(false);
 });
 
+// Read the server-sent events from /question/stream and render them as they arrive
+async function readAnswerStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    const progress = [];
+    document.getElementById('answer-text').textContent = '';
+    document.getElementById('cost-info').classList.add('d-none');
+    showProgress(progress);
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+            const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+            if (!eventLine || !dataLine) continue;
+            const event = eventLine.slice(7);
+            const data = JSON.parse(dataLine.slice(6));
+            if (event === 'progress') {
+                progress.push(data);
+                showProgress(progress);
+            } else if (event === 'token') {
+                answer += data.delta;
+                showStreamingAnswer(answer);
+            } else if (event === 'done') {
+                showResult(data.response, data.cost_usd, data.build_status, data.model_used, data.embedding_cache, data.answer_cache, data.answered_by);
+            } else if (event === 'error') {
+                showResult('Error: ' + (data.error || 'Unknown error'), null, null, null);
+            }
+        }
+    }
+}
+
+// Show the answer text while it is still being generated
+function showStreamingAnswer(answer) {
+    document.getElementById('answer-text').textContent = answer;
+    document.getElementById('result-container').classList.remove('d-none');
+}
+
+// Show per-stage progress while the answer is being prepared
+function showProgress(progress) {
+    const labels = { graph: 'Graph', runtime: 'Runtime', triplets: 'Triplets', index: 'Index', classify: 'Query type', retrieval: 'Retrieval', graph_lookup: 'Graph lookup', paths: 'Graph paths' };
+    const statusDiv = document.getElementById('build-status');
+    const latest = {};
+    progress.forEach(p => { latest[p.stage] = p.status; });
+    statusDiv.innerHTML = '<strong>⏳ Progress:</strong>' + Object.entries(latest)
+        .map(([stage, status]) => `<br>• ${labels[stage] || stage}: ${status}`).join('');
+    statusDiv.style.display = 'block';
+    document.getElementById('result-container').classList.remove('d-none');
+}
+
 // Handle Reset Cache button
 const resetBtn = document.getElementById('reset-cache-btn');
 resetBtn.addEventListener('click', async function () {
@@ -107,20 +165,42 @@ async function handleCharacterTabClick(character, btn) {
     btn.classList.add('active');
     characterGraphOutput.style.display = 'block';
     characterGraphOutput.innerHTML = '<div class="text-center text-secondary py-2">Loading...</div>';
+    await loadCharacterConnections(character, null);
+}
+
+// Render one page of a character's neighborhood (outgoing and incoming edges); "Load more" follows next_cursor
+async function loadCharacterConnections(character, cursor) {
     try {
-        const response = await fetch(`/graph/${encodeURIComponent(character)}`);
+        const params = new URLSearchParams({ limit: 25 });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`/graph/${encodeURIComponent(character)}?${params}`);
         if (response.ok) {
             const data = await response.json();
-            if (data.connections && data.connections.length > 0) {
-                let table = `<table class="table table-sm table-bordered mb-0"><thead><tr><th>Relation</th><th>Entity</th></tr></thead><tbody>`;
-                data.connections.forEach(conn => {
-                    table += `<tr><td>${conn.relation}</td><td>${conn.entity}</td></tr>`;
-                });
-                table += '</tbody></table>';
-                characterGraphOutput.innerHTML = `<div class="mb-2"><strong>${data.character}</strong> connections:</div>${table}`;
+            const rows = data.connections.map(conn => {
+                const confidence = conn.confidence !== null ? conn.confidence.toFixed(2) : '';
+                const arrow = conn.direction === 'out' ? '→' : '←';
+                return `<tr><td>${arrow} ${conn.relation}</td><td>${conn.entity}</td><td>${confidence}</td></tr>`;
+            }).join('');
+            if (cursor) {
+                characterGraphOutput.querySelector('tbody').insertAdjacentHTML('beforeend', rows);
+            } else if (data.connections.length > 0) {
+                characterGraphOutput.innerHTML = `<div class="mb-2"><strong>${data.character}</strong> connections `
+                    + `(${data.degree.out} outgoing, ${data.degree.in} incoming):</div>`
+                    + `<table class="table table-sm table-bordered mb-0"><thead><tr><th>Relation</th><th>Entity</th><th>Confidence</th></tr></thead>`
+                    + `<tbody>${rows}</tbody></table>`;
             } else {
                 characterGraphOutput.innerHTML = `<div class="text-warning">No connections found for <strong>${data.character}</strong>.</div>`;
             }
+            const previousButton = characterGraphOutput.querySelector('.load-more-btn');
+            if (previousButton) previousButton.remove();
+            if (data.next_cursor) {
+                const more = document.createElement('button');
+                more.type = 'button';
+                more.className = 'btn btn-sm btn-outline-secondary mt-2 load-more-btn';
+                more.textContent = 'Load more';
+                more.addEventListener('click', () => loadCharacterConnections(character, data.next_cursor));
+                characterGraphOutput.appendChild(more);
+            }
         } else {
             const err = await response.json();
             characterGraphOutput.innerHTML = `<div class="text-danger">${err.error || 'Character not found.'}</div>`;
@@ -137,13 +217,16 @@ const firstTab = characterTabs.querySelector('.nav-link');
 if (firstTab) firstTab.click();
 
 // Show result in the UI
-function showResult(answer, cost, buildStatus, modelUsed) {
+function showResult(answer, cost, buildStatus, modelUsed, embeddingCache, answerCache, answeredBy) {
     const resultContainer = document.getElementById('result-container');
     const answerText = document.getElementById('answer-text');
     const costInfo = document.getElementById('cost-info');
     answerText.textContent = answer || '';
     if (cost !== null && cost !== undefined) {
         costInfo.textContent = `Estimated cost: $${cost} USD | Model: ${modelUsed || 'Unknown'}`;
+        if (embeddingCache) {
+            costInfo.textContent += ` | Embedding cache: ${Math.round(embeddingCache.hit_ratio * 100)}% hits, ${embeddingCache.tokens_saved} tokens saved`;
+        }
         costInfo.classList.remove('d-none');
     } else {
         costInfo.textContent = '';
@@ -155,9 +238,18 @@ function showResult(answer, cost, buildStatus, modelUsed) {
         statusDiv.innerHTML = `
             <strong>📦 Cache Usage:</strong><br>
             • Graph: ${buildStatus.graph === "cached" ? "✅ Used from cache" : "❌ Rebuilt"}<br>
-            • Triplets: ${buildStatus.triplets === "cached" ? "✅ Used from cache" : "❌ Rebuilt"}<br>
+            • Triplets: ${buildStatus.triplets === "cached" ? "✅ Used from cache" : buildStatus.triplets === "skipped" ? "➖ Not needed (direct graph ingestion)" : "❌ Rebuilt"}<br>
             • Index: ${buildStatus.index === "cached" ? "✅ Used from cache" : "❌ Rebuilt"}
         `;
+        if (buildStatus.extraction) {
+            statusDiv.innerHTML += `<br>• Extraction: ${buildStatus.extraction.hits} cached / ${buildStatus.extraction.misses} sent to LLM`;
+        }
+        if (answeredBy === "graph") {
+            statusDiv.innerHTML += `<br>• Answer: ⚡ Looked up directly in the graph (no LLM call)`;
+        }
+        if (answerCache === "exact" || answerCache === "semantic") {
+            statusDiv.innerHTML += `<br>• Answer: ✅ Served from answer cache (${answerCache} match)`;
+        }
         statusDiv.style.display = "block";
     } else {
         statusDiv.style.display = "none";
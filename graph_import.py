@@ -0,0 +1,303 @@
+"""
+Streaming importer for large external edge lists (CSV or JSONL, optionally gzip-compressed).
+
+Rows are read and merged in chunks, so memory grows with the number of distinct entities and edges,
+not with the number of rows. The result is written as the graph snapshot the app loads.
+
+Usage:
+    python graph_import.py edges.csv.gz --merge max
+    python graph_import.py edges.jsonl --output graphs/marvel_graph.bin --export-gml
+"""
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import time
+import unicodedata
+from array import array
+
+from config import IMPORT_CHUNK_SIZE
+from graph_snapshot import GraphSnapshot
+from graph_utils import GRAPH_PATH, snapshot_path
+
+# Accepted column / key names for each field
+FIELD_ALIASES = {
+    "source": ("source", "subject", "head", "from", "src", "u"),
+    "relation": ("relation", "predicate", "rel", "type", "label"),
+    "target": ("target", "object", "tail", "to", "dst", "v"),
+    "confidence": ("confidence", "score", "weight", "probability"),
+}
+# How the confidences of duplicate edges are combined
+MERGE_STRATEGIES = ("max", "mean", "noisy_or")
+
+_WHITESPACE = re.compile(r"\s+")
+_RELATION_SEPARATORS = re.compile(r"[\s\-]+")
+
+
+def normalize_entity(name):
+    """
+    @param name: A raw entity name.
+    @return: The name with Unicode (NFKC) and whitespace normalized, or "" if empty.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(name))).strip()
+
+
+def normalize_relation(relation):
+    """
+    @param relation: A raw relation name (e.g., "Member Of", "has-mutation").
+    @return: The snake_case relation (e.g., "member_of"), or None if empty.
+    """
+    relation = _RELATION_SEPARATORS.sub("_", unicodedata.normalize("NFKC", str(relation)).strip().lower())
+    return relation or None
+
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _resolve_fields(keys):
+    lowered = {str(k).strip().lower(): k for k in keys}
+    return {field: next((lowered[a] for a in aliases if a in lowered), None) for field, aliases in FIELD_ALIASES.items()}
+
+
+def iter_edge_rows(path, fmt=None):
+    """
+    Stream the rows of an edge list as (source, relation, target, confidence) tuples of raw values.
+
+    CSV files need a header row; JSONL files have one object per line. Field names are matched
+    case-insensitively against `FIELD_ALIASES`.
+
+    @param path: Path of the .csv, .jsonl (or .ndjson) file, optionally ending in .gz.
+    @param fmt: "csv" or "jsonl"; inferred from the file name if None.
+    @return: A generator of tuples (missing fields are None).
+    """
+    fmt = fmt or ("jsonl" if re.search(r"\.(jsonl|ndjson)(\.gz)?$", path) else "csv")
+    with _open_text(path) as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            fields = _resolve_fields(header)
+            columns = {field: header.index(name) if name is not None else None for field, name in fields.items()}
+            for row in reader:
+                yield tuple(row[i] if i is not None and i < len(row) else None
+                            for i in (columns["source"], columns["relation"], columns["target"], columns["confidence"]))
+        else:
+            fields = None
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if fields is None or any(name is not None and name not in record for name in fields.values()):
+                    fields = _resolve_fields(record)
+                yield tuple(record.get(fields[field]) if fields[field] is not None else None
+                            for field in ("source", "relation", "target", "confidence"))
+
+
+class EdgeListBuilder:
+    """
+    Accumulates a deduplicated graph from streamed edge rows, in compact arrays.
+
+    Entities are deduplicated case-insensitively after normalization (the first spelling seen is kept).
+    Edges are unique per (source, target), as in the app's DiGraph. Repeated rows for the same relation
+    have their confidences merged. A row for the same pair with a different relation is counted as a
+    conflict and dropped.
+    """
+
+    def __init__(self, merge="max"):
+        """
+        @param merge: How duplicate confidences are combined: "max", "mean" or "noisy_or" (1 - prod(1 - c)).
+        """
+        if merge not in MERGE_STRATEGIES:
+            raise ValueError(f"Unknown merge strategy '{merge}'. Use one of: {', '.join(MERGE_STRATEGIES)}.")
+        self.merge = merge
+        self.names = []
+        self.relations = []
+        self._node_ids = {}
+        self._relation_ids = {}
+        self._edge_ids = {}
+        self.sources = array("i")
+        self.targets = array("i")
+        self.relation_ids = array("i")
+        self._accumulated = array("d")  # max, sum or product of (1 - c), depending on the strategy
+        self._counts = array("i")  # confidences seen per edge
+        self.stats = {"rows": 0, "skipped": 0, "duplicates": 0, "conflicts": 0}
+
+    def _node(self, name):
+        key = name.casefold()
+        node = self._node_ids.get(key)
+        if node is None:
+            node = self._node_ids[key] = len(self.names)
+            self.names.append(name)
+        return node
+
+    def _relation(self, relation):
+        rel = self._relation_ids.get(relation)
+        if rel is None:
+            rel = self._relation_ids[relation] = len(self.relations)
+            self.relations.append(relation)
+        return rel
+
+    def add_rows(self, rows):
+        """
+        Merge a chunk of rows into the graph.
+
+        @param rows: Iterable of (source, relation, target, confidence) tuples of raw values.
+        @return: None
+        """
+        merge, accumulated, counts = self.merge, self._accumulated, self._counts
+        for source, relation, target, confidence in rows:
+            self.stats["rows"] += 1
+            source = normalize_entity(source) if source is not None else ""
+            target = normalize_entity(target) if target is not None else ""
+            if not source or not target:
+                self.stats["skipped"] += 1
+                continue
+            confidence = _parse_confidence(confidence)
+            rel = self._relation(normalize_relation(relation) if relation is not None else None)
+            u, v = self._node(source), self._node(target)
+
+            key = (u << 32) | v
+            edge = self._edge_ids.get(key)
+            if edge is None:
+                self._edge_ids[key] = len(self.sources)
+                self.sources.append(u)
+                self.targets.append(v)
+                self.relation_ids.append(rel)
+                if confidence is None:
+                    accumulated.append(0.0)
+                    counts.append(0)
+                else:
+                    accumulated.append(1.0 - confidence if merge == "noisy_or" else confidence)
+                    counts.append(1)
+                continue
+            if self.relation_ids[edge] != rel:
+                self.stats["conflicts"] += 1
+                continue
+            self.stats["duplicates"] += 1
+            if confidence is None:
+                continue
+            if counts[edge] == 0:
+                accumulated[edge] = 1.0 - confidence if merge == "noisy_or" else confidence
+            elif merge == "max":
+                accumulated[edge] = max(accumulated[edge], confidence)
+            elif merge == "mean":
+                accumulated[edge] += confidence
+            else:
+                accumulated[edge] *= 1.0 - confidence
+            counts[edge] += 1
+
+    def confidences(self):
+        """
+        @return: The merged confidence per edge (NaN where no row had a score).
+        """
+        merged = []
+        for value, count in zip(self._accumulated, self._counts):
+            if count == 0:
+                merged.append(math.nan)
+            elif self.merge == "mean":
+                merged.append(value / count)
+            elif self.merge == "noisy_or":
+                merged.append(1.0 - value)
+            else:
+                merged.append(value)
+        return merged
+
+    def build_snapshot(self):
+        """
+        @return: The GraphSnapshot of everything added so far, with its graph version computed.
+        """
+        snapshot = GraphSnapshot.from_edges(self.names, self.relations, self.sources, self.targets,
+                                            self.relation_ids, self.confidences())
+        snapshot.version = snapshot.compute_version()
+        return snapshot
+
+
+def _parse_confidence(value):
+    if value is None or value == "":
+        return None
+    try:
+        confidence = float(value)
+    except (TypeError, ValueError):
+        return None
+    if confidence != confidence:
+        return None
+    return min(max(confidence, 0.0), 1.0)
+
+
+def import_edge_list(path, output=None, fmt=None, merge="max", chunk_size=IMPORT_CHUNK_SIZE, export_gml=False,
+                     progress=True):
+    """
+    Import an edge list into a graph snapshot.
+
+    @param path: Path of the CSV/JSONL edge list (optionally .gz).
+    @param output: Snapshot path to write (defaults to the app's snapshot, next to `GRAPH_PATH`).
+    @param fmt: "csv" or "jsonl"; inferred from the file name if None.
+    @param merge: Confidence merge strategy for duplicate edges (see `MERGE_STRATEGIES`).
+    @param chunk_size: Rows merged per chunk (progress is reported per chunk).
+    @param export_gml: Also write a GML export next to the snapshot (materializes the graph in NetworkX).
+    @param progress: Print progress and the final report.
+    @return: A report dictionary: row counts, nodes, edges, graph_version, seconds and rows_per_s.
+    """
+    output = output or snapshot_path(GRAPH_PATH)
+    builder = EdgeListBuilder(merge=merge)
+    start = time.perf_counter()
+    rows = iter_edge_rows(path, fmt)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        builder.add_rows(chunk)
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"📥 {builder.stats['rows']:,} rows, {len(builder.sources):,} edges "
+                  f"({builder.stats['rows'] / elapsed:,.0f} rows/s)", file=sys.stderr)
+    read_seconds = time.perf_counter() - start
+
+    snapshot = builder.build_snapshot()
+    if export_gml:
+        # Written first, so the export is never newer than the snapshot (which would trigger a re-import)
+        import networkx as nx
+        nx.write_gml(snapshot.to_networkx(), os.path.splitext(output)[0] + ".gml")
+    snapshot.save(output)
+    seconds = time.perf_counter() - start
+
+    report = dict(builder.stats, nodes=snapshot.num_nodes, edges=snapshot.num_edges, graph_version=snapshot.version,
+                  output=output, seconds=round(seconds, 3), rows_per_s=round(builder.stats["rows"] / seconds, 1),
+                  read_rows_per_s=round(builder.stats["rows"] / read_seconds, 1) if read_seconds else None)
+    if progress:
+        print(f"✅ Imported {report['rows']:,} rows into {report['nodes']:,} nodes / {report['edges']:,} edges "
+              f"in {report['seconds']}s ({report['rows_per_s']:,.0f} rows/s): {report['duplicates']:,} duplicates "
+              f"merged, {report['conflicts']:,} conflicts, {report['skipped']:,} skipped -> {output}",
+              file=sys.stderr)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a CSV/JSONL edge list into the Marvel graph snapshot.")
+    parser.add_argument("path", help="Edge list (.csv, .jsonl or .ndjson, optionally .gz)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Input format (inferred from the file name)")
+    parser.add_argument("--merge", choices=MERGE_STRATEGIES, default="max", help="Duplicate confidence merge")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows merged per chunk")
+    parser.add_argument("--output", help="Snapshot path (default: the app's graphs/marvel_graph.bin)")
+    parser.add_argument("--export-gml", action="store_true", help="Also write a GML export next to the snapshot")
+    parser.add_argument("--report", help="Write the import report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = import_edge_list(args.path, output=args.output, fmt=args.format, merge=args.merge,
+                              chunk_size=args.chunk_size, export_gml=args.export_gml)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import re
+
+from config import LOW_CONFIDENCE_THRESHOLD
+from graph_utils import infer_entity_labels
+
+# Question keywords for each kind of single-hop lookup
+_TEAM_WORDS = re.compile(r"\b(team|teams|member|members|belong|belongs|part of|join|joined)\b")
+_GENE_WORDS = re.compile(r"\b(gene|genes|mutation|mutations)\b")
+_POWER_WORDS = re.compile(r"\b(power|powers|ability|abilities)\b")
+_WHO_WORDS = re.compile(r"\b(who|which character|which characters|which mutant|which mutants)\b")
+# Anything that asks for reasoning beyond one hop goes to the LLM
+_COMPLEX_WORDS = re.compile(
+    r"\b(why|how|trace|path|link|links|linked|connect|connects|connected|compare|versus|vs|explain|describe|"
+    r"relationship|history|stronger|weaker|friend|rival|mother|partner)\b"
+)
+
+# (relation, direction) -> (certain, hedged) sentence templates
+_TEMPLATES = {
+    "member_of": ("{s} is a member of the {o}", "{s} is possibly a member of the {o}"),
+    "possesses_power": ("{s} possesses the power of {o}", "{s} possibly possesses the power of {o}"),
+    "has_mutation": ("{s} has the {o}", "{s} possibly has the {o}"),
+    "confers": ("The {s} confers {o}", "The {s} possibly confers {o}"),
+}
+
+
+class GraphLookup:
+    """
+    Answers single-hop lookups (member_of, possesses_power, has_mutation, confers) straight from the DiGraph.
+
+    Handles one entity per question, in either direction ("Which team is Jean Grey a member of?",
+    "Which character has the Magnetism Gene?"). Returns None for anything else, so the caller can
+    fall back to the LLM path.
+    """
+
+    def __init__(self, graph, matcher):
+        """
+        @param graph: The NetworkX DiGraph with 'relation' and 'confidence' edge attributes.
+        @param matcher: An EntityMatcher that knows the graph node labels (see `build_entity_matcher`).
+        """
+        self.graph = graph
+        self.matcher = matcher
+        self.labels = infer_entity_labels(graph)
+
+    def _resolve(self, question):
+        """
+        Map a question to a single lookup.
+
+        @param question: The raw user question.
+        @return: A tuple (entity, relation, direction) with direction "out" or "in", or None.
+        """
+        q = question.lower()
+        if _COMPLEX_WORDS.search(q):
+            return None
+        entities = [e for e in self.matcher.find(question) if e in self.graph]
+        if len(entities) != 1:
+            return None
+        entity = entities[0]
+        label = self.labels.get(entity)
+
+        team, gene, power, who = (bool(p.search(q)) for p in (_TEAM_WORDS, _GENE_WORDS, _POWER_WORDS, _WHO_WORDS))
+        if label == "CHARACTER":
+            if team and not (gene or power):
+                return entity, "member_of", "out"
+            if gene and not team:
+                return entity, "has_mutation", "out"
+            if power and not (team or gene):
+                return entity, "possesses_power", "out"
+        elif label == "TEAM" and (who or team) and not (gene or power):
+            return entity, "member_of", "in"
+        elif label == "GENE":
+            if who and not team:
+                return entity, "has_mutation", "in"
+            if power and not (team or who):
+                return entity, "confers", "out"
+        elif label == "POWER":
+            if gene and not (team or who):
+                return entity, "confers", "in"
+            if who and not (team or gene):
+                return entity, "possesses_power", "in"
+        return None
+
+    def _facts(self, entity, relation, direction):
+        if direction == "out":
+            edges = [(entity, v, d) for _, v, d in self.graph.out_edges(entity, data=True)]
+        else:
+            edges = [(u, entity, d) for u, _, d in self.graph.in_edges(entity, data=True)]
+        return [(u, v, d.get("confidence", 1.0)) for u, v, d in edges if d.get("relation") == relation]
+
+    def answer(self, question, bios_dict=None):
+        """
+        Answer a question from the graph if it is a supported single-hop lookup.
+
+        Facts below `LOW_CONFIDENCE_THRESHOLD` are phrased with uncertainty and quote their score, like the LLM
+        path is instructed to do. Characters with a bio get it first, in the same format as the LLM answers.
+
+        @param question: The raw user question.
+        @param bios_dict: Optional character -> bio dictionary.
+        @return: The formatted answer, or None if the question needs the LLM path.
+        """
+        resolved = self._resolve(question)
+        if resolved is None:
+            return None
+        entity, relation, direction = resolved
+        facts = self._facts(entity, relation, direction)
+        if not facts:
+            return None
+
+        certain, hedged = _TEMPLATES[relation]
+        sentences = []
+        for s, o, confidence in sorted(facts, key=lambda f: -f[2]):
+            if confidence is not None and confidence < LOW_CONFIDENCE_THRESHOLD:
+                sentences.append(hedged.format(s=s, o=o) + f" (confidence: {confidence:.2f}).")
+            else:
+                sentences.append(certain.format(s=s, o=o) + ".")
+
+        characters = [entity] if direction == "out" and self.labels.get(entity) == "CHARACTER" else \
+            [s for s, _, _ in facts if self.labels.get(s) == "CHARACTER"]
+        bios = [f"{c}: {bios_dict[c]}" for c in dict.fromkeys(characters) if bios_dict and c in bios_dict]
+        answer = "🧠 Answer:\n" + " ".join(sentences)
+        if bios:
+            answer = "🧬 Biography:\n" + "\n".join(bios) + "\n\n" + answer
+        return answer
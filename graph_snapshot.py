@@ -0,0 +1,409 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"MVGSNAP1"
+FORMAT_VERSION = 2
+# Confidences are stored as float32 (~7 significant digits) and rounded to this many decimals when read back,
+# so scores such as 0.95 come back exactly as written
+CONFIDENCE_DECIMALS = 6
+_ALIGN = 64
+
+
+def _align(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class GraphSnapshot:
+    """
+    Compact, read-only binary form of the Marvel graph.
+
+    Nodes are interned to integer ids, relations to a small vocabulary, adjacency is kept in CSR
+    arrays (outgoing edges, plus a reverse index with the source of each incoming edge) and confidences
+    as float32.
+    Snapshots load by memory-mapping the file, so opening one costs a header read whatever the
+    graph size; node names are decoded on first use.
+
+    Only the 'relation' and 'confidence' edge attributes are kept (the ones the app uses).
+    """
+
+    def __init__(self, arrays, relations, version, directed=True):
+        """
+        @param arrays: Dictionary of the snapshot arrays (name_offsets, name_bytes, indptr, targets,
+                       relation_ids, confidence, in_indptr, in_edge_ids, in_sources).
+        @param relations: Relation vocabulary; `relation_ids` index into it (None = no relation attribute).
+        @param version: The graph version (see `graph_utils.compute_graph_version`).
+        @param directed: Whether the source graph was directed.
+        """
+        self.name_offsets = arrays["name_offsets"]
+        self.name_bytes = arrays["name_bytes"]
+        self.indptr = arrays["indptr"]
+        self.targets = arrays["targets"]
+        self.relation_ids = arrays["relation_ids"]
+        self.confidence = arrays["confidence"]
+        self.in_indptr = arrays["in_indptr"]
+        self.in_edge_ids = arrays["in_edge_ids"]
+        self.in_sources = arrays["in_sources"]
+        self.relations = list(relations)
+        self.version = version
+        self.directed = directed
+        self._names = None
+        self._ids = None
+
+    @classmethod
+    def from_networkx(cls, graph, version=None):
+        """
+        Build a snapshot from a NetworkX graph.
+
+        @param graph: A NetworkX graph with 'relation' and 'confidence' edge attributes.
+        @param version: Optional graph version to store in the snapshot.
+        @return: The GraphSnapshot.
+        """
+        ids = {node: i for i, node in enumerate(graph.nodes)}
+        relation_index = {}
+        sources, targets, relation_ids, confidence = [], [], [], []
+        for u, v, data in graph.edges(data=True):
+            sources.append(ids[u])
+            targets.append(ids[v])
+            relation_ids.append(relation_index.setdefault(data.get("relation"), len(relation_index)))
+            value = data.get("confidence")
+            confidence.append(np.nan if value is None else value)
+        return cls.from_edges([str(node) for node in graph.nodes], list(relation_index), sources, targets,
+                              relation_ids, confidence, version=version, directed=graph.is_directed())
+
+    @classmethod
+    def from_edges(cls, names, relations, sources, targets, relation_ids, confidence, version=None, directed=True):
+        """
+        Build a snapshot from interned edge arrays (any order; edges are grouped by source here).
+
+        @param names: Node names, indexed by node id.
+        @param relations: Relation vocabulary (None = no relation attribute).
+        @param sources: Source node id per edge.
+        @param targets: Target node id per edge.
+        @param relation_ids: Index into `relations` per edge.
+        @param confidence: Confidence per edge (NaN = no confidence attribute).
+        @param version: Optional graph version to store in the snapshot.
+        @param directed: Whether the graph is directed.
+        @return: The GraphSnapshot.
+        """
+        if len(names) >= 2 ** 31 or len(sources) >= 2 ** 31:
+            raise ValueError("Graph is too large for a snapshot (int32 node and edge ids).")
+        if len(relations) >= 2 ** 16:
+            raise ValueError("Too many distinct relations for a snapshot (uint16 relation ids).")
+
+        encoded = [name.encode("utf-8") for name in names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=name_offsets[1:])
+        name_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        sources = np.asarray(sources, dtype=np.int32)
+        order = np.argsort(sources, kind="stable")
+        sources, targets = sources[order], np.asarray(targets, dtype=np.int32)[order]
+        in_edge_ids = np.argsort(targets, kind="stable").astype(np.int32)
+        arrays = {
+            "name_offsets": name_offsets,
+            "name_bytes": name_bytes,
+            "indptr": _indptr(sources, len(names)),
+            "targets": targets,
+            "relation_ids": np.asarray(relation_ids, dtype=np.uint16)[order],
+            "confidence": np.asarray(confidence, dtype=np.float32)[order],
+            "in_indptr": _indptr(targets, len(names)),
+            "in_edge_ids": in_edge_ids,
+            "in_sources": sources[in_edge_ids],
+        }
+        return cls(arrays, relations, version, directed=directed)
+
+    def save(self, path):
+        """
+        Write the snapshot atomically (temporary file + rename), so readers never see a partial file.
+
+        Layout: magic, header length, JSON header (version, relations, array specs), then each array
+        aligned to 64 bytes.
+
+        @param path: The snapshot file path.
+        @return: None
+        """
+        arrays = {
+            "name_offsets": self.name_offsets, "name_bytes": self.name_bytes, "indptr": self.indptr,
+            "targets": self.targets, "relation_ids": self.relation_ids, "confidence": self.confidence,
+            "in_indptr": self.in_indptr, "in_edge_ids": self.in_edge_ids, "in_sources": self.in_sources,
+        }
+        specs, offset = {}, 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            arrays[name] = array
+            specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        header = json.dumps({
+            "format": FORMAT_VERSION,
+            "graph_version": self.version,
+            "directed": self.directed,
+            "relations": self.relations,
+            "arrays": specs,
+        }).encode("utf-8")
+        data_start = _align(len(MAGIC) + 8 + len(header))
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+                for name, array in arrays.items():
+                    f.seek(data_start + specs[name]["offset"])
+                    f.write(array.tobytes())
+                f.truncate(data_start + offset)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a snapshot by memory-mapping it.
+
+        @param path: The snapshot file path.
+        @return: The GraphSnapshot.
+        @raise ValueError: If the file is not a snapshot or was written by another format version.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a graph snapshot.")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} uses snapshot format {header.get('format')}, expected {FORMAT_VERSION}.")
+
+        data_start = _align(len(MAGIC) + 8 + header_len)
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            start = data_start + spec["offset"]
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return cls(arrays, header["relations"], header["graph_version"], directed=header["directed"])
+
+    @property
+    def num_nodes(self):
+        return len(self.name_offsets) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    @property
+    def names(self):
+        """
+        @return: The node names, indexed by node id (decoded on first use).
+        """
+        if self._names is None:
+            blob = self.name_bytes.tobytes()
+            offsets = self.name_offsets.tolist()
+            self._names = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(self.num_nodes)]
+        return self._names
+
+    def node_id(self, name):
+        """
+        @param name: A node name.
+        @return: The node's integer id, or None if the graph has no such node.
+        """
+        if self._ids is None:
+            self._ids = {n: i for i, n in enumerate(self.names)}
+        return self._ids.get(name)
+
+    def __contains__(self, name):
+        return self.node_id(name) is not None
+
+    def _edge(self, edge, other):
+        relation = self.relations[self.relation_ids[edge]]
+        confidence = float(self.confidence[edge])
+        confidence = None if confidence != confidence else round(confidence, CONFIDENCE_DECIMALS)
+        return self.names[other], relation, confidence
+
+    def out_edges(self, name):
+        """
+        @param name: A node name.
+        @return: A list of (target, relation, confidence) tuples for the node's outgoing edges
+                 (relation/confidence are None when the edge has no such attribute).
+        """
+        node = self.node_id(name)
+        if node is None:
+            return []
+        return [self._edge(e, self.targets[e]) for e in range(self.indptr[node], self.indptr[node + 1])]
+
+    def in_edges(self, name):
+        """
+        @param name: A node name.
+        @return: A list of (source, relation, confidence) tuples for the node's incoming edges.
+        """
+        node = self.node_id(name)
+        if node is None:
+            return []
+        span = slice(self.in_indptr[node], self.in_indptr[node + 1])
+        return [self._edge(e, s) for e, s in zip(self.in_edge_ids[span].tolist(), self.in_sources[span].tolist())]
+
+    def degree(self, name):
+        """
+        @param name: A node name.
+        @return: A tuple (out_degree, in_degree), read straight from the CSR offsets.
+        """
+        node = self.node_id(name)
+        if node is None:
+            return 0, 0
+        return int(self.indptr[node + 1] - self.indptr[node]), int(self.in_indptr[node + 1] - self.in_indptr[node])
+
+    def _incident(self, node, direction):
+        """
+        @return: A list of ("out"|"in", edge ids, other endpoint ids) array triples for one node.
+        """
+        incident = []
+        if direction in ("out", "both"):
+            edges = np.arange(self.indptr[node], self.indptr[node + 1])
+            incident.append(("out", edges, self.targets[edges]))
+        if direction in ("in", "both"):
+            span = slice(self.in_indptr[node], self.in_indptr[node + 1])
+            incident.append(("in", self.in_edge_ids[span], self.in_sources[span]))
+        return incident
+
+    def _neighborhood_batches(self, start, hops, direction, relations, min_confidence):
+        """
+        Breadth-first expansion in array batches: one (hop, direction, node, edge ids, other ids) per node and
+        direction, filtered and with edges already seen (self-loops, edges between frontier nodes) removed.
+        """
+        allowed = None
+        if relations is not None:
+            allowed = np.array([i for i, r in enumerate(self.relations) if r in relations], dtype=self.relation_ids.dtype)
+        seen = np.zeros(self.num_edges, dtype=bool)
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        visited[start] = True
+
+        frontier = [start]
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for node in frontier:
+                for edge_direction, edges, others in self._incident(node, direction):
+                    mask = ~seen[edges]
+                    if allowed is not None:
+                        mask &= np.isin(self.relation_ids[edges], allowed)
+                    if min_confidence is not None:
+                        mask &= ~(self.confidence[edges] < min_confidence)  # NaN (no score) passes
+                    edges, others = edges[mask], others[mask]
+                    if not len(edges):
+                        continue
+                    seen[edges] = True
+                    fresh = others[~visited[others]] if hop < hops else others[:0]
+                    if len(fresh):
+                        fresh = fresh[np.sort(np.unique(fresh, return_index=True)[1])]
+                        visited[fresh] = True
+                        next_frontier.extend(fresh.tolist())
+                    yield hop, edge_direction, node, edges, others
+            frontier = next_frontier
+            if not frontier:
+                break
+
+    def neighborhood(self, name, hops=1, direction="both", relations=None, min_confidence=None, offset=0):
+        """
+        Walk the edges around a node breadth-first, in a stable order (hop, then CSR order).
+
+        Filtering, de-duplication and skipping to `offset` work on whole arrays per node; only the edges
+        actually consumed are turned into dictionaries, so any page around a hub (e.g., a team with
+        thousands of members) is cheap to produce.
+
+        @param name: The start node name.
+        @param hops: Number of hops to expand.
+        @param direction: "out", "in" or "both".
+        @param relations: Optional collection of relation names to keep.
+        @param min_confidence: Optional minimum confidence (edges without a score always pass).
+        @param offset: Number of edges to skip (for pagination).
+        @return: A generator of dictionaries with entity, relation, confidence, direction, hop and via
+                 (the node the edge was reached from).
+        """
+        start = self.node_id(name)
+        if start is None:
+            return
+        for hop, edge_direction, node, edges, others in self._neighborhood_batches(start, hops, direction, relations,
+                                                                                    min_confidence):
+            if offset >= len(edges):
+                offset -= len(edges)
+                continue
+            via = self.names[node]
+            for chunk in range(offset, len(edges), 256):
+                for edge, other in zip(edges[chunk:chunk + 256].tolist(), others[chunk:chunk + 256].tolist()):
+                    entity, relation, confidence = self._edge(edge, other)
+                    yield {"entity": entity, "relation": relation, "confidence": confidence,
+                           "direction": edge_direction, "hop": hop, "via": via}
+            offset = 0
+
+    def _confidences(self):
+        """
+        @return: The confidences as Python floats, rounded as readers see them (NaN = no score).
+        """
+        return np.round(self.confidence.astype(np.float64), CONFIDENCE_DECIMALS).tolist()
+
+    def compute_version(self):
+        """
+        Hash the snapshot exactly like `graph_utils.compute_graph_version(self.to_networkx())`, without
+        materializing the NetworkX graph (edges are ordered by sorting node ranks, not name tuples).
+
+        @return: A short hex digest identifying this version of the graph.
+        """
+        names = self.names
+        order = sorted(range(self.num_nodes), key=names.__getitem__)
+        rank = np.empty(self.num_nodes, dtype=np.int64)
+        rank[order] = np.arange(self.num_nodes)
+
+        h = hashlib.sha256()
+        for i in order:
+            h.update(f"n|{names[i]}\n".encode("utf-8"))
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+        targets = self.targets.tolist()
+        relations = [("related_to" if r is None else str(r)) for r in self.relations]
+        relation_ids = self.relation_ids.tolist()
+        confidence = self._confidences()
+        for e in np.lexsort((rank[self.targets], rank[sources])).tolist():
+            conf = confidence[e]
+            conf = "None" if conf != conf else repr(conf)
+            u, v = names[sources[e]], names[targets[e]]
+            h.update(f"e|{u}|{relations[relation_ids[e]]}|{v}|{conf}\n".encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    def to_networkx(self):
+        """
+        Materialize the snapshot as a NetworkX graph (same node and edge order as the source graph).
+
+        @return: A DiGraph (or Graph, for undirected sources) with 'relation' and 'confidence' edge attributes.
+        """
+        import networkx as nx
+
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        names = self.names
+        graph.add_nodes_from(names)
+        indptr = self.indptr.tolist()
+        targets = self.targets.tolist()
+        relations = [self.relations[r] for r in self.relation_ids.tolist()]
+        confidence = self._confidences()
+
+        edges = []
+        for u in range(self.num_nodes):
+            for e in range(indptr[u], indptr[u + 1]):
+                data = {}
+                if relations[e] is not None:
+                    data["relation"] = relations[e]
+                if confidence[e] == confidence[e]:  # NaN = no confidence attribute
+                    data["confidence"] = confidence[e]
+                edges.append((names[u], names[targets[e]], data))
+        graph.add_edges_from(edges)
+        return graph
+
+
+def _indptr(node_ids, num_nodes):
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(node_ids, minlength=num_nodes), out=indptr[1:])
+    return indptr
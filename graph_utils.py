@@ -1,12 +1,24 @@
 
-from typing import List, Optional
-from llama_index.core.schema import Document
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
+import hashlib
 import os
-import networkx as nx
-import matplotlib.pyplot as plt
+import threading
+
+from document_index import DocumentIndex
+from graph_snapshot import GraphSnapshot
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import Document
+
+GRAPH_PATH = os.path.join("graphs", "marvel_graph.gml")
+
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
 
 def build_and_save_mock_marvel_graph(draw=False):
+    import networkx as nx
+
     G = nx.DiGraph()
 
     # --- Character → Power relationships ---
@@ -51,8 +63,7 @@ def build_and_save_mock_marvel_graph(draw=False):
     G.add_edge("Shapeshift Gene", "Shapeshifting", relation="confers", confidence=0.9)
 
     # --- Save ---
-    os.makedirs("graphs", exist_ok=True)
-    nx.write_gml(G, "graphs/marvel_graph.gml")
+    save_graph(G, GRAPH_PATH)
     print("✅ Graph saved to 'graphs/marvel_graph.gml' with confidence scores.")
 
     if draw:
@@ -62,7 +73,11 @@ def build_and_save_mock_marvel_graph(draw=False):
 
 
 def draw_graph_with_confidence(G):
-    pos = nx.spring_layout(G, seed=42)
+    import matplotlib.pyplot as plt
+    import networkx as nx
+    from graph_viz import networkx_layout
+
+    pos = networkx_layout(G)
     edge_labels = {}
     for edge in G.edges:
         rel = G.edges[edge].get('relation', 'related_to')
@@ -76,17 +91,249 @@ def draw_graph_with_confidence(G):
     plt.show()
 
 
+def compute_graph_version(graph):
+    """
+    Compute a stable content hash of a graph's nodes and edges (relation and confidence included).
+
+    The hash only depends on graph content, not on node insertion order, so it can be used
+    to key caches that must be invalidated whenever the graph changes.
+
+    @param graph: A NetworkX graph.
+    @return: A short hex digest identifying this version of the graph.
+    """
+    h = hashlib.sha256()
+    for node in sorted(str(n) for n in graph.nodes):
+        h.update(f"n|{node}\n".encode('utf-8'))
+    edges = sorted(
+        (str(u), str(v), str(data.get('relation', 'related_to')), repr(data.get('confidence')))
+        for u, v, data in graph.edges(data=True)
+    )
+    for u, v, rel, conf in edges:
+        h.update(f"e|{u}|{rel}|{v}|{conf}\n".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def snapshot_path(path=GRAPH_PATH):
+    """
+    @param path: Path of the GML graph.
+    @return: Path of the binary snapshot written next to it (e.g., graphs/marvel_graph.bin).
+    """
+    return os.path.splitext(path)[0] + ".bin"
+
+
+def save_graph(graph, path=GRAPH_PATH):
+    """
+    Export a graph to GML and write its binary snapshot (the format the app loads) next to it.
+
+    @param graph: A NetworkX graph with 'relation' and 'confidence' edge attributes.
+    @param path: Path of the GML file.
+    @return: The GraphSnapshot that was written.
+    """
+    import networkx as nx
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    nx.write_gml(graph, path)
+    return _write_snapshot(graph, snapshot_path(path))
+
+
+def build_graph_snapshot(graph):
+    """
+    @param graph: A NetworkX graph with 'relation' and 'confidence' edge attributes.
+    @return: Its GraphSnapshot, with the graph version set.
+    """
+    snapshot = GraphSnapshot.from_networkx(graph)
+    # Hash what readers will see (confidences round-trip through float32)
+    snapshot.version = snapshot.compute_version()
+    return snapshot
+
+
+def save_graph_snapshot(graph, snapshot, path=GRAPH_PATH):
+    """
+    Write only the binary snapshot of a graph and make it the cached current graph.
+
+    Used for incremental updates: the GML export is left as it is (it is older than the snapshot, so it
+    is not re-imported), and readers get `graph` itself instead of a copy materialized from the file.
+
+    @param graph: A NetworkX graph with 'relation' and 'confidence' edge attributes.
+    @param snapshot: Its snapshot, from `build_graph_snapshot`.
+    @param path: Path of the GML graph (the snapshot is written next to it).
+    @return: None
+    """
+    bin_path = snapshot_path(path)
+    os.makedirs(os.path.dirname(bin_path) or ".", exist_ok=True)
+    with _graph_cache_lock:
+        snapshot.save(bin_path)
+        _graph_cache[bin_path] = {"stamp": _stamp(bin_path), "snapshot": GraphSnapshot.load(bin_path),
+                                  "version": snapshot.version, "graph": graph}
+
+
+def apply_edge_mutations(graph, upserts=(), removals=()):
+    """
+    Apply edge removals, then additions and updates, to a copy of a graph.
+
+    The input graph is not modified, so requests still reading it see a consistent graph. Removing an
+    edge also removes endpoints that are left without any edge. Several changes to the same edge in one
+    batch collapse into a single change (the last one wins).
+
+    @param graph: The current NetworkX DiGraph.
+    @param upserts: Iterable of (source, target, relation, confidence) edges to add or update
+                    (confidence may be None).
+    @param removals: Iterable of (source, target) edges to remove.
+    @return: A tuple (new_graph, changes, missing): changes is a list of (source, target, old_data, new_data)
+             for every edge that actually changed (old_data is None for additions, new_data for removals),
+             missing the number of removals that matched no edge.
+    """
+    new_graph = graph.copy()
+    original = {}
+    missing = 0
+    for u, v in removals:
+        if not new_graph.has_edge(u, v):
+            missing += 1
+            continue
+        original.setdefault((u, v), dict(new_graph.edges[u, v]))
+        new_graph.remove_edge(u, v)
+        for node in (u, v):
+            if node in new_graph and new_graph.degree(node) == 0:
+                new_graph.remove_node(node)
+    for u, v, relation, confidence in upserts:
+        data = {"relation": relation}
+        if confidence is not None:
+            # Rounded like the snapshot stores it, so this graph matches what other processes load
+            data["confidence"] = round(float(confidence), 6)
+        original.setdefault((u, v), dict(new_graph.edges[u, v]) if new_graph.has_edge(u, v) else None)
+        new_graph.add_edge(u, v)
+        new_graph.edges[u, v].clear()
+        new_graph.edges[u, v].update(data)
+
+    changes = []
+    for (u, v), old in original.items():
+        new = dict(new_graph.edges[u, v]) if new_graph.has_edge(u, v) else None
+        if new != old:
+            changes.append((u, v, old, new))
+    return new_graph, changes, missing
+
+
+def _write_snapshot(graph, path):
+    snapshot = build_graph_snapshot(graph)
+    snapshot.save(path)
+    return snapshot
+
+
+def _read_gml(path):
+    import networkx as nx
+    return nx.read_gml(path)
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def load_graph_snapshot(path=GRAPH_PATH):
+    """
+    Return the graph snapshot, memory-mapped once per process and reloaded only when the file changes.
+
+    GML is the import format: when the GML file is newer than the snapshot (or there is no snapshot yet),
+    it is parsed once and converted. A rewritten snapshot with the same graph version keeps the cached entry.
+
+    @param path: Path of the GML graph (the snapshot lives next to it, see `snapshot_path`).
+    @return: The cached entry, a dictionary with 'snapshot', 'version' and the lazily built 'graph',
+             or None if neither file exists.
+    """
+    bin_path = snapshot_path(path)
+    stamp = _stamp(bin_path)
+    with _graph_cache_lock:
+        cached = _graph_cache.get(bin_path)
+        if cached is not None and cached["stamp"] == stamp:
+            return cached
+
+        gml_stamp = _stamp(path)
+        if gml_stamp is not None and (stamp is None or gml_stamp[0] > stamp[0]):
+            _write_snapshot(_read_gml(path), bin_path)
+            stamp = _stamp(bin_path)
+        if stamp is None:
+            _graph_cache.pop(bin_path, None)
+            return None
+
+        try:
+            snapshot = GraphSnapshot.load(bin_path)
+        except ValueError:
+            if gml_stamp is None:
+                raise
+            # Written by an older snapshot format: convert the GML again
+            _write_snapshot(_read_gml(path), bin_path)
+            stamp = _stamp(bin_path)
+            snapshot = GraphSnapshot.load(bin_path)
+        if cached is not None and cached["version"] == snapshot.version:
+            cached.update(stamp=stamp, snapshot=snapshot)
+            return cached
+        entry = {"stamp": stamp, "snapshot": snapshot, "version": snapshot.version, "graph": None}
+        _graph_cache[bin_path] = entry
+        return entry
+
+
+def load_graph_cached(path=GRAPH_PATH):
+    """
+    Load the graph as a NetworkX DiGraph, materialized from the snapshot once per graph version.
+
+    @param path: Path of the GML graph (see `load_graph_snapshot`).
+    @return: A tuple (graph, graph_version, reloaded) where `reloaded` is True if the graph was built
+             on this call, or None if the graph does not exist.
+    """
+    entry = load_graph_snapshot(path)
+    if entry is None:
+        return None
+    with _graph_cache_lock:
+        reloaded = entry["graph"] is None
+        if reloaded:
+            entry["graph"] = entry["snapshot"].to_networkx()
+        return entry["graph"], entry["version"], reloaded
+
+
+def build_triplet_documents(triplet_texts):
+    """
+    Wrap triplet sentences in Documents whose ids are derived from their text.
+
+    Content-addressed ids keep the same sentence mapped to the same document (and index
+    source id) across requests and rebuilds.
+
+    Documents are created lazily, one per sentence consumed.
+
+    @param triplet_texts: Iterable of human-readable triplet sentences.
+    @return: A generator of Document objects.
+    """
+    from llama_index.core.schema import Document
+
+    for t in triplet_texts:
+        yield Document(text=t, id_=triplet_document_id(t))
+
+
+def triplet_document_id(triplet_text):
+    """
+    @param triplet_text: A humanized triplet sentence.
+    @return: The content-addressed id of its Document (e.g., "triplet-1a2b...").
+    """
+    return f"triplet-{hashlib.sha256(triplet_text.encode('utf-8')).hexdigest()[:16]}"
+
+
 def filter_documents_by_rules(
-    docs: List[Document],
+    docs: Iterable["Document"],
     include_keywords: Optional[List[str]] = None,
     exclude_keywords: Optional[List[str]] = None,
     max_documents: Optional[int] = 100
-) -> List[Document]:
+) -> List["Document"]:
     """
-    Filters a list of LlamaIndex Document objects based on keyword rules and document count.
+    Filters LlamaIndex Document objects based on keyword rules and document count.
+
+    Stops reading `docs` once `max_documents` documents are kept, so a lazy stream is only consumed
+    as far as needed. Given a DocumentIndex, the rules are answered from its posting lists instead of
+    scanning every document (same results, same order).
 
     Args:
-        docs: List of Document(text=...) instances.
+        docs: Iterable of Document(text=...) instances, or a DocumentIndex built over them.
         include_keywords: Only keep docs that contain ANY of these keywords (case-insensitive).
         exclude_keywords: Remove docs that contain ANY of these keywords (case-insensitive).
         max_documents: Optional limit to number of docs returned (after filtering). If None or large, returns all.
@@ -94,10 +341,15 @@ def filter_documents_by_rules(
     Returns:
         Filtered list of Document objects.
     """
+    if isinstance(docs, DocumentIndex):
+        return docs.filter(include_keywords, exclude_keywords, max_documents)
 
     filtered = []
 
     for doc in docs:
+        # Limit to top-N if needed
+        if max_documents is not None and len(filtered) >= max_documents:
+            break
         text = doc.text.lower()
 
         if include_keywords:
@@ -110,42 +362,109 @@ def filter_documents_by_rules(
 
         filtered.append(doc)
 
-    # Limit to top-N if needed
-    return filtered[:max_documents]
+    return filtered
 
 
-def extract_humanized_triplets_from_graph(graph):
+HUMANIZED_RELATIONS = {
+    "fights_against": "fights against",
+    "member_of": "is a member of",
+    "located_in": "is located in",
+    "wields": "wields",
+    "has_power": "has the power of",
+    "created_by": "was created by",
+    "enemy_of": "is an enemy of"
+}
+
+# Entity labels implied by each relation for its (source, target) endpoints
+RELATION_ENDPOINT_LABELS = {
+    "member_of": ("CHARACTER", "TEAM"),
+    "possesses_power": ("CHARACTER", "POWER"),
+    "has_mutation": ("CHARACTER", "GENE"),
+    "confers": ("GENE", "POWER"),
+    "friend_and_rival_of": ("CHARACTER", "CHARACTER"),
+    "mother_of": ("CHARACTER", "CHARACTER"),
+    "partner_of": ("CHARACTER", "CHARACTER"),
+}
+
+
+def humanize_triplet(u, v, data):
     """
-    Converts a NetworkX graph into a list of *human-readable* triplet sentences,
-    which are easier for the LLM to parse during path extraction.
+    Render a single graph edge as a human-readable triplet sentence.
+
+    @param u: The source node.
+    @param v: The target node.
+    @param data: The edge attributes ('relation' and optional 'confidence').
+    @return: The sentence, with a confidence note for facts below 0.95.
     """
-    triplets = []
+    rel_key = data.get('relation', 'related_to')
+    natural_rel = HUMANIZED_RELATIONS.get(rel_key, rel_key.replace("_", " "))
+
+    confidence = data.get('confidence')
+    confidence_note = ""
+    if confidence is not None and confidence < 0.95:
+        confidence_note = f" (confidence: {confidence:.2f})"
+
+    # Final human-readable sentence
+    return f"The entity {u} {natural_rel} the entity {v}.{confidence_note}"
 
-    relation_map = {
-        "fights_against": "fights against",
-        "member_of": "is a member of",
-        "located_in": "is located in",
-        "wields": "wields",
-        "has_power": "has the power of",
-        "created_by": "was created by",
-        "enemy_of": "is an enemy of"
-    }
 
+def extract_humanized_triplets_from_graph(graph):
+    """
+    Converts a NetworkX graph into *human-readable* triplet sentences,
+    which are easier for the LLM to parse during path extraction.
+
+    Sentences are yielded one edge at a time, so large graphs are never held as a list of sentences.
+    """
     for u, v, data in graph.edges(data=True):
-        rel_key = data.get('relation', 'related_to')
-        natural_rel = relation_map.get(rel_key, rel_key.replace("_", " "))
+        yield humanize_triplet(u, v, data)
 
-        confidence = data.get('confidence')
-        confidence_note = ""
-        if confidence is not None and confidence < 0.95:
-            confidence_note = f" (confidence: {confidence:.2f})"
 
-        # Final human-readable sentence
-        sentence = f"The entity {u} {natural_rel} the entity {v}.{confidence_note}"
-        triplets.append(sentence)
+def infer_entity_labels(graph):
+    """
+    Infer an entity label (CHARACTER, TEAM, GENE, POWER, ...) for every node from its edges.
 
-    return triplets
+    @param graph: A NetworkX DiGraph with 'relation' edge attributes.
+    @return: A dictionary mapping node name to label; nodes without a known relation get 'ENTITY'.
+    """
+    labels = {}
+    for u, v, data in graph.edges(data=True):
+        source_label, target_label = RELATION_ENDPOINT_LABELS.get(data.get('relation'), (None, None))
+        if source_label and u not in labels:
+            labels[u] = source_label
+        if target_label and v not in labels:
+            labels[v] = target_label
+    return labels
 
 
+def build_property_graph_nodes(graph, edges=None):
+    """
+    Convert graph edges straight into property-graph nodes, with no LLM path extraction.
+
+    Each edge becomes one triplet Document (the humanized sentence, used as source text) that
+    carries an EntityNode for each endpoint and a Relation in the metadata keys that
+    PropertyGraphIndex reads, exactly like the output of a path extractor.
 
+    @param graph: A NetworkX DiGraph with 'relation' and 'confidence' edge attributes.
+    @param edges: Optional (source, target, data) edges to convert instead of all of the graph's
+                  (entity labels are still inferred from the whole graph).
+    @return: A generator of Document objects ready to be passed to PropertyGraphIndex.
+    """
+    from llama_index.core.graph_stores.types import KG_NODES_KEY, KG_RELATIONS_KEY, EntityNode, Relation
+    from llama_index.core.schema import Document
 
+    labels = infer_entity_labels(graph)
+    for u, v, data in (graph.edges(data=True) if edges is None else edges):
+        relation = data.get('relation', 'related_to')
+        confidence = data.get('confidence')
+        properties = {"relation": relation}
+        if confidence is not None:
+            properties["confidence"] = confidence
+
+        source = EntityNode(name=str(u), label=labels.get(u, "ENTITY"))
+        target = EntityNode(name=str(v), label=labels.get(v, "ENTITY"))
+        doc = next(build_triplet_documents([humanize_triplet(u, v, data)]))
+        doc.metadata[KG_NODES_KEY] = [source, target]
+        doc.metadata[KG_RELATIONS_KEY] = [
+            Relation(label=relation, source_id=source.id, target_id=target.id, properties=properties)
+        ]
+        yield doc
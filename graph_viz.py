@@ -0,0 +1,442 @@
+import html
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cache_utils import CACHE_DIR
+from config import LAYOUT_ITERATIONS, LAYOUT_INCREMENTAL_ITERATIONS, LAYOUT_INCREMENTAL_MAX_CHANGED, \
+    LAYOUT_EXACT_MAX_NODES, VIZ_MAX_NODES, VIZ_MAX_EDGES, VIZ_CACHE_MAX_ENTRIES
+from graph_utils import RELATION_ENDPOINT_LABELS
+from metrics import debug_print, span
+
+LAYOUT_DIR = os.path.join(CACHE_DIR, "layouts")
+
+# Display name and color per entity label (same palette as the original static visualization)
+LABEL_STYLES = {
+    "CHARACTER": ("Character", "#1f78b4"),
+    "POWER": ("Power", "#ff7f00"),
+    "TEAM": ("Team", "#6a3d9a"),
+    "GENE": ("Gene", "#33a02c"),
+}
+OTHER_STYLE = ("Other", "#b2df8a")
+
+# Positions come from the server-side layout, so client-side physics is off
+VIS_OPTIONS = {
+    "physics": {"enabled": False},
+    "interaction": {"hover": True, "tooltipDelay": 100, "zoomView": True, "dragView": True},
+    "nodes": {"shape": "dot", "size": 16, "font": {"size": 20, "face": "arial"}},
+    "edges": {"arrows": {"to": {"enabled": True, "scaleFactor": 0.6}}, "font": {"size": 14, "align": "middle"},
+              "smooth": False},
+}
+
+# Canvas pixels per sqrt(node): keeps the average spacing constant as the graph grows
+_PIXELS_PER_NODE = 150
+
+HTML_TEMPLATE = """<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <link rel="stylesheet" href="/lib/vis-9.1.2/vis-network.css">
+    <script src="/lib/vis-9.1.2/vis-network.min.js"></script>
+    <style type="text/css">
+        body {{ font-family: arial, sans-serif; margin: 0; }}
+        #caption {{ padding: 8px 12px; color: #444; }}
+        #mynetwork {{ width: 100%; height: 900px; background-color: #ffffff; border: 1px solid lightgray; }}
+    </style>
+</head>
+<body>
+    <div id="caption">{caption}</div>
+    <div id="mynetwork"></div>
+    <script type="text/javascript">
+        var view = {data};
+        var network = new vis.Network(document.getElementById('mynetwork'),
+            {{nodes: new vis.DataSet(view.nodes), edges: new vis.DataSet(view.edges)}}, {options});
+        network.fit();
+    </script>
+</body>
+</html>
+"""
+
+
+def edge_sources(snapshot):
+    """
+    @param snapshot: A GraphSnapshot.
+    @return: The source node id of every edge, aligned with `snapshot.targets` (expanded from the CSR offsets).
+    """
+    return np.repeat(np.arange(snapshot.num_nodes, dtype=np.int64), np.diff(snapshot.indptr))
+
+
+def snapshot_labels(snapshot):
+    """
+    Infer an entity label for every node from the relations of its edges (see `infer_entity_labels`).
+
+    @param snapshot: A GraphSnapshot.
+    @return: A list of labels indexed by node id ('ENTITY' for nodes without a known relation).
+    """
+    labels = [None] * snapshot.num_nodes
+    sources = edge_sources(snapshot)
+    for relation_id, relation in enumerate(snapshot.relations):
+        source_label, target_label = RELATION_ENDPOINT_LABELS.get(relation, (None, None))
+        edges = np.flatnonzero(snapshot.relation_ids == relation_id)
+        for label, nodes in ((source_label, sources[edges]), (target_label, snapshot.targets[edges])):
+            if label is None:
+                continue
+            for node in np.unique(nodes).tolist():
+                if labels[node] is None:
+                    labels[node] = label
+    return [label or "ENTITY" for label in labels]
+
+
+def _repulsion(pos, rows, k):
+    """
+    Fruchterman-Reingold repulsion (k^2 / d) on the `rows` nodes.
+
+    Exact against every node up to LAYOUT_EXACT_MAX_NODES; beyond that, each node is repelled by the
+    centroids of a grid of cells weighted by their node counts, which is O(n^1.5) instead of O(n^2).
+    """
+    num_nodes = len(pos)
+    if num_nodes <= LAYOUT_EXACT_MAX_NODES:
+        others, weights = pos, None
+    else:
+        side = max(2, math.ceil(num_nodes ** 0.25))
+        lo = pos.min(axis=0)
+        extent = float((pos.max(axis=0) - lo).max()) or 1.0
+        cells = np.minimum(((pos - lo) / extent * side).astype(np.int64), side - 1)
+        cell_ids = cells[:, 0] * side + cells[:, 1]
+        weights = np.bincount(cell_ids, minlength=side * side).astype(np.float64)
+        occupied = weights > 0
+        others = np.stack([np.bincount(cell_ids, weights=pos[:, axis], minlength=side * side)[occupied]
+                           for axis in (0, 1)], axis=1) / weights[occupied, None]
+        weights = weights[occupied]
+
+    disp = np.empty((len(rows), 2))
+    min_d2 = (0.01 * k) ** 2
+    x, y = pos[:, 0], pos[:, 1]
+    other_x, other_y = np.ascontiguousarray(others[:, 0]), np.ascontiguousarray(others[:, 1])
+    chunk = max(1, 1_000_000 // max(1, len(others)))
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        dx = x[block, None] - other_x
+        dy = y[block, None] - other_y
+        scale = dx * dx
+        scale += dy * dy
+        np.maximum(scale, min_d2, out=scale)
+        np.divide(k * k, scale, out=scale)
+        if weights is not None:
+            scale *= weights
+        disp[start:start + chunk, 0] = np.einsum("ij,ij->i", dx, scale)
+        disp[start:start + chunk, 1] = np.einsum("ij,ij->i", dy, scale)
+    return disp
+
+
+def force_layout(num_nodes, sources, targets, positions=None, movable=None, iterations=LAYOUT_ITERATIONS,
+                 temperature=0.1, seed=42):
+    """
+    Force-directed (Fruchterman-Reingold) layout on edge arrays, vectorized with NumPy.
+
+    @param num_nodes: Number of nodes (ids 0..num_nodes-1).
+    @param sources: Source node id of every edge.
+    @param targets: Target node id of every edge.
+    @param positions: Optional (num_nodes, 2) starting positions (random in the unit square if None).
+    @param movable: Optional boolean mask of the nodes allowed to move (all if None); the others stay fixed.
+    @param iterations: Number of iterations.
+    @param temperature: Maximum displacement in the first iteration, cooled linearly to 0.
+    @param seed: Random seed for the starting positions, so layouts are reproducible.
+    @return: A (num_nodes, 2) float32 array of positions.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((num_nodes, 2)) if positions is None else np.array(positions, dtype=np.float64)
+    rows = np.arange(num_nodes) if movable is None else np.flatnonzero(movable)
+    if num_nodes < 2 or not len(rows):
+        return pos.astype(np.float32)
+
+    k = math.sqrt(1.0 / num_nodes)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    keep = sources != targets
+    sources, targets = sources[keep], targets[keep]
+    for i in range(iterations):
+        disp = _repulsion(pos, rows, k)
+        # Attraction d^2 / k along each edge, pulling both endpoints together
+        delta = pos[sources] - pos[targets]
+        pull = delta * (np.sqrt((delta ** 2).sum(axis=1)) / k)[:, None]
+        for axis in (0, 1):
+            attraction = (np.bincount(targets, weights=pull[:, axis], minlength=num_nodes)
+                          - np.bincount(sources, weights=pull[:, axis], minlength=num_nodes))
+            disp[:, axis] += attraction[rows]
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-12)
+        step = temperature * (1 - i / iterations)
+        pos[rows] += disp * (np.minimum(length, step) / length)[:, None]
+    return pos.astype(np.float32)
+
+
+def networkx_layout(graph, iterations=LAYOUT_ITERATIONS):
+    """
+    @param graph: A NetworkX graph.
+    @return: A dictionary of node to (x, y) position, from `force_layout`.
+    """
+    nodes = list(graph.nodes)
+    ids = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(ids[u], ids[v]) for u, v in graph.edges], dtype=np.int64).reshape(-1, 2)
+    pos = force_layout(len(nodes), edges[:, 0], edges[:, 1], iterations=iterations)
+    return {node: tuple(pos[i].tolist()) for i, node in enumerate(nodes)}
+
+
+class LayoutCache:
+    """
+    Node positions of the whole graph, computed once per graph version.
+
+    Layouts are kept in memory and saved under `cache/layouts/` for other workers and restarts. When a new
+    version differs from the last computed one in at most LAYOUT_INCREMENTAL_MAX_CHANGED of its nodes, the
+    previous positions are reused: only the new nodes are placed (next to their neighbors) and relaxed,
+    so a small graph mutation keeps the picture stable and costs a fraction of a full layout.
+    """
+
+    def __init__(self, directory=LAYOUT_DIR):
+        """
+        @param directory: Directory holding the saved layouts.
+        """
+        self.directory = directory
+        self._latest = None  # (version, names, positions)
+        self._lock = threading.Lock()
+
+    def _path(self, version):
+        return os.path.join(self.directory, f"{version}.npy")
+
+    def get(self, snapshot):
+        """
+        @param snapshot: A GraphSnapshot.
+        @return: A tuple (positions, status): a (num_nodes, 2) float32 array indexed by node id, and
+                 'cached', 'loaded', 'incremental' or 'computed'.
+        """
+        with self._lock:
+            latest = self._latest
+            if latest is not None and latest[0] == snapshot.version:
+                return latest[2], 'cached'
+            path = self._path(snapshot.version)
+            try:
+                positions = np.load(path)
+                status = 'loaded'
+                if positions.shape != (snapshot.num_nodes, 2):
+                    raise ValueError("layout does not match the graph")
+            except (OSError, ValueError):
+                with span("graph_layout"):
+                    positions, status = self._compute(snapshot, latest)
+                self._save(snapshot.version, positions)
+            self._latest = (snapshot.version, snapshot.names, positions)
+            debug_print(f"🗺️ Layout for graph {snapshot.version}: {status} ({snapshot.num_nodes} nodes)")
+            return positions, status
+
+    def _compute(self, snapshot, previous):
+        num_nodes = snapshot.num_nodes
+        sources, targets = edge_sources(snapshot), np.asarray(snapshot.targets, dtype=np.int64)
+        if previous is not None and num_nodes:
+            _, previous_names, previous_positions = previous
+            previous_ids = {name: i for i, name in enumerate(previous_names)}
+            known = np.array([name in previous_ids for name in snapshot.names], dtype=bool)
+            if known.any() and (~known).sum() <= LAYOUT_INCREMENTAL_MAX_CHANGED * num_nodes:
+                return self._incremental(snapshot, sources, targets, known, previous_ids, previous_positions), \
+                    'incremental'
+        return force_layout(num_nodes, sources, targets), 'computed'
+
+    @staticmethod
+    def _incremental(snapshot, sources, targets, known, previous_ids, previous_positions):
+        num_nodes = snapshot.num_nodes
+        names = snapshot.names
+        positions = np.zeros((num_nodes, 2))
+        known_ids = np.flatnonzero(known)
+        positions[known_ids] = previous_positions[[previous_ids[names[i]] for i in known_ids.tolist()]]
+
+        # New nodes start at the mean of their already-placed neighbors (or the center), slightly jittered
+        sums = np.zeros((num_nodes, 2))
+        counts = np.zeros(num_nodes)
+        for a, b in ((sources, targets), (targets, sources)):
+            placed = known[b]
+            np.add.at(sums, a[placed], positions[b[placed]])
+            np.add.at(counts, a[placed], 1)
+        new = ~known
+        center = positions[known_ids].mean(axis=0)
+        rng = np.random.default_rng(42)
+        positions[new] = np.where(counts[new, None] > 0, sums[new] / np.maximum(counts[new], 1)[:, None], center)
+        positions[new] += rng.normal(scale=0.2 / math.sqrt(num_nodes), size=(int(new.sum()), 2))
+        return force_layout(num_nodes, sources, targets, positions=positions, movable=new,
+                            iterations=LAYOUT_INCREMENTAL_ITERATIONS, temperature=0.5 / math.sqrt(num_nodes))
+
+    def _save(self, version, positions):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(version)}.tmp.npy"
+        np.save(tmp_path, positions)
+        os.replace(tmp_path, self._path(version))
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy") and name != f"{version}.npy":
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+def _ego_nodes(snapshot, center, hops, max_nodes):
+    """
+    @return: A tuple (node ids in breadth-first order, truncated) for the `hops` neighborhood of `center`.
+    """
+    start = snapshot.node_id(center)
+    nodes = {start: None}
+    for edge in snapshot.neighborhood(center, hops=hops):
+        if edge["entity"] not in snapshot:
+            continue
+        node = snapshot.node_id(edge["entity"])
+        if node in nodes:
+            continue
+        if len(nodes) >= max_nodes:
+            return list(nodes), True
+        nodes[node] = None
+    return list(nodes), False
+
+
+def build_view(snapshot, positions, labels, center=None, hops=1, max_nodes=VIZ_MAX_NODES, max_edges=VIZ_MAX_EDGES):
+    """
+    Select the nodes and edges of one visualization and attach their layout positions.
+
+    With a center, the view is its `hops` ego subgraph (closest nodes first). Without one, it is the whole
+    graph if it fits, or else its `max_nodes` highest-degree nodes. Either way, at most `max_nodes` nodes and
+    `max_edges` edges (those between the selected nodes) are returned.
+
+    @param snapshot: A GraphSnapshot.
+    @param positions: The graph's layout (see `LayoutCache.get`).
+    @param labels: Entity label per node id (see `snapshot_labels`).
+    @param center: Optional node name to center the view on.
+    @param hops: Ego subgraph radius.
+    @param max_nodes: Maximum number of nodes.
+    @param max_edges: Maximum number of edges.
+    @return: A JSON-ready dictionary with graph_version, center, hops, nodes, edges, totals and truncated.
+    """
+    num_nodes = snapshot.num_nodes
+    if center is not None:
+        node_ids, truncated = _ego_nodes(snapshot, center, hops, max_nodes)
+        node_ids = np.array(node_ids, dtype=np.int64)
+    elif num_nodes <= max_nodes:
+        node_ids, truncated = np.arange(num_nodes), False
+    else:
+        degree = np.diff(snapshot.indptr) + np.diff(snapshot.in_indptr)
+        node_ids, truncated = np.sort(np.argsort(-degree, kind="stable")[:max_nodes]), True
+
+    selected = np.zeros(num_nodes, dtype=bool)
+    selected[node_ids] = True
+    sources = edge_sources(snapshot)
+    edge_ids = np.flatnonzero(selected[sources] & selected[snapshot.targets])
+    if len(edge_ids) > max_edges:
+        edge_ids, truncated = edge_ids[:max_edges], True
+
+    # Scale the whole layout (not just this view) so positions agree across views of the same version
+    lo = positions.min(axis=0) if num_nodes else np.zeros(2)
+    extent = float((positions.max(axis=0) - lo).max()) if num_nodes else 0.0
+    scale = _PIXELS_PER_NODE * math.sqrt(max(num_nodes, 1)) / (extent or 1.0)
+    names = snapshot.names
+    nodes = []
+    for node, (x, y) in zip(node_ids.tolist(), ((positions[node_ids] - lo) * scale).tolist()):
+        label_name, color = LABEL_STYLES.get(labels[node], OTHER_STYLE)
+        name = names[node]
+        entry = {"id": name, "label": name, "title": f"{label_name}: {name}", "color": color, "group": label_name,
+                 "x": round(x, 1), "y": round(y, 1)}
+        if name == center:
+            entry.update(size=28, borderWidth=3)
+        nodes.append(entry)
+    edges = []
+    for edge in edge_ids.tolist():
+        target, relation, confidence = snapshot._edge(edge, snapshot.targets[edge])
+        title = relation if confidence is None else f"{relation} (confidence {confidence:.2f})"
+        edges.append({"from": names[sources[edge]], "to": target, "label": relation, "title": title,
+                      "confidence": confidence, "arrows": "to"})
+
+    return {
+        "graph_version": snapshot.version,
+        "center": center,
+        "hops": hops if center is not None else None,
+        "nodes": nodes,
+        "edges": edges,
+        "total_nodes": num_nodes,
+        "total_edges": snapshot.num_edges,
+        "truncated": truncated,
+    }
+
+
+def render_html(view):
+    """
+    @param view: A view from `build_view`.
+    @return: A standalone vis-network HTML page drawing the view at its precomputed positions.
+    """
+    if view["center"] is not None:
+        title = f"Marvel graph: {view['center']} ({view['hops']} hop{'s' if view['hops'] != 1 else ''})"
+    else:
+        title = "Marvel graph"
+    caption = f"{title} - {len(view['nodes'])} of {view['total_nodes']} nodes, {len(view['edges'])} edges"
+    if view["truncated"]:
+        caption += " (truncated; pass ?center=<entity>&hops=N for a focused view)"
+    # Escape "</" so entity names cannot close the script tag
+    data = json.dumps(view).replace("</", "<\\/")
+    return HTML_TEMPLATE.format(title=html.escape(title), caption=html.escape(caption), data=data,
+                                options=json.dumps(VIS_OPTIONS))
+
+
+class GraphVisualizer:
+    """
+    Serves graph visualizations (HTML or JSON) generated from the current graph snapshot.
+
+    Layouts come from a LayoutCache; rendered views are kept in an LRU cache keyed by
+    (graph version, center, hops, max_nodes, format) and dropped when the graph version changes.
+    """
+
+    def __init__(self, layout_cache=None, max_entries=VIZ_CACHE_MAX_ENTRIES):
+        """
+        @param layout_cache: The LayoutCache to use (a new one by default).
+        @param max_entries: Maximum number of rendered views kept.
+        """
+        self.layout_cache = layout_cache or LayoutCache()
+        self.max_entries = max_entries
+        self._views = OrderedDict()
+        self._labels = None  # (version, labels)
+        self._graph_version = None
+        self._lock = threading.Lock()
+
+    def _get_labels(self, snapshot):
+        labels = self._labels
+        if labels is None or labels[0] != snapshot.version:
+            labels = self._labels = (snapshot.version, snapshot_labels(snapshot))
+        return labels[1]
+
+    def render(self, snapshot, center=None, hops=1, max_nodes=VIZ_MAX_NODES, fmt="html"):
+        """
+        @param snapshot: The current GraphSnapshot.
+        @param center: Optional node name to center the view on (must exist in the graph).
+        @param hops: Ego subgraph radius (ignored without a center).
+        @param max_nodes: Maximum number of nodes in the view.
+        @param fmt: "html" or "json".
+        @return: The rendered view as a string.
+        """
+        key = (snapshot.version, center, hops if center is not None else None, max_nodes, fmt)
+        with self._lock:
+            if self._graph_version != snapshot.version:
+                self._views.clear()
+                self._graph_version = snapshot.version
+            body = self._views.get(key)
+            if body is not None:
+                self._views.move_to_end(key)
+                return body
+
+        positions, _ = self.layout_cache.get(snapshot)
+        with span("graph_view"):
+            view = build_view(snapshot, positions, self._get_labels(snapshot), center, hops, max_nodes)
+            body = render_html(view) if fmt == "html" else json.dumps(view)
+        with self._lock:
+            if self._graph_version == snapshot.version:
+                self._views[key] = body
+                while len(self._views) > self.max_entries:
+                    self._views.popitem(last=False)
+        return body
+
+
+graph_visualizer = GraphVisualizer()
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+from typing import Any, List, Optional
+
+from llama_index.core.graph_stores.types import KG_SOURCE_REL
+from llama_index.core.indices.property_graph import VectorContextRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from bm25_index import BM25Index
+from config import HYBRID_CANDIDATES, HYBRID_KEYWORD_WEIGHT, HYBRID_KEYWORD_SLOTS, HYBRID_RRF_K
+from metrics import debug_print, span
+
+
+def reciprocal_rank_fusion(rankings, weights, k=HYBRID_RRF_K):
+    """
+    Weighted reciprocal rank fusion: each ranking adds weight / (k + rank) to its items.
+
+    @param rankings: Lists of items, best first.
+    @param weights: One weight per ranking.
+    @param k: Rank offset (higher = flatter, lets lower ranks count more).
+    @return: A list of (item, fused score) tuples, best first.
+    """
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def select_top_k(fused, reserved, top_k):
+    """
+    Take the best `top_k` fused items, always including the reserved ones.
+
+    @param fused: A list of (item, score) tuples, best first.
+    @param reserved: Items to keep even if their fused score is too low (at most `top_k`; absent ones are skipped).
+    @param top_k: Number of items to return.
+    @return: A list of at most `top_k` (item, score) tuples, best first.
+    """
+    reserved = set(reserved[:top_k])
+    kept = [pair for pair in fused if pair[0] in reserved]
+    rest = [pair for pair in fused if pair[0] not in reserved][:top_k - len(kept)]
+    return sorted(kept + rest, key=lambda pair: pair[1], reverse=True)
+
+
+class HybridContextRetriever(VectorContextRetriever):
+    """
+    VectorContextRetriever that fuses entity vector search with BM25 over the graph's triplet text.
+
+    The vector store returns HYBRID_CANDIDATES times `similarity_top_k` entity candidates; the BM25 index ranks
+    the "subject relation object" text of every triplet and each hit votes for both of its entities. The two
+    entity rankings are fused with weighted reciprocal rank fusion, and the best `similarity_top_k` entities
+    are expanded into triplets (scored by their fused score) as in the parent class. Fusion alone would never
+    select an entity found only by BM25 (it scores below every vector candidate), so the best `keyword_slots`
+    BM25 entities are always among the selected ones.
+
+    The BM25 index and an entity -> triplets adjacency are built once from the graph store, which is treated
+    as read-only (index updates build a new store and retriever), so one-hop expansion costs the degree of the
+    selected entities instead of the two full triplet scans of `get_rel_map`.
+    """
+
+    def __init__(self, *args: Any, keyword_weight: float = HYBRID_KEYWORD_WEIGHT,
+                 candidates: int = HYBRID_CANDIDATES, keyword_slots: int = HYBRID_KEYWORD_SLOTS,
+                 **kwargs: Any) -> None:
+        """
+        @param keyword_weight: Weight of the BM25 ranking in the fusion (the vector ranking has weight 1).
+        @param candidates: Candidates taken from each ranking, as a multiple of `similarity_top_k`.
+        @param keyword_slots: Best BM25 entities always selected (at most `similarity_top_k` - 1, so the best
+                              vector entity is kept too).
+        """
+        super().__init__(*args, **kwargs)
+        self._keyword_weight = keyword_weight
+        self._keyword_slots = max(0, min(keyword_slots, self._similarity_top_k - 1))
+        self._candidates = candidates
+        self._keyword_index = None
+        self._triplets = None
+        self._entity_triplets = None
+        self._lock = threading.Lock()
+
+    def prepare(self) -> "HybridContextRetriever":
+        """
+        Build the BM25 index and the adjacency now rather than on the first query, so that CPU work stays off
+        the event loop that awaits `aretrieve_from_graph`.
+
+        @return: This retriever.
+        """
+        self._triplet_index()
+        return self
+
+    def _triplet_index(self):
+        """
+        Build, on first use (or in `prepare`), the BM25 index over the triplet text (one document per triplet, in the graph
+        store's order) and the dictionary of entity id to the positions of its triplets.
+
+        @return: The BM25Index.
+        """
+        if self._keyword_index is None:
+            with self._lock:
+                if self._keyword_index is None:
+                    with span("hybrid_keyword_index"):
+                        triplets = [triplet for triplet in self._graph_store.graph.get_triplets()
+                                    if triplet[1].id != KG_SOURCE_REL]
+                        entity_triplets = {}
+                        for position, (subj, _, obj) in enumerate(triplets):
+                            entity_triplets.setdefault(subj.id, []).append(position)
+                            if obj.id != subj.id:
+                                entity_triplets.setdefault(obj.id, []).append(position)
+                        index = BM25Index(f"{_entity_name(subj)} {rel.label} {_entity_name(obj)}"
+                                          for subj, rel, obj in triplets)
+                    self._triplets, self._entity_triplets = triplets, entity_triplets
+                    self._keyword_index = index
+                    debug_print(f"🔎 Hybrid retriever: BM25 over {len(index)} triplets")
+        return self._keyword_index
+
+    def _candidate_query(self, query_bundle: QueryBundle) -> VectorStoreQuery:
+        query = self._get_vector_store_query(query_bundle)
+        query.similarity_top_k = self._similarity_top_k * self._candidates
+        return query
+
+    def _fuse(self, query_bundle: QueryBundle, query_result) -> tuple:
+        """
+        @return: A tuple (entity ids, fused scores) of the best `similarity_top_k` entities.
+        """
+        vector_ranking = list(query_result.ids or [])
+        keyword_ranking = {}
+        for doc_id, _ in self._triplet_index().search(query_bundle.query_str,
+                                                      len(vector_ranking) or self._similarity_top_k):
+            subj, _, obj = self._triplets[doc_id]
+            keyword_ranking.setdefault(subj.id, None)
+            keyword_ranking.setdefault(obj.id, None)
+        keyword_ranking = list(keyword_ranking)
+        fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking], [1.0, self._keyword_weight])
+        fused = select_top_k(fused, keyword_ranking[:self._keyword_slots], self._similarity_top_k)
+        return [entity_id for entity_id, _ in fused], [score for _, score in fused]
+
+    def _rel_map(self, kg_ids, limit) -> list:
+        """
+        @param kg_ids: Entity ids, best first (as returned by `_fuse`).
+        @return: The triplets of the given entities, like the graph store's one-hop `get_rel_map`, gathered
+                 entity by entity in that order, so the limit cuts the triplets of the lowest-ranked entities.
+        """
+        self._triplet_index()
+        limit = limit or self._limit
+        positions = {}
+        for entity_id in kg_ids:
+            for position in self._entity_triplets.get(entity_id, ()):
+                positions.setdefault(position, None)
+                if len(positions) >= limit:
+                    return [self._triplets[position] for position in positions]
+        return [self._triplets[position] for position in positions]
+
+    def _scored_nodes(self, kg_ids, scores, triplets) -> List[NodeWithScore]:
+        score_of = dict(zip(kg_ids, scores))
+        scored = [(triplet, max(score_of.get(triplet[0].id, 0.0), score_of.get(triplet[2].id, 0.0)))
+                  for triplet in triplets]
+        if self._similarity_score:
+            scored = [(triplet, score) for triplet, score in scored if score >= self._similarity_score]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return self._get_nodes_with_score([triplet for triplet, _ in scored], [score for _, score in scored])
+
+    def retrieve_from_graph(self, query_bundle: QueryBundle, limit: Optional[int] = None) -> List[NodeWithScore]:
+        query_result = self._vector_store.query(self._candidate_query(query_bundle))
+        kg_ids, scores = self._fuse(query_bundle, query_result)
+        if self._path_depth == 1:
+            triplets = self._rel_map(kg_ids, limit)
+        else:
+            triplets = self._graph_store.get_rel_map(self._graph_store.get(ids=kg_ids), depth=self._path_depth,
+                                                     limit=limit or self._limit, ignore_rels=[KG_SOURCE_REL])
+        return self._scored_nodes(kg_ids, scores, triplets)
+
+    async def aretrieve_from_graph(self, query_bundle: QueryBundle,
+                                   limit: Optional[int] = None) -> List[NodeWithScore]:
+        query = await self._aget_vector_store_query(query_bundle)
+        query.similarity_top_k = self._similarity_top_k * self._candidates
+        query_result = await self._vector_store.aquery(query)
+        if self._keyword_index is None:
+            await asyncio.to_thread(self._triplet_index)
+        kg_ids, scores = self._fuse(query_bundle, query_result)
+        if self._path_depth == 1:
+            triplets = self._rel_map(kg_ids, limit)
+        else:
+            triplets = await self._graph_store.aget_rel_map(await self._graph_store.aget(ids=kg_ids),
+                                                            depth=self._path_depth, limit=limit or self._limit,
+                                                            ignore_rels=[KG_SOURCE_REL])
+        return self._scored_nodes(kg_ids, scores, triplets)
+
+
+def _entity_name(node):
+    return getattr(node, "name", None) or node.id
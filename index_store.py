@@ -0,0 +1,289 @@
+import copy
+import json
+import os
+import shutil
+import sys
+import time
+
+from cache_utils import CACHE_DIR
+from metrics import debug_print
+
+# Bump whenever the on-disk layout of a snapshot changes; older snapshots are then ignored.
+INDEX_FORMAT_VERSION = 3
+INDEX_DIR = os.path.join(CACHE_DIR, "index")
+MANIFEST_FILE = "manifest.json"
+
+
+def _safe_name(value):
+    """
+    Turn a model name into a string that is safe to use as a directory name.
+
+    @param value: The raw model name (e.g., "text-embedding-ada-002").
+    @return: The sanitized name.
+    """
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in value)
+
+
+def index_snapshot_dir(graph_version, embedding_model, ingestion_mode="llm"):
+    """
+    Return the directory holding the index snapshot for a graph version and embedding model.
+
+    @param graph_version: The content hash of the source graph (see `compute_graph_version`).
+    @param embedding_model: The embedding model used to embed the index nodes.
+    @param ingestion_mode: How the index nodes were produced ("llm" or "graph").
+    @return: Path of the snapshot directory (it may not exist yet).
+    """
+    name = f"v{INDEX_FORMAT_VERSION}-{graph_version}-{_safe_name(embedding_model)}-{ingestion_mode}"
+    return os.path.join(INDEX_DIR, name)
+
+
+def _read_manifest(snapshot_dir):
+    """
+    Read a snapshot manifest, returning None if it is missing or unreadable.
+
+    @param snapshot_dir: The snapshot directory.
+    @return: The manifest dictionary, or None.
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def index_snapshot_exists(graph_version, embedding_model, ingestion_mode="llm"):
+    """
+    Check whether a complete, compatible snapshot exists for the given graph and embedding model.
+
+    @param graph_version: The content hash of the source graph.
+    @param embedding_model: The embedding model used to embed the index nodes.
+    @param ingestion_mode: How the index nodes were produced ("llm" or "graph").
+    @return: True if a matching snapshot is on disk, False otherwise.
+    """
+    manifest = _read_manifest(index_snapshot_dir(graph_version, embedding_model, ingestion_mode))
+    return bool(manifest) and (
+        manifest.get("format_version") == INDEX_FORMAT_VERSION
+        and manifest.get("graph_version") == graph_version
+        and manifest.get("embedding_model") == embedding_model
+        and manifest.get("ingestion_mode", "llm") == ingestion_mode
+    )
+
+
+def load_index_snapshot(graph_version, embedding_model, llm, embed_model, callback_manager=None,
+                        ingestion_mode="llm"):
+    """
+    Load a persisted PropertyGraphIndex (property graph store, embeddings and vector store).
+
+    @param graph_version: The content hash of the source graph.
+    @param embedding_model: The embedding model name the snapshot must have been built with.
+    @param llm: The LLM to attach to the loaded index.
+    @param embed_model: The embedding model instance used for query embeddings.
+    @param callback_manager: Optional callback manager for the index (e.g., for token counting).
+    @param ingestion_mode: How the index nodes were produced ("llm" or "graph").
+    @return: The loaded index, or None if no valid snapshot exists.
+    """
+    if not index_snapshot_exists(graph_version, embedding_model, ingestion_mode):
+        return None
+    from llama_index.core import StorageContext, load_index_from_storage
+    from llama_index.core.vector_stores.simple import DEFAULT_VECTOR_STORE, NAMESPACE_SEP
+    from llama_index.core.vector_stores.types import DEFAULT_PERSIST_FNAME
+    from vector_index import MatrixVectorStore
+
+    snapshot_dir = index_snapshot_dir(graph_version, embedding_model, ingestion_mode)
+    try:
+        # The entity embeddings are a MatrixVectorStore, which StorageContext cannot load by itself
+        vector_store = MatrixVectorStore.from_persist_path(
+            os.path.join(snapshot_dir, f"{DEFAULT_VECTOR_STORE}{NAMESPACE_SEP}{DEFAULT_PERSIST_FNAME}"))
+        storage_context = StorageContext.from_defaults(persist_dir=snapshot_dir, vector_store=vector_store)
+        return load_index_from_storage(
+            storage_context, llm=llm, embed_model=embed_model, callback_manager=callback_manager
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to load index snapshot from '{snapshot_dir}': {e}", file=sys.stderr)
+        return None
+
+
+def save_index_snapshot(index, graph_version, embedding_model, ingestion_mode="llm", prune=True):
+    """
+    Persist a PropertyGraphIndex to disk and drop snapshots built from older graph versions.
+
+    The snapshot is written to a temporary directory first and then moved into place,
+    so a crash mid-write never leaves a half-written snapshot that looks valid.
+
+    @param index: The PropertyGraphIndex to persist.
+    @param graph_version: The content hash of the source graph.
+    @param embedding_model: The embedding model the index was built with.
+    @param ingestion_mode: How the index nodes were produced ("llm" or "graph").
+    @param prune: Drop the snapshots of other graph versions (False while `graph_version` is not published
+                  yet: the current version's snapshots are still needed if it never is).
+    @return: Path of the written snapshot directory.
+    """
+    snapshot_dir = index_snapshot_dir(graph_version, embedding_model, ingestion_mode)
+    tmp_dir = f"{snapshot_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    index.storage_context.persist(persist_dir=tmp_dir)
+    manifest = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "graph_version": graph_version,
+        "embedding_model": embedding_model,
+        "ingestion_mode": ingestion_mode,
+        "created_at": time.time(),
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+    if prune:
+        prune_index_snapshots(graph_version)
+    return snapshot_dir
+
+
+def prune_index_snapshots(graph_version):
+    """
+    Remove snapshots that were built for a different graph version or an older format.
+
+    @param graph_version: The current graph version; snapshots for it are kept.
+    @return: None
+    """
+    if not os.path.isdir(INDEX_DIR):
+        return
+    for name in os.listdir(INDEX_DIR):
+        if ".tmp-" in name:
+            continue  # another writer is still persisting this one
+        path = os.path.join(INDEX_DIR, name)
+        manifest = _read_manifest(path)
+        if (
+            manifest is None
+            or manifest.get("format_version") != INDEX_FORMAT_VERSION
+            or manifest.get("graph_version") != graph_version
+        ):
+            shutil.rmtree(path, ignore_errors=True)
+            debug_print(f"🧹 Removed stale index snapshot '{name}'.")
+
+
+def has_index_snapshot():
+    """
+    Check whether any index snapshot is present on disk.
+
+    @return: True if at least one snapshot with a manifest exists.
+    """
+    if not os.path.isdir(INDEX_DIR):
+        return False
+    return any(_read_manifest(os.path.join(INDEX_DIR, name)) for name in os.listdir(INDEX_DIR))
+
+
+def update_index(index, removed_doc_ids, added_nodes, llm, embed_model, callback_manager=None):
+    """
+    Apply a delta to a PropertyGraphIndex, copy-on-write.
+
+    The graph and vector stores are shallow-copied and the docstore copied, the triplets of removed source
+    documents are deleted from the copies and the added nodes inserted into them (only those are embedded).
+    The original index is left untouched, so queries still running on it see a consistent index; callers
+    swap in the result.
+
+    @param index: The current PropertyGraphIndex (in-memory graph store and MatrixVectorStore).
+    @param removed_doc_ids: Ids of the source (triplet) documents to remove.
+    @param added_nodes: Documents carrying KG nodes and relations to insert, like a cold build's nodes.
+    @param llm: The LLM to attach to the new index.
+    @param embed_model: The embedding model used for the added nodes.
+    @param callback_manager: Optional callback manager for the new index.
+    @return: The new PropertyGraphIndex.
+    """
+    from llama_index.core import StorageContext
+    from llama_index.core.graph_stores import SimplePropertyGraphStore
+    from llama_index.core.graph_stores.types import LabelledPropertyGraph
+    from llama_index.core.indices.property_graph import PropertyGraphIndex, ImplicitPathExtractor
+
+    graph = index.property_graph_store.graph
+    store = SimplePropertyGraphStore(graph=LabelledPropertyGraph.model_construct(
+        nodes=dict(graph.nodes), relations=dict(graph.relations), triplets=set(graph.triplets)))
+    vector_store = index.vector_store.clone()
+    orphans = _remove_source_documents(store.graph, set(removed_doc_ids))
+    if orphans:
+        vector_store.delete_nodes(orphans)
+    docstore = _copy_docstore(index.docstore)
+    for doc_id in removed_doc_ids:
+        docstore.delete_document(doc_id, raise_error=False)
+
+    # Fresh index store (a snapshot holds exactly one index struct)
+    storage_context = StorageContext.from_defaults(docstore=docstore, property_graph_store=store,
+                                                   vector_store=vector_store)
+    new_index = PropertyGraphIndex.from_existing(
+        property_graph_store=store,
+        vector_store=vector_store,
+        llm=llm,
+        kg_extractors=[ImplicitPathExtractor()],
+        embed_model=embed_model,
+        callback_manager=callback_manager,
+        storage_context=storage_context,
+        show_progress=False,
+    )
+    if added_nodes:
+        new_index.insert_nodes(added_nodes)
+    return new_index
+
+
+def _copy_docstore(docstore):
+    """
+    Copy an in-memory docstore, so deleting or adding documents in the copy does not change the original.
+
+    The stored values are copied too: deleting a document edits its reference document's node id list in place.
+
+    @param docstore: The SimpleDocumentStore of the current index.
+    @return: A new SimpleDocumentStore with the same documents.
+    """
+    from llama_index.core.storage.docstore import SimpleDocumentStore
+
+    return SimpleDocumentStore.from_dict(copy.deepcopy(docstore.to_dict()), namespace=docstore._namespace)
+
+
+def _remove_source_documents(graph, doc_ids):
+    """
+    Remove source documents and the triplets extracted from them from a LabelledPropertyGraph.
+
+    Entities still used by other triplets are kept (pointed at one of those triplets' source documents,
+    which retrieval uses for the source text); entities left without triplets are removed.
+
+    @param graph: The LabelledPropertyGraph to modify.
+    @param doc_ids: Set of source document ids.
+    @return: The ids of the removed entities (their embeddings must be removed too).
+    """
+    if not doc_ids:
+        return []
+    from llama_index.core.graph_stores.types import TRIPLET_SOURCE_KEY, ChunkNode
+
+    surviving_sources = {}
+    for triplet in list(graph.triplets):
+        subj, rel, obj = triplet
+        key = graph._get_relation_key(subj_id=subj, rel_id=rel, obj_id=obj)
+        relation = graph.relations.get(key)
+        source = relation.properties.get(TRIPLET_SOURCE_KEY) if relation is not None else None
+        if source in doc_ids:
+            graph.triplets.discard(triplet)
+            graph.relations.pop(key, None)
+        else:
+            surviving_sources.setdefault(subj, source)
+            surviving_sources.setdefault(obj, source)
+
+    orphans = []
+    for node_id, node in list(graph.nodes.items()):
+        if isinstance(node, ChunkNode):
+            if node_id in doc_ids:
+                del graph.nodes[node_id]
+            continue
+        if node.properties.get(TRIPLET_SOURCE_KEY) not in doc_ids:
+            continue
+        if node_id in surviving_sources:
+            # Copied, since the original index still shares this node
+            graph.nodes[node_id] = node.model_copy(
+                update={"properties": {**node.properties, TRIPLET_SOURCE_KEY: surviving_sources[node_id]}})
+        else:
+            del graph.nodes[node_id]
+            orphans.append(node_id)
+    return orphans
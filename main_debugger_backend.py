@@ -1,19 +1,20 @@
 import asyncio
 
 from llama_index.core.callbacks import TokenCountingHandler
-from llama_index.core.indices.property_graph import PropertyGraphIndex, SchemaLLMPathExtractor
+from llama_index.core.indices.property_graph import PropertyGraphIndex, SchemaLLMPathExtractor, ImplicitPathExtractor
 from llama_index.core.callbacks import CallbackManager
+from llama_index.core import Settings
+from llama_index.core.response_synthesizers import get_response_synthesizer
 
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.llms.openai import OpenAI
-from llama_index.core.schema import Document
 from config import OPENAI_API_KEY, CHOSEN_MODEL, CHOSEN_MODEL_EMBEDDINGS
 import openai
 
 from cost_utils import print_cost_breakdown
+from extraction_cache import acached_extract
 from graph_utils import build_and_save_mock_marvel_graph, extract_humanized_triplets_from_graph, \
-    filter_documents_by_rules
+    filter_documents_by_rules, build_triplet_documents
 from marvel_graph_orchestrator import MarvelGraphOrchestrator
+from client_registry import create_llm, create_embed_model
 
 if __name__ == '__main__':
 
@@ -26,7 +27,7 @@ if __name__ == '__main__':
 
 
     triplet_texts = extract_humanized_triplets_from_graph(graph)
-    documents = [Document(text=t) for t in triplet_texts]
+    documents = build_triplet_documents(triplet_texts)
 
     filtered_docs = filter_documents_by_rules(
         documents,
@@ -42,15 +43,19 @@ if __name__ == '__main__':
     # Define this ONCE before LLM + embedding are created
     handler = TokenCountingHandler()
     callback_manager = CallbackManager([handler])
+    # PropertyGraphIndex re-resolves the embed model against the global callback manager
+    Settings.callback_manager = callback_manager
 
-    llm = OpenAI(model=CHOSEN_MODEL, api_key=OPENAI_API_KEY, temperature=0.0, callback_manager=callback_manager)
-    embed_model = OpenAIEmbedding(model_name=CHOSEN_MODEL_EMBEDDINGS, api_key=OPENAI_API_KEY,
-                                  callback_manager=callback_manager)
+    # Set MARVEL_LLM_BACKEND=stub to run this script offline
+    llm = create_llm(CHOSEN_MODEL, OPENAI_API_KEY, callback_manager)
+    embed_model = create_embed_model(CHOSEN_MODEL_EMBEDDINGS, OPENAI_API_KEY, callback_manager)
 
     # Step 1: Apply path extraction manually
     print("\n🔄 Running manual path extraction over all docs...")
-    extracted_nodes = asyncio.run(
-        SchemaLLMPathExtractor(llm=llm, strict=False).acall(filtered_docs, show_progress=True))
+    extracted_nodes, extraction_stats = asyncio.run(
+        acached_extract(SchemaLLMPathExtractor(llm=llm, strict=False), filtered_docs, CHOSEN_MODEL,
+                        show_progress=True))
+    print(f"📦 Extraction cache: {extraction_stats['hits']} hits, {extraction_stats['misses']} misses")
 
     # manual triplet extraction:
 
@@ -60,11 +65,15 @@ if __name__ == '__main__':
         nodes=extracted_nodes,
         embed_model=embed_model,
         llm=llm,
+        kg_extractors=[ImplicitPathExtractor()],
         show_progress=True,
     )
 
     # 3. Create a query engine
     query_engine = index.as_query_engine(
+        llm=llm,
+        response_synthesizer=get_response_synthesizer(llm=llm, callback_manager=callback_manager),
+        callback_manager=callback_manager,
         include_text=True,
         similarity_top_k=3
     )
@@ -73,7 +82,7 @@ if __name__ == '__main__':
 
     orchestrator = MarvelGraphOrchestrator(query_engine)
     test_query = "What gene gives Jean Grey her telekinetic powers?"
-    final_state = orchestrator.app.invoke({"query": test_query})
+    final_state = orchestrator.invoke(test_query)
 
     print_cost_breakdown(handler, model=CHOSEN_MODEL, embed_model=CHOSEN_MODEL_EMBEDDINGS)
     print(final_state["final_response"])
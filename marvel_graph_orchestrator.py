@@ -1,22 +1,88 @@
-import json
-
-from langgraph.graph import StateGraph
-
-from character_bios import CHARACTER_BIOS
-from config import QUERY_ROUTING_RULES, CHOSEN_MODEL
+import asyncio
+import threading
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, StateGraph
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.core.utils import get_tokenizer
+
+from character_bios import CHARACTER_BIOS, CHARACTER_ALIASES
+from config import QUERY_ROUTING_RULES, RETRIEVAL_BRANCHES, RETRIEVAL_NEIGHBORHOOD_MAX_EDGES, \
+    RETRIEVAL_MAX_CONTEXT_NODES
+from entity_matcher import build_entity_matcher, select_bios
+from graph_lookup import GraphLookup
+from graph_utils import humanize_triplet
+from metrics import debug_print, span, traced, PROMPT_TOKENS
+from path_engine import PathEngine, format_paths
 from state_models import MarvelState
 
 
 class MarvelGraphOrchestrator:
-    def __init__(self, query_engine):
+    def __init__(self, query_engine, stream_synthesizer=None, graph=None, graph_version=None):
         """
-        Initialize the orchestrator with a query engine and build the LangGraph graph.
+        Initialize the orchestrator with a query engine.
+
+        The LangGraph workflow itself is compiled once per process (see `compiled_workflow`) and shared by
+        every orchestrator; `invoke`/`ainvoke` pass it this orchestrator and its query engine.
 
         @param query_engine: An object that supports `.query()` method for querying the graph.
+        @param stream_synthesizer: Optional streaming response synthesizer, required by `astream`.
+        @param graph: Optional NetworkX graph; its node labels and one-hop neighbors drive bio selection.
+        @param graph_version: Optional version of `graph`, used to key memoized path queries.
         """
         self.query_engine = query_engine
-        self.app = self._build_graph()
+        self.stream_synthesizer = stream_synthesizer
+        self.graph = graph
+        self._matcher = None
+        self._matcher_bios = None
+        self._all_bios_tokens = 0
+        self._lookup = None
+        self.paths = PathEngine(graph, graph_version) if graph is not None else None
+
+    def update_graph(self, query_engine, graph, graph_version):
+        """
+        Point the orchestrator at a new graph version without rebuilding the workflow.
+
+        The entity matcher and graph lookup are rebuilt on next use; the path engine starts with
+        an empty memo. Requests already running keep the query engine they started with.
+
+        @param query_engine: The query engine over the updated index.
+        @param graph: The updated NetworkX graph.
+        @param graph_version: Its version.
+        @return: None
+        """
+        self.query_engine = query_engine
+        self.paths = PathEngine(graph, graph_version)
+        self.graph = graph
+        self._matcher_bios = None
+        self._lookup = None
+
+    def invoke(self, query: str, question: str = "") -> dict:
+        """
+        Run the workflow synchronously.
+
+        @param query: The full prompt (see `build_modified_prompt`).
+        @param question: The raw user question (enables the graph fast path and the graph retrieval branches).
+        @return: The final state dictionary.
+        """
+        return compiled_workflow().invoke({"query": query, "question": question}, config=self._run_config())
+
+    async def ainvoke(self, query: str, question: str = "") -> dict:
+        """
+        Run the workflow on the running event loop (retrieval branches are awaited concurrently).
 
+        @param query: The full prompt (see `build_modified_prompt`).
+        @param question: The raw user question.
+        @return: The final state dictionary.
+        """
+        return await compiled_workflow().ainvoke({"query": query, "question": question}, config=self._run_config())
+
+    def _run_config(self) -> dict:
+        """
+        Per-invocation workflow config: this orchestrator and its query engine, captured once so retrieval and
+        generation use the same engine even if `update_graph` swaps it meanwhile.
+        """
+        return {"configurable": {"orchestrator": self, "query_engine": self.query_engine}}
 
     def classify_query_node(self, state: MarvelState) -> dict:
         """
@@ -25,9 +91,10 @@ class MarvelGraphOrchestrator:
         @param state: The current state containing the user's query.
         @return: A dictionary with updated state including 'query_type'.
         """
-        print("🧭 classify_query_node received:", state)
+        debug_print("🧭 classify_query_node received:", state)
 
-        q = state.query.lower()
+        # Route on the raw question when we have it; the full prompt mentions genes and powers in its instructions
+        q = (state.question or state.query).lower()
         matched_type = "default"
 
         for query_type, keywords in QUERY_ROUTING_RULES.items():
@@ -37,24 +104,141 @@ class MarvelGraphOrchestrator:
 
         new_state = {
             "query": state.query,
+            "question": state.question,
             "query_type": matched_type,
             "raw_result": "",
-            "final_response": ""
+            "final_response": "",
+            "answered_by": "",
+            "path_context": ""
         }
 
-        print("✅ classify_query_node returning:", new_state)
+        debug_print("✅ classify_query_node returning:", new_state)
         return new_state
 
-    def query_graph_node(self, state: MarvelState) -> dict:
+    def graph_lookup_node(self, state: MarvelState) -> dict:
         """
-        Query the graph using the current query and store the raw result in the state.
+        Answer single-hop lookups straight from the DiGraph, without retrieval or an LLM call.
+
+        Leaves 'final_response' empty when the question is not a supported lookup, so the
+        workflow falls through to retrieval and generation.
+
+        @param state: The current MarvelState containing the raw question.
+        @return: A dictionary with the updated state, including 'final_response' on success.
+        """
+        answer = self._graph_lookup().answer(state.question, self._matcher_bios or CHARACTER_BIOS)
+        debug_print(f"⚡ graph_lookup_node {'answered' if answer else 'fell through'}")
+        if answer:
+            state.final_response = answer
+            state.answered_by = "graph"
+        return dict(state)
+
+    def trace_paths_node(self, state: MarvelState) -> dict:
+        """
+        Find the most confident multi-hop paths between the entities the question mentions
+        (e.g., Character -> has_mutation -> Gene -> confers -> Power) and keep them as prompt context.
+
+        @param state: The current MarvelState containing the raw question.
+        @return: A dictionary with the updated state including 'path_context'.
+        """
+        self._ensure_matcher(self._matcher_bios or CHARACTER_BIOS)
+        paths = self.paths.trace(self._matcher.find(state.question))
+        debug_print(f"🧵 trace_paths_node found {len(paths)} path(s)")
+        state.path_context = format_paths(paths)
+        return dict(state)
+
+    async def atrace_paths_node(self, state: MarvelState) -> dict:
+        """
+        `trace_paths_node` in a worker thread: the beam search is CPU-bound and would stall the shared loop.
+
+        @param state: The current MarvelState containing the raw question.
+        @return: A dictionary with the updated state including 'path_context'.
+        """
+        return await asyncio.to_thread(self.trace_paths_node, state)
+
+    def retrieve_vector_node(self, state: MarvelState, query_engine) -> dict:
+        """
+        Retrieve context by embedding similarity with the index's retriever.
+
+        Like the other branches, it searches with the user's question: the built prompt's fixed instructions
+        and bios would otherwise dominate the query and pull in the same entities for every question.
 
         @param state: The current MarvelState containing the query.
+        @param query_engine: The query engine of this invocation.
+        @return: A dictionary with 'vector_nodes'.
+        """
+        return {"vector_nodes": query_engine.retriever.retrieve(_retrieval_query(state))}
+
+    async def aretrieve_vector_node(self, state: MarvelState, query_engine) -> dict:
+        """
+        Async variant of `retrieve_vector_node`, used by `ainvoke` on the shared event loop.
+        """
+        return {"vector_nodes": await query_engine.retriever.aretrieve(_retrieval_query(state))}
+
+    def retrieve_neighborhood_node(self, state: MarvelState, query_engine=None) -> dict:
+        """
+        Retrieve the edges of the entities the question mentions straight from the graph, most confident first.
+
+        @param state: The current MarvelState containing the raw question.
+        @param query_engine: Unused (same signature as the other branches).
+        @return: A dictionary with 'neighborhood_nodes'.
+        """
+        if self.graph is None or not state.question:
+            return {"neighborhood_nodes": []}
+        self._ensure_matcher(self._matcher_bios or CHARACTER_BIOS)
+        edges = {}
+        for entity in self._matcher.find(state.question):
+            if entity not in self.graph:
+                continue
+            incident = list(self.graph.edges(entity, data=True))
+            if self.graph.is_directed():
+                incident += self.graph.in_edges(entity, data=True)
+            for u, v, data in incident:
+                edges[(u, v)] = data
+        ranked = sorted(edges.items(), key=lambda item: -_confidence(item[1]))[:RETRIEVAL_NEIGHBORHOOD_MAX_EDGES]
+        return {"neighborhood_nodes": [_text_node(humanize_triplet(u, v, data), _confidence(data))
+                                       for (u, v), data in ranked]}
+
+    async def aretrieve(self, state: MarvelState, query_engine) -> list:
+        """
+        Run the RETRIEVAL_BRANCHES concurrently and merge their contexts (used by `astream`; the workflow
+        fans out to the same branches as separate nodes).
+
+        @param state: The current MarvelState.
+        @param query_engine: The query engine of this request.
+        @return: The merged list of NodeWithScore.
+        """
+        async def branch(name):
+            with span(f"node.retrieve_{name}"):
+                if name == "vector":
+                    return await self.aretrieve_vector_node(state, query_engine)
+                return getattr(self, f"retrieve_{name}_node")(state, query_engine)
+
+        for update in await asyncio.gather(*(branch(name) for name in RETRIEVAL_BRANCHES)):
+            for key, value in update.items():
+                setattr(state, key, value)
+        return merge_retrieved(state)
+
+    def generate_node(self, state: MarvelState, query_engine) -> dict:
+        """
+        Answer from the merged retrieval contexts with one LLM call and store the raw result in the state.
+
+        @param state: The current MarvelState containing the query and the retrieved nodes.
+        @param query_engine: The query engine of this invocation (its response synthesizer is used).
         @return: A dictionary with the updated state including 'raw_result'.
         """
-        print("📡 query_graph_node running...")
+        debug_print("📡 generate_node running...")
 
-        response = self.query_engine.query(state.query)
+        response = query_engine.synthesize(QueryBundle(_prompt(state)), merge_retrieved(state))
+        state.raw_result = str(response)
+        return dict(state)
+
+    async def agenerate_node(self, state: MarvelState, query_engine) -> dict:
+        """
+        Async variant of `generate_node`, used by `ainvoke` on the shared event loop.
+        """
+        debug_print("📡 agenerate_node running...")
+
+        response = await query_engine.asynthesize(QueryBundle(_prompt(state)), merge_retrieved(state))
         state.raw_result = str(response)
         return dict(state)
 
@@ -65,95 +249,364 @@ class MarvelGraphOrchestrator:
         @param state: The current MarvelState containing the raw result.
         @return: A dictionary with the updated state including 'final_response'.
         """
-        print("🎨 format_response_node running...")
+        debug_print("🎨 format_response_node running...")
 
         state.final_response = f"🧠 Answer: {state.raw_result.strip()}"
+        state.answered_by = "llm"
         return dict(state)
 
-    def _build_graph(self):
+    def answer_from_graph(self, question: str):
         """
-        Build and compile the LangGraph workflow graph.
+        Run classify and the graph fast path synchronously, outside the LangGraph workflow.
+
+        Lets callers answer simple lookups without building the prompt or a round trip to the event loop;
+        when this returns None, invoke the full workflow as usual.
 
-        @return: The compiled graph application object.
+        @param question: The raw user question.
+        @return: The final state dictionary if the graph answered, otherwise None.
         """
-        graph = StateGraph(MarvelState)
+        with span("node.classify"):
+            state = MarvelState(**self.classify_query_node(MarvelState(query=question, question=question)))
+        if not self._can_lookup(state):
+            return None
+        with span("node.graph_lookup"):
+            state = MarvelState(**self.graph_lookup_node(state))
+        return dict(state) if state.final_response else None
+
+    def _can_lookup(self, state: MarvelState) -> bool:
+        """
+        Whether the graph fast path should be tried: needs the graph, the raw question and a lookup-type query.
+        """
+        return self.graph is not None and bool(state.question) and state.query_type != "default"
 
-        graph.add_node("classify", self.classify_query_node)
-        graph.add_node("query_graph", self.query_graph_node)
-        graph.add_node("format_response", self.format_response_node)
+    def _can_trace(self, state: MarvelState) -> bool:
+        """
+        Whether ranked graph paths should be added to the prompt (mutation_path questions, graph available).
+        """
+        return self.graph is not None and bool(state.question) and state.query_type == "mutation_path"
 
-        def route(state: MarvelState) -> str:
-            return "query_graph"
+    def _graph_lookup(self) -> GraphLookup:
+        """
+        Return the GraphLookup for this orchestrator's graph, built on first use.
+        """
+        if self._lookup is None:
+            self._ensure_matcher(self._matcher_bios or CHARACTER_BIOS)
+            self._lookup = GraphLookup(self.graph, self._matcher)
+        return self._lookup
 
-        graph.set_entry_point("classify")
-        graph.add_conditional_edges("classify", route)
-        graph.add_edge("query_graph", "format_response")
-        graph.set_finish_point("format_response")
+    def mentioned_entities(self, question: str) -> frozenset:
+        """
+        @param question: The raw user question.
+        @return: The characters and graph entities it mentions (by name or alias).
+        """
+        self._ensure_matcher(CHARACTER_BIOS)
+        return frozenset(self._matcher.find(question))
 
-        return graph.compile()
+    def _ensure_matcher(self, bios_dict: dict) -> None:
+        """
+        (Re)build the entity matcher when it was built for a different bios dictionary.
+        """
+        if self._matcher_bios is not bios_dict:
+            self._matcher = build_entity_matcher(bios_dict, CHARACTER_ALIASES, self.graph)
+            self._matcher_bios = bios_dict
+            self._all_bios_tokens = len(get_tokenizer()(_bios_section(bios_dict)))
+            self._lookup = None
+
+    async def astream(self, query: str, question: str = ""):
+        """
+        Run the workflow with progress events and token-by-token generation.
+
+        Mirrors classify -> [graph_lookup] -> [trace_paths] -> retrieval branches -> generate -> format_response,
+        with streaming synthesis so the first tokens reach the caller as soon as the LLM emits them.
+
+        @param query: The full prompt (see `build_modified_prompt`).
+        @param question: The raw user question (enables the graph fast path).
+        @return: An async generator of (event, payload) tuples: ("progress", {...}), ("token", str),
+                 and finally ("final", state_dict).
+        """
+        state = MarvelState(query=query, question=question)
+        with span("node.classify"):
+            state = MarvelState(**self.classify_query_node(state))
+        yield "progress", {"stage": "classify", "status": state.query_type}
+
+        if self._can_lookup(state):
+            with span("node.graph_lookup"):
+                state = MarvelState(**self.graph_lookup_node(state))
+            if state.final_response:
+                yield "progress", {"stage": "graph_lookup", "status": "answered"}
+                yield "token", state.final_response
+                yield "final", dict(state)
+                return
+
+        if self._can_trace(state):
+            with span("node.trace_paths"):
+                state = MarvelState(**await self.atrace_paths_node(state))
+            yield "progress", {"stage": "paths", "status": "found" if state.path_context else "none"}
+
+        query = _prompt(state)
+        yield "progress", {"stage": "retrieval", "status": "started"}
+        with span("node.retrieval"):
+            nodes = await self.aretrieve(state, self.query_engine)
+        yield "progress", {"stage": "retrieval", "status": "done", "nodes": len(nodes)}
+
+        parts = []
+        with span("node.generate"):
+            response = await self.stream_synthesizer.asynthesize(query, nodes)
+            async for delta in response.async_response_gen():
+                parts.append(delta)
+                yield "token", delta
+        state.raw_result = "".join(parts)
+
+        with span("node.format_response"):
+            state = MarvelState(**self.format_response_node(state))
+        yield "final", dict(state)
 
     def build_modified_prompt(self, user_question: str, bios_dict: dict) -> str:
         """
         Construct a prompt that includes bios, examples, and graph-based instructions for the LLM.
 
+        Only the bios of characters the question mentions (by name or alias) and of their one-hop graph
+        neighbors are included; the instructions and examples are a static prefix built once.
+
         @param user_question: The raw question from the user.
         @param bios_dict: A dictionary mapping character names to their biography strings.
         @return: A fully formatted prompt string to pass to the LLM.
         """
-        bios_snippets = "\n".join([f"{k}: {v}" for k, v in bios_dict.items()])
-
-        example_bio_1 = (
-            "Jean Grey: Jean Grey is a powerful mutant telepath and telekinetic. "
-            "She shares a deep, often tragic love with Cyclops, and her inner battles have placed her at the center of multiple pivotal events."
-        )
-        example_bio_2 = (
-            "Storm: Storm is a mutant with the ability to manipulate weather. "
-            "She is a strong leader in the X-Men and often serves as a moral compass for the team."
-        )
-
-        example_question_1 = "What gene gives Jean Grey her telekinetic powers?"
-        example_answer_1 = (
-            "🧬 Biography:\n"
-            f"{example_bio_1}\n\n"
-            "🧠 Answer:\n"
-            "Jean Grey's telekinetic powers are conferred by the Telepathy Mutation."
-        )
-
-        example_question_2 = "What gene gives Storm her weather powers?"
-        example_answer_2 = (
-            "🧬 Biography:\n"
-            f"{example_bio_2}\n\n"
-            "🧠 Answer:\n"
-            "Storm's weather control powers are possibly linked to the Weather Gene (confidence: 0.63)."
-        )
-
-        confidence_instruction = (
-            "⚠️ IMPORTANT: Some graph facts include a numeric confidence score.\n"
-            "If you reference a fact with confidence below **0.8**, you MUST:\n"
-            "- Use uncertainty phrasing like: \"possibly\", \"is likely\", or \"with some uncertainty\"\n"
-            "- Include the numeric score: e.g., (confidence: 0.67)\n\n"
-            "✅ Examples of accepted phrasing:\n"
-            "\"Storm's powers are possibly linked to the Weather Gene (confidence: 0.63).\"\n"
-            "\"Jean Grey may have the Telepathy Mutation (confidence: 0.72).\"\n\n"
-            "❌ Do NOT state the fact confidently or omit the score if it's below 0.8."
-        )
-
-        return (
-            "You are a Marvel AI assistant trained on genetic data, powers, and affiliations.\n"
-            "When answering questions, follow these instructions strictly:\n"
-            "1. Identify the characters mentioned or implied by the question.\n"
-            "2. For each such character, you MUST begin your answer with their biography from the list below.\n"
-            "   - If a biography is not available, say: \"⚠️ Biography for [Character Name] not found in this database.\"\n"
-            "   - You MUST then still proceed to answer the user’s question using only the available graph facts.\n"
-            "3. Avoid speculation or outside knowledge.\n\n"
-            f"{confidence_instruction}\n\n"
-            "Bios:\n"
-            f"{bios_snippets}\n\n"
-            "Here are two example formats:\n"
-            f"Q: {example_question_1}\n"
-            f"{example_answer_1}\n\n"
-            f"Q: {example_question_2}\n"
-            f"{example_answer_2}\n\n"
-            f"Now answer this question:\nQ: {user_question}"
-        )
-
+        self._ensure_matcher(bios_dict)
+        selected = select_bios(user_question, bios_dict, self._matcher, self.graph)
+        bios_section = _bios_section(selected)
+        question_section = f"Now answer this question:\nQ: {user_question}"
+
+        # Prompt size with every bio (the previous behaviour) vs. with the selected bios only
+        question_tokens = len(get_tokenizer()(question_section))
+        PROMPT_TOKENS.inc(_static_prefix_tokens() + self._all_bios_tokens + question_tokens, "all_bios")
+        PROMPT_TOKENS.inc(_static_prefix_tokens() + len(get_tokenizer()(bios_section)) + question_tokens, "selected_bios")
+        debug_print(f"🧬 Bios in prompt: {list(selected) or 'none'}")
+
+        return STATIC_PROMPT_PREFIX + bios_section + question_section
+
+
+def _configured(config):
+    """
+    @return: The (orchestrator, query engine) of a workflow invocation (see `MarvelGraphOrchestrator._run_config`).
+    """
+    configurable = config["configurable"]
+    return configurable["orchestrator"], configurable["query_engine"]
+
+
+def _node(name, method, amethod=None, uses_engine=False):
+    """
+    Wrap an orchestrator method as a workflow node: traced, and native under both `invoke` and `ainvoke`.
+
+    The node resolves the orchestrator (and query engine) from the invocation config, so one compiled
+    workflow serves every orchestrator.
+
+    @param name: The node name (recorded as the "node.<name>" stage).
+    @param method: Name of the synchronous method.
+    @param amethod: Optional name of the async method; cheap CPU-only nodes reuse `method` without a thread hop.
+    @param uses_engine: Whether the method takes the query engine as second argument.
+    @return: A RunnableLambda for `StateGraph.add_node`.
+    """
+    def func(state, config):
+        orchestrator, query_engine = _configured(config)
+        args = (state, query_engine) if uses_engine else (state,)
+        return getattr(orchestrator, method)(*args)
+
+    async def afunc(state, config):
+        orchestrator, query_engine = _configured(config)
+        args = (state, query_engine) if uses_engine else (state,)
+        if amethod is None:
+            return getattr(orchestrator, method)(*args)
+        return await getattr(orchestrator, amethod)(*args)
+
+    return RunnableLambda(traced(f"node.{name}")(func), afunc=traced(f"node.{name}")(afunc), name=name)
+
+
+def build_workflow(branches=RETRIEVAL_BRANCHES):
+    """
+    Build and compile the LangGraph workflow:
+    classify -> [graph_lookup] -> [trace_paths] -> retrieval branches (concurrently) -> generate -> format_response.
+
+    @param branches: The retrieval branches to fan out to (see `config.RETRIEVAL_BRANCHES`).
+    @return: The compiled graph application object.
+    """
+    graph = StateGraph(MarvelState)
+
+    graph.add_node("classify", _node("classify", "classify_query_node"))
+    graph.add_node("graph_lookup", _node("graph_lookup", "graph_lookup_node"))
+    graph.add_node("trace_paths", _node("trace_paths", "trace_paths_node", "atrace_paths_node"))
+    retrieval_nodes = [f"retrieve_{name}" for name in branches]
+    for name in branches:
+        amethod = "aretrieve_vector_node" if name == "vector" else None
+        graph.add_node(f"retrieve_{name}", _node(f"retrieve_{name}", f"retrieve_{name}_node", amethod,
+                                                 uses_engine=True))
+    graph.add_node("generate", _node("generate", "generate_node", "agenerate_node", uses_engine=True))
+    graph.add_node("format_response", _node("format_response", "format_response_node"))
+
+    def to_llm(state: MarvelState, config) -> list:
+        orchestrator, _ = _configured(config)
+        return ["trace_paths"] if orchestrator._can_trace(state) else retrieval_nodes
+
+    def route(state: MarvelState, config) -> list:
+        orchestrator, _ = _configured(config)
+        return ["graph_lookup"] if orchestrator._can_lookup(state) else to_llm(state, config)
+
+    def after_lookup(state: MarvelState, config) -> list:
+        return [END] if state.final_response else to_llm(state, config)
+
+    graph.set_entry_point("classify")
+    graph.add_conditional_edges("classify", route)
+    graph.add_conditional_edges("graph_lookup", after_lookup)
+    graph.add_conditional_edges("trace_paths", lambda state: retrieval_nodes)
+    # Generation waits for every branch
+    graph.add_edge(retrieval_nodes, "generate")
+    graph.add_edge("generate", "format_response")
+    graph.set_finish_point("format_response")
+
+    return graph.compile()
+
+
+_workflow = None
+_workflow_lock = threading.Lock()
+
+
+def compiled_workflow():
+    """
+    Return the process-wide compiled workflow, compiling it on first use.
+
+    @return: The compiled graph application object.
+    """
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                _workflow = build_workflow()
+    return _workflow
+
+
+def merge_retrieved(state: MarvelState) -> list:
+    """
+    Merge the retrieval branches' nodes into one context: vector (hybrid) results first, then graph
+    neighborhood, without duplicate texts and capped at RETRIEVAL_MAX_CONTEXT_NODES.
+
+    @param state: A MarvelState with the branches' results (missing branches are skipped).
+    @return: A list of NodeWithScore.
+    """
+    merged, seen = [], set()
+    for nodes in (state.vector_nodes, state.neighborhood_nodes):
+        for node in nodes or ():
+            text = node.node.get_content()
+            if text in seen:
+                continue
+            seen.add(text)
+            merged.append(node)
+            if len(merged) >= RETRIEVAL_MAX_CONTEXT_NODES:
+                return merged
+    return merged
+
+
+def _text_node(text, score):
+    return NodeWithScore(node=TextNode(text=text), score=score)
+
+
+def _confidence(data) -> float:
+    confidence = data.get("confidence")
+    return 1.0 if confidence is None else float(confidence)
+
+
+def _build_static_prompt_prefix() -> str:
+    """
+    Assemble the question-independent part of the prompt: instructions, confidence rules and examples.
+
+    @return: The static prompt prefix.
+    """
+    example_bio_1 = (
+        "Jean Grey: Jean Grey is a powerful mutant telepath and telekinetic. "
+        "She shares a deep, often tragic love with Cyclops, and her inner battles have placed her at the center of multiple pivotal events."
+    )
+    example_bio_2 = (
+        "Storm: Storm is a mutant with the ability to manipulate weather. "
+        "She is a strong leader in the X-Men and often serves as a moral compass for the team."
+    )
+
+    example_question_1 = "What gene gives Jean Grey her telekinetic powers?"
+    example_answer_1 = (
+        "🧬 Biography:\n"
+        f"{example_bio_1}\n\n"
+        "🧠 Answer:\n"
+        "Jean Grey's telekinetic powers are conferred by the Telepathy Mutation."
+    )
+
+    example_question_2 = "What gene gives Storm her weather powers?"
+    example_answer_2 = (
+        "🧬 Biography:\n"
+        f"{example_bio_2}\n\n"
+        "🧠 Answer:\n"
+        "Storm's weather control powers are possibly linked to the Weather Gene (confidence: 0.63)."
+    )
+
+    confidence_instruction = (
+        "⚠️ IMPORTANT: Some graph facts include a numeric confidence score.\n"
+        "If you reference a fact with confidence below **0.8**, you MUST:\n"
+        "- Use uncertainty phrasing like: \"possibly\", \"is likely\", or \"with some uncertainty\"\n"
+        "- Include the numeric score: e.g., (confidence: 0.67)\n\n"
+        "✅ Examples of accepted phrasing:\n"
+        "\"Storm's powers are possibly linked to the Weather Gene (confidence: 0.63).\"\n"
+        "\"Jean Grey may have the Telepathy Mutation (confidence: 0.72).\"\n\n"
+        "❌ Do NOT state the fact confidently or omit the score if it's below 0.8."
+    )
+
+    return (
+        "You are a Marvel AI assistant trained on genetic data, powers, and affiliations.\n"
+        "When answering questions, follow these instructions strictly:\n"
+        "1. Identify the characters mentioned or implied by the question.\n"
+        "2. For each such character, you MUST begin your answer with their biography from the list below.\n"
+        "   - If a biography is not available, say: \"⚠️ Biography for [Character Name] not found in this database.\"\n"
+        "   - You MUST then still proceed to answer the user’s question using only the available graph facts.\n"
+        "3. Avoid speculation or outside knowledge.\n\n"
+        f"{confidence_instruction}\n\n"
+        "Here are two example formats:\n"
+        f"Q: {example_question_1}\n"
+        f"{example_answer_1}\n\n"
+        f"Q: {example_question_2}\n"
+        f"{example_answer_2}\n\n"
+    )
+
+
+# Built once at import; identical across requests (which also lets the provider cache the prefix)
+STATIC_PROMPT_PREFIX = _build_static_prompt_prefix()
+_static_tokens = None
+
+
+def _static_prefix_tokens() -> int:
+    global _static_tokens
+    if _static_tokens is None:
+        _static_tokens = len(get_tokenizer()(STATIC_PROMPT_PREFIX))
+    return _static_tokens
+
+
+def _prompt(state: MarvelState) -> str:
+    """
+    The prompt sent to the query engine: the built prompt plus any ranked path context.
+    """
+    return f"{state.query}\n\n{state.path_context}" if state.path_context else state.query
+
+
+def _retrieval_query(state: MarvelState) -> str:
+    """
+    The query the retrieval branches search with: the user's question (the built prompt when there is none).
+    """
+    return state.question or state.query
+
+
+def _bios_section(bios_dict: dict) -> str:
+    """
+    Format the bios block of the prompt.
+
+    @param bios_dict: The character -> bio entries to include.
+    @return: The "Bios:" section, ending with a blank line.
+    """
+    if not bios_dict:
+        return "Bios:\n(No characters with a biography in this database are mentioned in the question.)\n\n"
+    bios_snippets = "\n".join([f"{k}: {v}" for k, v in bios_dict.items()])
+    return f"Bios:\n{bios_snippets}\n\n"
@@ -0,0 +1,293 @@
+import bisect
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import config
+
+# Latency buckets in seconds, from cached lookups up to cold index builds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def debug_print(*args, **kwargs):
+    """
+    Print only when debug logging is enabled (MARVEL_DEBUG=1, see `config.DEBUG_LOGGING`).
+
+    @return: None
+    """
+    if config.DEBUG_LOGGING:
+        print(*args, **kwargs)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, name, help_text, labels=()):
+        """
+        @param name: The metric name (e.g., "marvel_tokens_total").
+        @param help_text: One-line description shown in the HELP line.
+        @param labels: Label names; `inc` takes one value per label, in this order.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        """
+        Add to the counter.
+
+        @param amount: Non-negative amount to add.
+        @param label_values: One value per label name.
+        @return: None
+        """
+        if amount <= 0:
+            return
+        key = tuple(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *label_values):
+        """
+        @return: The current value for the given label values (0 if never incremented).
+        """
+        with self._lock:
+            return self._values.get(tuple(label_values), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with optional labels, rendered in the Prometheus text format.
+
+    Observations only bump one bucket counter under a lock; cumulative counts are computed when rendering.
+    """
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        """
+        @param name: The metric name (e.g., "marvel_stage_duration_seconds").
+        @param help_text: One-line description shown in the HELP line.
+        @param labels: Label names; `observe` takes one value per label, in this order.
+        @param buckets: Sorted upper bounds of the buckets (+Inf is added automatically).
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record one observation.
+
+        @param value: The observed value (seconds for latency histograms).
+        @param label_values: One value per label name.
+        @return: None
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        key = tuple(label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        """
+        @return: Number of observations for the given label values.
+        """
+        with self._lock:
+            series = self._series.get(tuple(label_values))
+            return series[2] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, extra=[("le", _format_number(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together by the /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """
+        @param metric: A Counter or Histogram.
+        @return: The same metric, so registration can wrap construction.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        @return: All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.register(Histogram(
+    "marvel_stage_duration_seconds", "Latency of each pipeline stage and LangGraph node.", labels=("stage",)))
+REQUEST_DURATION = registry.register(Histogram(
+    "marvel_request_duration_seconds", "End-to-end latency of API requests.", labels=("endpoint", "status")))
+TOKENS = registry.register(Counter(
+    "marvel_tokens_total", "Tokens counted by the TokenCountingHandler.", labels=("model", "kind")))
+COST_USD = registry.register(Counter(
+    "marvel_cost_usd_total", "Estimated OpenAI cost in USD.", labels=("model",)))
+ANSWERS = registry.register(Counter(
+    "marvel_answers_total", "Answers by source: graph fast path, LLM, or answer cache.", labels=("answered_by",)))
+PROMPT_TOKENS = registry.register(Counter(
+    "marvel_prompt_tokens_total", "Orchestrator prompt tokens with every bio vs. only the selected bios.",
+    labels=("variant",)))
+CACHE_LOOKUPS = registry.register(Counter(
+    "marvel_cache_lookups_total", "Cache lookups by cache and result (hit or miss).", labels=("cache", "result")))
+GRAPH_EDGE_CHANGES = registry.register(Counter(
+    "marvel_graph_edge_changes_total", "Edges changed through the graph mutation API.", labels=("change",)))
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a block of code and record it in the stage latency histogram.
+
+    @param stage: The stage name (e.g., "index_build", "node.classify").
+    @return: A context manager.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage)
+        debug_print(f"⏱️ {stage} took {elapsed:.2f} seconds")
+
+
+def traced(stage):
+    """
+    Decorator that wraps a function (sync or async) in a `span`.
+
+    @param stage: The stage name to record.
+    @return: The decorator.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache_lookups(cache, hits=0, misses=0):
+    """
+    Count cache hits and misses.
+
+    @param cache: The cache name (e.g., "embedding", "extraction", "runtime").
+    @param hits: Number of hits.
+    @param misses: Number of misses.
+    @return: None
+    """
+    CACHE_LOOKUPS.inc(hits, cache, "hit")
+    CACHE_LOOKUPS.inc(misses, cache, "miss")
+
+
+def record_token_usage(usage, model, embedding_model, cost_usd):
+    """
+    Add one request's token usage and cost to the counters.
+
+    @param usage: A TokenUsage or TokenCountingHandler with prompt/completion/embedding counts.
+    @param model: The LLM model name.
+    @param embedding_model: The embedding model name.
+    @param cost_usd: The estimated cost of the request.
+    @return: None
+    """
+    TOKENS.inc(usage.prompt_llm_token_count, model, "prompt")
+    TOKENS.inc(usage.completion_llm_token_count, model, "completion")
+    TOKENS.inc(usage.total_embedding_token_count, embedding_model, "embedding")
+    COST_USD.inc(cost_usd, model)
+
+
+def record_build_status(build_status):
+    """
+    Count the runtime, index and extraction cache outcomes reported in a request's build status.
+
+    @param build_status: The build_status dictionary returned by `RuntimeRegistry.get`.
+    @return: None
+    """
+    if build_status.get("runtime") == "skipped":
+        return  # answered from the answer cache
+    warm = build_status.get("runtime") == "warm"
+    record_cache_lookups("runtime", hits=int(warm), misses=int(not warm))
+    if not warm:
+        cached = build_status.get("index") == "cached"
+        record_cache_lookups("index_snapshot", hits=int(cached), misses=int(not cached))
+    extraction = build_status.get("extraction") or {}
+    record_cache_lookups("extraction", extraction.get("hits", 0), extraction.get("misses", 0))
@@ -0,0 +1,188 @@
+import threading
+from collections import OrderedDict
+
+from config import PATH_BEAM_WIDTH, PATH_CACHE_MAX_ENTRIES, PATH_MAX_HOPS
+
+# Relation chains for mutation questions: Character -> has_mutation -> Gene -> confers -> Power,
+# then the direct Character -> possesses_power edge
+MUTATION_PATTERNS = (("has_mutation", "confers"), ("possesses_power",))
+
+
+class GraphPath:
+    """
+    One directed path through the graph, scored by the product of its edge confidences.
+    """
+
+    def __init__(self, nodes, edges):
+        """
+        @param nodes: The node names along the path, source first.
+        @param edges: One (relation, confidence) tuple per hop (confidence may be None).
+        """
+        self.nodes = tuple(nodes)
+        self.edges = tuple(edges)
+        self.score = 1.0
+        for _, confidence in self.edges:
+            self.score *= 1.0 if confidence is None else confidence
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __str__(self):
+        parts = [self.nodes[0]]
+        for (relation, confidence), node in zip(self.edges, self.nodes[1:]):
+            label = relation if confidence is None else f"{relation} {confidence:.2f}"
+            parts.append(f"-[{label}]-> {node}")
+        return " ".join(parts) + f" (path confidence: {self.score:.2f})"
+
+
+class PathEngine:
+    """
+    Multi-hop path search over the in-memory DiGraph.
+
+    Paths follow edge direction and can be constrained to a relation pattern (one relation per hop).
+    With a target, the search is bidirectional: half the hops forward from the source, the other half
+    backward from the target, joined on the middle node. Without one, it is a bounded breadth-first
+    expansion. Each layer keeps at most `beam_width` partial paths (the most confident ones), so hubs
+    cannot blow up the search. Results are memoized per (graph version, source, target, pattern, hops).
+    """
+
+    def __init__(self, graph, graph_version=None, beam_width=PATH_BEAM_WIDTH, max_entries=PATH_CACHE_MAX_ENTRIES):
+        """
+        @param graph: The NetworkX DiGraph with 'relation' and 'confidence' edge attributes.
+        @param graph_version: The graph version, part of every memoization key.
+        @param beam_width: Maximum partial paths kept per search layer.
+        @param max_entries: Maximum memoized queries (least recently used are evicted).
+        """
+        self.graph = graph
+        self.graph_version = graph_version
+        self.beam_width = beam_width
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def find_paths(self, source, target=None, pattern=None, max_hops=PATH_MAX_HOPS, top_k=5):
+        """
+        Find the most confident paths from a source node (to a target node, if given).
+
+        @param source: The start node.
+        @param target: Optional end node.
+        @param pattern: Optional sequence of relations, one per hop (fixes the path length).
+        @param max_hops: Maximum path length when there is no pattern.
+        @param top_k: Number of paths to return.
+        @return: A list of GraphPath, most confident first (ties: shorter, then alphabetical).
+        """
+        pattern = tuple(pattern) if pattern else None
+        key = (self.graph_version, source, target, pattern, max_hops, top_k)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        paths = []
+        if source in self.graph and (target is None or target in self.graph):
+            lengths = [len(pattern)] if pattern else range(1, max_hops + 1)
+            for length in lengths:
+                if target is None:
+                    paths.extend(self._expand(source, length, pattern, forward=True))
+                else:
+                    paths.extend(self._bidirectional(source, target, length, pattern))
+        paths.sort(key=lambda p: (-p.score, len(p), p.nodes))
+        paths = paths[:top_k]
+
+        with self._lock:
+            self._memo[key] = paths
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return paths
+
+    def trace(self, entities, patterns=MUTATION_PATTERNS, top_k=5):
+        """
+        Find the best paths between the entities a question mentions.
+
+        With two or more entities, paths run from the first to the last one (or the other way round if
+        that finds nothing), trying each relation pattern and then any path up to `PATH_MAX_HOPS`. With
+        one entity, the patterns are expanded from it.
+
+        @param entities: Graph nodes mentioned in the question, in order of appearance.
+        @param patterns: Relation patterns to try, most specific first.
+        @param top_k: Number of paths to return.
+        @return: A list of GraphPath, most confident first.
+        """
+        entities = [e for e in entities if e in self.graph]
+        if not entities:
+            return []
+        if len(entities) == 1:
+            paths = [p for pattern in patterns for p in self.find_paths(entities[0], pattern=pattern, top_k=top_k)]
+        else:
+            paths = []
+            for source, target in ((entities[0], entities[-1]), (entities[-1], entities[0])):
+                for pattern in tuple(patterns) + (None,):
+                    paths.extend(self.find_paths(source, target, pattern=pattern, top_k=top_k))
+                if paths:
+                    break
+        unique = {p.nodes: p for p in paths}
+        return sorted(unique.values(), key=lambda p: (-p.score, len(p), p.nodes))[:top_k]
+
+    def _bidirectional(self, source, target, length, pattern):
+        forward_hops = (length + 1) // 2
+        forward = self._expand(source, forward_hops, pattern[:forward_hops] if pattern else None, forward=True)
+        backward = self._expand(target, length - forward_hops, pattern[forward_hops:] if pattern else None,
+                                forward=False)
+        by_start = {}
+        for path in backward:
+            by_start.setdefault(path.nodes[0], []).append(path)
+
+        joined = []
+        for head in forward:
+            for tail in by_start.get(head.nodes[-1], ()):
+                if set(head.nodes).isdisjoint(tail.nodes[1:]):
+                    joined.append(GraphPath(head.nodes + tail.nodes[1:], head.edges + tail.edges))
+        return joined
+
+    def _expand(self, start, hops, pattern, forward):
+        """
+        All simple paths of exactly `hops` edges from (forward) or into (backward) `start`, layer by layer.
+
+        Backward paths are returned in graph direction, i.e. ending at `start`.
+        """
+        adjacency = self.graph.succ if forward else self.graph.pred
+        layer = [GraphPath([start], [])]
+        for depth in range(hops):
+            relation_wanted = pattern[depth if forward else len(pattern) - 1 - depth] if pattern else None
+            next_layer = []
+            for path in layer:
+                end = path.nodes[-1] if forward else path.nodes[0]
+                for neighbor, data in adjacency[end].items():
+                    relation = data.get("relation", "related_to")
+                    if relation_wanted is not None and relation != relation_wanted:
+                        continue
+                    if neighbor in path.nodes:
+                        continue
+                    edge = (relation, data.get("confidence"))
+                    if forward:
+                        next_layer.append(GraphPath(path.nodes + (neighbor,), path.edges + (edge,)))
+                    else:
+                        next_layer.append(GraphPath((neighbor,) + path.nodes, (edge,) + path.edges))
+            if len(next_layer) > self.beam_width:
+                next_layer.sort(key=lambda p: -p.score)
+                next_layer = next_layer[:self.beam_width]
+            layer = next_layer
+        return layer
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+
+def format_paths(paths):
+    """
+    Format ranked paths as prompt context for the LLM.
+
+    @param paths: A list of GraphPath, most confident first.
+    @return: The context block, or an empty string if there are no paths.
+    """
+    if not paths:
+        return ""
+    lines = [f"{i}. {path}" for i, path in enumerate(paths, start=1)]
+    return ("Graph paths relevant to this question, ranked by path confidence "
+            "(product of edge confidences):\n" + "\n".join(lines))
@@ -0,0 +1,557 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from async_runtime import run_async
+from cache_utils import CACHE_DIR
+from client_registry import client_registry, api_key_fingerprint
+import config
+from config import MAX_WARM_RUNTIMES, INGESTION_MODE, OPENAI_API_KEY, CHOSEN_MODEL, CHOSEN_MODEL_EMBEDDINGS
+from document_index import get_document_index
+from extraction_cache import acached_extract
+from graph_utils import GRAPH_PATH, build_and_save_mock_marvel_graph, extract_humanized_triplets_from_graph, \
+    filter_documents_by_rules, build_triplet_documents, load_graph_cached, \
+    build_property_graph_nodes, apply_edge_mutations, build_graph_snapshot, save_graph_snapshot, humanize_triplet, \
+    triplet_document_id
+from index_store import load_index_snapshot, save_index_snapshot, prune_index_snapshots, update_index
+from metrics import debug_print, span, GRAPH_EDGE_CHANGES
+
+TRIPLETS_PATH = os.path.join(CACHE_DIR, "triplets.jsonl")
+
+
+def _read_triplets(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        next(f, None)  # header
+        for line in f:
+            yield json.loads(line)
+
+
+def load_or_build_triplets(graph, graph_version):
+    """
+    Load the humanized triplet sentences for a graph version from disk, or rebuild and save them.
+
+    The cache is JSON Lines: a header with the graph version, then one sentence per line. Sentences are
+    streamed from the graph to disk and read back lazily, so they are never all held in memory.
+
+    @param graph: The NetworkX graph the triplets are derived from.
+    @param graph_version: The content hash of the graph; cached triplets for other versions are ignored.
+    @return: A tuple (triplet_texts, status) where triplet_texts is a generator of sentences and status is
+        'cached' or 'rebuilt'.
+    """
+    if os.path.exists(TRIPLETS_PATH):
+        try:
+            with open(TRIPLETS_PATH, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+            if isinstance(header, dict) and header.get("graph_version") == graph_version:
+                return _read_triplets(TRIPLETS_PATH), 'cached'
+        except (OSError, ValueError):
+            pass
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{TRIPLETS_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"graph_version": graph_version}) + "\n")
+        for text in extract_humanized_triplets_from_graph(graph):
+            f.write(json.dumps(text) + "\n")
+    os.replace(tmp_path, TRIPLETS_PATH)
+    return _read_triplets(TRIPLETS_PATH), 'rebuilt'
+
+
+class MarvelRuntime:
+    """
+    Warm pipeline state for one (API key, LLM model, embedding model, graph version, ingestion mode)
+    combination.
+
+    Holds the graph, the LLM and embedding clients, the index, its query engine and the compiled
+    orchestrator, so requests only pay for the final query.
+    """
+
+    def __init__(self, graph, graph_version, model, embedding_model, ingestion_mode, llm, embed_model, handler,
+                 callback_manager, index, query_engine, orchestrator, build_status):
+        self.graph = graph
+        self.graph_version = graph_version
+        self.model = model
+        self.embedding_model = embedding_model
+        self.ingestion_mode = ingestion_mode
+        self.llm = llm
+        self.embed_model = embed_model
+        self.handler = handler
+        self.callback_manager = callback_manager
+        self.index = index
+        self.query_engine = query_engine
+        self.orchestrator = orchestrator
+        self.build_status = build_status
+        self.created_at = time.time()
+
+    def warm_status(self):
+        """
+        Build status reported for requests served by this runtime after it was built.
+
+        @return: A build_status dictionary with every stage marked as cached.
+        """
+        return {
+            "graph": "cached",
+            "triplets": self.build_status["triplets"] if self.ingestion_mode == "graph" else "cached",
+            "index": "cached",
+            "extraction": {"hits": 0, "misses": 0},
+            "ingestion": self.ingestion_mode,
+            "clients": "reused",
+            "runtime": "warm",
+        }
+
+    def apply_graph_delta(self, graph, graph_version, changes):
+        """
+        Build this runtime's index for a new graph version by re-indexing only the triplets that changed.
+
+        Only new triplet documents are extracted (through the extraction cache) and embedded; the index is
+        updated copy-on-write, so this runtime is left untouched: `swap_graph` moves it over once every
+        runtime's delta has succeeded and the graph version is published.
+
+        @param graph: The updated NetworkX graph.
+        @param graph_version: Its version.
+        @param changes: The (source, target, old_data, new_data) edge changes (see `apply_edge_mutations`).
+        @return: A tuple (index, query_engine, delta): the new index and its query engine, and a dictionary
+                 with the removed and added document counts and the extraction stats.
+        """
+        extraction_stats = {"hits": 0, "misses": 0}
+        if self.ingestion_mode == "graph":
+            removed_ids = {triplet_document_id(humanize_triplet(u, v, old)) for u, v, old, _ in changes
+                           if old is not None}
+            added_nodes = list(build_property_graph_nodes(
+                graph, edges=[(u, v, new) for u, v, _, new in changes if new is not None]))
+        else:
+            removed_ids = {triplet_document_id(humanize_triplet(u, v, old)) for u, v, old, _ in changes
+                           if old is not None}
+            # The keyword rules select each document by its own text, so only the changed edges' documents
+            # can enter or leave the selection, unless the EXTRACTION_MAX_DOCUMENTS cap is (or becomes) binding
+            added_docs = filter_documents_by_rules(
+                build_triplet_documents(humanize_triplet(u, v, new) for u, v, _, new in changes if new is not None),
+                include_keywords=config.EXTRACTION_INCLUDE_KEYWORDS,
+                exclude_keywords=config.EXTRACTION_EXCLUDE_KEYWORDS,
+                max_documents=None,
+            )
+            unchanged = removed_ids & {doc.id_ for doc in added_docs}
+            removed_ids -= unchanged
+            added_docs = [doc for doc in added_docs if doc.id_ not in unchanged]
+            max_documents = config.EXTRACTION_MAX_DOCUMENTS
+            if max_documents is not None:
+                # In "llm" mode the docstore holds exactly the selected documents
+                selected = len(self.index.docstore.docs)
+                if selected >= max_documents or selected + len(added_docs) > max_documents:
+                    # The cap depends on the whole graph's document order: diff the old and new selections
+                    old_ids = {doc.id_ for doc in select_extraction_documents(
+                        extract_humanized_triplets_from_graph(self.graph), self.graph_version)}
+                    new_docs = select_extraction_documents(extract_humanized_triplets_from_graph(graph),
+                                                           graph_version)
+                    removed_ids = old_ids - {doc.id_ for doc in new_docs}
+                    added_docs = [doc for doc in new_docs if doc.id_ not in old_ids]
+            added_nodes = []
+            if added_docs:
+                with span("path_extraction"):
+                    added_nodes, extraction_stats = run_async(
+                        acached_extract(create_path_extractor(self.llm), added_docs, self.model),
+                        timeout=None,
+                    )
+        added = len(added_nodes)
+
+        with span("index_update"):
+            index = update_index(self.index, removed_ids, added_nodes, self.llm, self.embed_model,
+                                 self.callback_manager)
+        with span("index_save"):
+            # Not pruned: the current version's snapshots stay until the new version is published
+            save_index_snapshot(index, graph_version, self.embedding_model, self.ingestion_mode, prune=False)
+        query_engine = create_query_engine(index, self.llm, self.embed_model, self.callback_manager)
+        delta = {"removed_documents": len(removed_ids), "added_documents": added, "extraction": extraction_stats}
+        return index, query_engine, delta
+
+    def swap_graph(self, graph, graph_version, index, query_engine):
+        """
+        Point this runtime at a new graph version and its index (from `apply_graph_delta`).
+
+        @return: None
+        """
+        self.orchestrator.update_graph(query_engine, graph, graph_version)
+        self.index, self.query_engine = index, query_engine
+        self.graph, self.graph_version = graph, graph_version
+
+
+def select_extraction_documents(triplet_texts, graph_version):
+    """
+    Select the triplet documents sent to LLM path extraction, by the EXTRACTION_* keyword rules.
+
+    @param triplet_texts: Iterable of humanized triplet sentences.
+    @param graph_version: The content hash of the graph they come from (keys the keyword index).
+    @return: The selected Documents.
+    """
+    documents = build_triplet_documents(triplet_texts)
+    if config.EXTRACTION_INCLUDE_KEYWORDS or config.EXTRACTION_EXCLUDE_KEYWORDS:
+        documents = get_document_index(graph_version, documents)
+    return filter_documents_by_rules(
+        documents,
+        include_keywords=config.EXTRACTION_INCLUDE_KEYWORDS,
+        exclude_keywords=config.EXTRACTION_EXCLUDE_KEYWORDS,
+        max_documents=config.EXTRACTION_MAX_DOCUMENTS
+    )
+
+
+def create_path_extractor(llm):
+    """
+    @return: The SchemaLLMPathExtractor used to parse triplet sentences in "llm" ingestion mode.
+    """
+    from llama_index.core.indices.property_graph import SchemaLLMPathExtractor
+    return SchemaLLMPathExtractor(llm=llm, strict=False)
+
+
+def create_query_engine(index, llm, embed_model, callback_manager):
+    """
+    @return: The query engine the orchestrator uses over `index`: LLM synonym retrieval plus hybrid
+             (entity vectors fused with triplet BM25) context retrieval, its BM25 index already built.
+    """
+    from llama_index.core.indices.property_graph import LLMSynonymRetriever
+    from llama_index.core.response_synthesizers import get_response_synthesizer
+    from hybrid_retriever import HybridContextRetriever
+
+    sub_retrievers = [
+        LLMSynonymRetriever(index.property_graph_store, llm=llm, include_text=True),
+        HybridContextRetriever(index.property_graph_store, include_text=True, embed_model=embed_model,
+                               vector_store=index.vector_store, similarity_top_k=3).prepare(),
+    ]
+    # Pass the synthesizer explicitly: the default one re-binds the LLM to the global callback manager
+    return index.as_query_engine(
+        llm=llm,
+        response_synthesizer=get_response_synthesizer(llm=llm, callback_manager=callback_manager),
+        callback_manager=callback_manager,
+        sub_retrievers=sub_retrievers,
+    )
+
+
+def build_index_nodes(graph, graph_version, ingestion_mode, llm, model):
+    """
+    Produce the nodes a cold index build needs, with their KG nodes and relations attached.
+
+    @param graph: The source NetworkX graph.
+    @param graph_version: The content hash of the graph.
+    @param ingestion_mode: "llm" to run cached SchemaLLMPathExtractor over triplet sentences,
+                           "graph" to convert graph edges directly.
+    @param llm: The LLM used for path extraction in "llm" mode.
+    @param model: The LLM model name (part of the extraction cache key).
+    @return: A tuple (nodes, triplets_status, extraction_stats).
+    """
+    if ingestion_mode == "graph":
+        with span("graph_ingestion"):
+            nodes = list(build_property_graph_nodes(graph))
+        return nodes, 'skipped', {"hits": 0, "misses": 0}
+
+    with span("triplets"):
+        triplet_texts, triplets_status = load_or_build_triplets(graph, graph_version)
+
+    filtered_docs = select_extraction_documents(triplet_texts, graph_version)
+    with span("path_extraction"):
+        # On the shared loop, so the LLM's async client is reused by later requests; no timeout for cold builds
+        nodes, extraction_stats = run_async(
+            acached_extract(create_path_extractor(llm), filtered_docs, model), timeout=None
+        )
+    debug_print(f"📦 Path extraction: {extraction_stats['hits']} cached, {extraction_stats['misses']} extracted")
+    return nodes, triplets_status, extraction_stats
+
+
+def preload_modules():
+    """
+    Import the heavy modules (llama_index, LangGraph, the OpenAI SDK) that the question path loads lazily,
+    and load the tokenizer, so the first request does not pay for them.
+
+    @return: None
+    """
+    import llama_index.core.indices.property_graph  # noqa: F401
+    import llama_index.core.response_synthesizers  # noqa: F401
+    from llama_index.core.utils import get_tokenizer
+    import embedding_cache  # noqa: F401
+    import hybrid_retriever  # noqa: F401
+    import marvel_graph_orchestrator  # noqa: F401
+    import token_counting  # noqa: F401
+    if config.LLM_BACKEND == "stub":
+        import stub_backends  # noqa: F401
+    else:
+        import llama_index.embeddings.openai  # noqa: F401
+        import llama_index.llms.openai  # noqa: F401
+    get_tokenizer()("warmup")
+
+
+def build_runtime(api_key, model, embedding_model, graph, graph_version, graph_status, ingestion_mode=INGESTION_MODE):
+    """
+    Build a MarvelRuntime: clients, index (from snapshot or cold build) and orchestrator.
+
+    @param api_key: The OpenAI API key used by the clients.
+    @param model: The LLM model name.
+    @param embedding_model: The embedding model name.
+    @param graph: The source NetworkX graph.
+    @param graph_version: The content hash of the graph.
+    @param graph_status: 'cached' or 'rebuilt', reported in the build status.
+    @param ingestion_mode: "llm" or "graph" (see `config.INGESTION_MODE`).
+    @return: The new MarvelRuntime.
+    """
+    # Heavy imports (llama_index, LangGraph) are paid by the first runtime build, not at worker boot
+    from llama_index.core.indices.property_graph import PropertyGraphIndex, ImplicitPathExtractor
+    from llama_index.core.response_synthesizers import get_response_synthesizer
+    from marvel_graph_orchestrator import MarvelGraphOrchestrator
+    from vector_index import MatrixVectorStore
+
+    # LLM, embedding, and callback manager: pooled per (API key, model, embedding model)
+    clients, clients_status = client_registry.get(api_key, model, embedding_model)
+    llm, embed_model, callback_manager = clients.llm, clients.embed_model, clients.callback_manager
+
+    # Index: persisted snapshot, or cold build with cached extraction
+    with span("index_load"):
+        index = load_index_snapshot(graph_version, embedding_model, llm=llm, embed_model=embed_model,
+                                    callback_manager=callback_manager, ingestion_mode=ingestion_mode)
+    extraction_stats = {"hits": 0, "misses": 0}
+    triplets_status = 'cached' if ingestion_mode == "llm" else 'skipped'
+    if index is not None:
+        index_status = 'cached'
+    else:
+        extracted_nodes, triplets_status, extraction_stats = build_index_nodes(
+            graph, graph_version, ingestion_mode, llm, model
+        )
+
+        # Nodes already carry their paths, so skip the default LLM extractors
+        with span("index_build"):
+            index = PropertyGraphIndex(
+                nodes=extracted_nodes,
+                embed_model=embed_model,
+                llm=llm,
+                kg_extractors=[ImplicitPathExtractor()],
+                vector_store=MatrixVectorStore(),
+                callback_manager=callback_manager,
+                show_progress=False,
+            )
+        with span("index_save"):
+            save_index_snapshot(index, graph_version, embedding_model, ingestion_mode)
+        index_status = 'rebuilt'
+    query_engine = create_query_engine(index, llm, embed_model, callback_manager)
+    # Same retriever, token-by-token synthesis for /question/stream
+    stream_synthesizer = get_response_synthesizer(llm=llm, callback_manager=callback_manager, streaming=True)
+    orchestrator = MarvelGraphOrchestrator(query_engine, stream_synthesizer=stream_synthesizer, graph=graph,
+                                           graph_version=graph_version)
+
+    build_status = {
+        "graph": graph_status,
+        "triplets": triplets_status,
+        "index": index_status,
+        "extraction": extraction_stats,
+        "ingestion": ingestion_mode,
+        "clients": clients_status,
+        "runtime": "cold",
+    }
+    return MarvelRuntime(graph, graph_version, model, embedding_model, ingestion_mode, llm, embed_model,
+                         clients.handler, callback_manager, index, query_engine, orchestrator, build_status)
+
+
+class RuntimeRegistry:
+    """
+    Process-level registry of warm MarvelRuntimes.
+
+    Runtimes are keyed by (API key fingerprint, model, embedding model, graph version, ingestion mode),
+    kept in LRU order, and dropped when the graph file changes or `reset()` is called.
+    """
+
+    def __init__(self, graph_path=GRAPH_PATH, max_runtimes=MAX_WARM_RUNTIMES):
+        """
+        @param graph_path: Path of the GML graph the runtimes are built from (loaded through its binary snapshot).
+        @param max_runtimes: Maximum number of warm runtimes kept at once.
+        """
+        self.graph_path = graph_path
+        self.max_runtimes = max_runtimes
+        self._runtimes = OrderedDict()
+        self._build_locks = {}
+        self._graph_version = None
+        self._lock = threading.Lock()
+        self._mutation_lock = threading.Lock()
+
+    def current_graph(self):
+        """
+        Return the current graph, building the mock graph if no graph exists yet.
+
+        When the graph version differs from the one the warm runtimes were built for, those
+        runtimes are discarded.
+
+        @return: A tuple (graph, graph_version, graph_status).
+        """
+        with span("graph_load"):
+            loaded = load_graph_cached(self.graph_path)
+        if loaded is None:
+            with self._lock:
+                loaded = load_graph_cached(self.graph_path)
+                if loaded is None:
+                    build_and_save_mock_marvel_graph()
+                    loaded = load_graph_cached(self.graph_path)
+                    graph_status = 'rebuilt'
+                else:
+                    graph_status = 'cached'
+        else:
+            graph_status = 'cached'
+        graph, graph_version, _ = loaded
+
+        with self._lock:
+            if self._graph_version != graph_version:
+                # Re-check under the lock: a graph mutation may have published a newer version meanwhile
+                graph, graph_version, _ = load_graph_cached(self.graph_path)
+            if self._graph_version != graph_version:
+                if self._runtimes:
+                    debug_print("🔄 Graph changed - dropping warm runtimes.")
+                self._runtimes.clear()
+                self._graph_version = graph_version
+        return graph, graph_version, graph_status
+
+    def get(self, api_key, model, embedding_model, ingestion_mode=INGESTION_MODE):
+        """
+        Return a warm runtime for the given clients, building it on first use.
+
+        @param api_key: The OpenAI API key.
+        @param model: The LLM model name.
+        @param embedding_model: The embedding model name.
+        @param ingestion_mode: "llm" or "graph" (see `config.INGESTION_MODE`).
+        @return: A tuple (runtime, build_status) for this request.
+        """
+        graph, graph_version, graph_status = self.current_graph()
+        key = (api_key_fingerprint(api_key), model, embedding_model, graph_version, ingestion_mode)
+
+        with self._lock:
+            runtime = self._runtimes.get(key)
+            if runtime is not None:
+                self._runtimes.move_to_end(key)
+                return runtime, runtime.warm_status()
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                runtime = self._runtimes.get(key)
+            if runtime is not None:
+                return runtime, runtime.warm_status()
+
+            runtime = build_runtime(api_key, model, embedding_model, graph, graph_version, graph_status,
+                                    ingestion_mode)
+            with self._lock:
+                if self._graph_version == graph_version:
+                    self._runtimes[key] = runtime
+                    while len(self._runtimes) > self.max_runtimes:
+                        self._runtimes.popitem(last=False)
+                self._build_locks.pop(key, None)
+        return runtime, runtime.build_status
+
+    def mutate_edges(self, upserts=(), removals=()):
+        """
+        Add, update and remove edges, publish the new graph version and carry the warm runtimes over to it.
+
+        Each warm runtime re-indexes only the changed triplets (see `MarvelRuntime.apply_graph_delta`) instead
+        of being dropped and rebuilt cold. Mutations are serialized; requests keep being served meanwhile. The
+        runtimes are moved to the new version together with its publication, and only if every delta
+        succeeded: if one fails, the graph and all runtimes stay on the previous version.
+
+        @param upserts: Iterable of (source, target, relation, confidence) edges to add or update.
+        @param removals: Iterable of (source, target) edges to remove.
+        @return: A report dictionary: previous and new graph_version, change counts and per-runtime updates.
+        """
+        start = time.perf_counter()
+        with self._mutation_lock:
+            graph, graph_version, _ = self.current_graph()
+            new_graph, changes, missing = apply_edge_mutations(graph, upserts, removals)
+            counts = {
+                "added": sum(1 for change in changes if change[2] is None),
+                "updated": sum(1 for change in changes if change[2] is not None and change[3] is not None),
+                "removed": sum(1 for change in changes if change[3] is None),
+                "missing": missing,
+            }
+            report = {"previous_version": graph_version, "graph_version": graph_version, "changes": counts,
+                      "runtimes": []}
+            if not changes:
+                report["seconds"] = round(time.perf_counter() - start, 3)
+                return report
+
+            with span("graph_mutation"):
+                snapshot = build_graph_snapshot(new_graph)
+            new_version = snapshot.version
+            with self._lock:
+                runtimes = [(key, runtime) for key, runtime in self._runtimes.items() if key[3] == graph_version]
+            updated = {}
+            for key, runtime in runtimes:
+                runtime_start = time.perf_counter()
+                index, query_engine, delta = runtime.apply_graph_delta(new_graph, new_version, changes)
+                updated[key[:3] + (new_version,) + key[4:]] = (runtime, index, query_engine)
+                report["runtimes"].append(dict(delta, model=runtime.model, embedding_model=runtime.embedding_model,
+                                               ingestion=runtime.ingestion_mode,
+                                               seconds=round(time.perf_counter() - runtime_start, 3)))
+
+            # Publish, swap and re-key together, so no request sees the new version without its warm runtimes
+            with self._lock:
+                save_graph_snapshot(new_graph, snapshot, self.graph_path)
+                for runtime, index, query_engine in updated.values():
+                    runtime.swap_graph(new_graph, new_version, index, query_engine)
+                self._runtimes = OrderedDict(
+                    (key[:3] + (new_version,) + key[4:], runtime) for key, runtime in self._runtimes.items()
+                    if key[:3] + (new_version,) + key[4:] in updated
+                )
+                self._graph_version = new_version
+            prune_index_snapshots(new_version)
+        for change, count in counts.items():
+            if change != "missing" and count:
+                GRAPH_EDGE_CHANGES.inc(count, change)
+        debug_print(f"✏️ Graph {graph_version} -> {new_version}: {counts['added']} added, {counts['updated']} updated, "
+              f"{counts['removed']} removed; {len(updated)} warm runtime(s) updated.")
+        report["graph_version"] = new_version
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        return report
+
+    def warmup(self, api_key=None, model=CHOSEN_MODEL, embedding_model=CHOSEN_MODEL_EMBEDDINGS,
+               ingestion_mode=INGESTION_MODE):
+        """
+        Preload everything the first request would otherwise pay for: heavy imports, the graph snapshot and,
+        when an API key is available, a warm runtime (index snapshot or cold build, compiled orchestrator).
+
+        @param api_key: The OpenAI API key to build the runtime for (defaults to OPENAI_API_KEY).
+        @param model: The LLM model name.
+        @param embedding_model: The embedding model name.
+        @param ingestion_mode: "llm" or "graph" (see `config.INGESTION_MODE`).
+        @return: A report dictionary: graph_version, per-stage seconds, the runtime build_status (None if no
+            API key was available) and total seconds.
+        """
+        start = time.perf_counter()
+        stages = {}
+
+        stage_start = time.perf_counter()
+        with span("warmup.imports"):
+            preload_modules()
+        stages["imports"] = round(time.perf_counter() - stage_start, 3)
+
+        stage_start = time.perf_counter()
+        with span("warmup.graph"):
+            _, graph_version, _ = self.current_graph()
+        stages["graph"] = round(time.perf_counter() - stage_start, 3)
+
+        build_status = None
+        api_key = api_key or OPENAI_API_KEY
+        if api_key:
+            stage_start = time.perf_counter()
+            with span("warmup.runtime"):
+                _, build_status = self.get(api_key, model, embedding_model, ingestion_mode)
+            stages["runtime"] = round(time.perf_counter() - stage_start, 3)
+
+        report = {"graph_version": graph_version, "stages": stages, "build_status": build_status,
+                  "seconds": round(time.perf_counter() - start, 3)}
+        debug_print(f"🔥 Warmup done in {report['seconds']}s ({', '.join(f'{k} {v}s' for k, v in stages.items())})"
+              + ("" if api_key else " - no API key, runtime not built"))
+        return report
+
+    def reset(self):
+        """
+        Drop every warm runtime so the next request rebuilds from disk.
+
+        @return: None
+        """
+        with self._lock:
+            self._runtimes.clear()
+            self._graph_version = None
+
+
+runtime_registry = RuntimeRegistry()
@@ -0,0 +1,66 @@
+"""
+The answer step shared by /question (app.py, async_server.py) and question batches (batch_questions.py).
+
+With a warm runtime, one question goes through the semantic answer cache, the graph fast path, then the
+LangGraph workflow under the shared in-flight limit (MAX_INFLIGHT_REQUESTS), and a fresh answer is stored in
+the answer cache. The exact cache tier needs no runtime, so callers check it before getting one.
+"""
+import asyncio
+
+from answer_cache import answer_cache
+from async_runtime import async_runtime
+from character_bios import CHARACTER_BIOS
+from metrics import span
+
+
+def graph_answer_or_prompt(orchestrator, question):
+    """
+    @return: A tuple (final state from the graph fast path or None, prompt for the LLM or None).
+    """
+    final_state = orchestrator.answer_from_graph(question)
+    if final_state is not None:
+        return final_state, None
+    return None, orchestrator.build_modified_prompt(question, CHARACTER_BIOS)
+
+
+async def aanswer_with_runtime(runtime, question, use_answer_cache=True, answer_source="bypass", invoke=None):
+    """
+    Answer one question with a warm runtime, on the shared event loop.
+
+    Blocking steps (entity matching, the graph fast path and prompt building) run in worker threads.
+
+    @param runtime: The MarvelRuntime (see `RuntimeRegistry.get`).
+    @param question: The raw user question.
+    @param use_answer_cache: Whether to look the question up in the semantic tier and store the answer.
+    @param answer_source: The outcome of the caller's exact cache lookup ("miss" or "bypass").
+    @param invoke: Optional coroutine function (prompt, question) -> final state that replaces the default
+                   workflow call, `async_runtime.limited(orchestrator.ainvoke(prompt, question))`.
+    @return: A tuple (response, answer_source, answered_by): answer_source becomes "semantic" on a semantic
+             cache hit, and answered_by is then None.
+    @raise TimeoutError: If the default workflow call did not finish within REQUEST_TIMEOUT_SECONDS.
+    """
+    orchestrator = runtime.orchestrator
+    question_embedding = entities = None
+    if use_answer_cache and answer_cache.semantic:
+        with span("answer_cache_semantic"):
+            question_embedding = await runtime.embed_model.aget_query_embedding(question)
+            entities = await asyncio.to_thread(orchestrator.mentioned_entities, question)
+            response = answer_cache.get_similar(question_embedding, entities, runtime.model,
+                                                runtime.embedding_model, runtime.graph_version,
+                                                runtime.ingestion_mode)
+        if response is not None:
+            return response, "semantic", None
+
+    with span("orchestrator"):
+        # Single-hop lookups are answered from the graph: no prompt or LLM call
+        final_state, prompt = await asyncio.to_thread(graph_answer_or_prompt, orchestrator, question)
+        if final_state is None:
+            if invoke is None:
+                final_state = await async_runtime.limited(orchestrator.ainvoke(prompt, question))
+            else:
+                final_state = await invoke(prompt, question)
+    response = final_state["final_response"]
+    if use_answer_cache:
+        answer_cache.put(question, runtime.model, runtime.embedding_model, runtime.graph_version,
+                         runtime.ingestion_mode, response, embedding=question_embedding, entities=entities)
+    return response, answer_source, final_state.get("answered_by")
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel
 
 class MarvelState(BaseModel):
@@ -8,13 +8,23 @@ class MarvelState(BaseModel):
     Tracks the user query, its classified type, raw graph response, and the final formatted LLM output.
 
     Fields:
-    - query: The original user question.
+    - query: The full prompt sent to the query engine (bios, instructions and the question).
+    - question: The raw user question, used for routing and graph lookups (empty if unknown).
     - query_type: The routing category determined from the query.
     - raw_result: The unformatted response returned from the graph query.
     - final_response: The final response to return to the user after formatting.
+    - answered_by: "graph" when the fast path answered from the DiGraph, "llm" otherwise.
+    - path_context: Ranked multi-hop graph paths added to the LLM prompt on the mutation_path route.
+    - vector_nodes, neighborhood_nodes: Context retrieved by each retrieval branch (NodeWithScore
+      lists, None until the branch ran); each branch writes only its own field, so they can run concurrently.
     """
 
     query: str
+    question: Optional[str] = ""
     query_type: Optional[str] = "default"
     raw_result: Optional[str] = ""
     final_response: Optional[str] = ""
+    answered_by: Optional[str] = ""
+    path_context: Optional[str] = ""
+    vector_nodes: Optional[List[Any]] = None
+    neighborhood_nodes: Optional[List[Any]] = None
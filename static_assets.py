@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, request
+from werkzeug.security import safe_join
+
+from config import STATIC_ROOTS, STATIC_IMMUTABLE_MAX_AGE, COMPRESS_MIN_BYTES, STATIC_GZIP_LEVEL, \
+    STATIC_BROTLI_QUALITY, DYNAMIC_GZIP_LEVEL, DYNAMIC_BROTLI_QUALITY
+from metrics import debug_print, record_cache_lookups
+
+try:
+    import brotli
+except ImportError:  # Optional: without it, only gzip is offered
+    brotli = None
+
+# Encodings offered, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Text formats worth compressing (images and fonts are already compressed)
+COMPRESSIBLE_TYPES = {"text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+                      "application/json", "image/svg+xml"}
+
+# Asset paths with a version segment (e.g. lib/vis-9.1.2/) never change content, so browsers may keep them forever
+_VERSIONED_PATH = re.compile(r"-\d+(\.\d+)+/")
+
+
+def compress(body, encoding, static=False):
+    """
+    @param body: The bytes to compress.
+    @param encoding: "br" or "gzip".
+    @param static: Use the (slow) maximum levels meant for assets compressed once, instead of per-response levels.
+    @return: The compressed bytes.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else DYNAMIC_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL if static else DYNAMIC_GZIP_LEVEL, mtime=0)
+
+
+def negotiate_encoding(available=ENCODINGS):
+    """
+    @param available: Encodings the response is available in.
+    @return: The encoding preferred by the request's Accept-Encoding among `available`, or None for identity.
+    """
+    return request.accept_encodings.best_match(available) if available else None
+
+
+def variant_etag(etag, encoding):
+    """
+    @return: The ETag of one encoding of a response (each encoded body is a different representation).
+    """
+    return etag if encoding is None else f"{etag}-{encoding}"
+
+
+def etag_matches(etag):
+    """
+    Check the request's If-None-Match against an ETag, in any of its encodings, and count the lookup.
+
+    @param etag: The ETag of the identity representation.
+    @return: True if the client already has the content (answer with a 304).
+    """
+    if not request.if_none_match:
+        return False
+    matched = any(request.if_none_match.contains(variant_etag(etag, encoding)) for encoding in (None, "br", "gzip"))
+    record_cache_lookups("http_conditional", hits=int(matched), misses=int(not matched))
+    return matched
+
+
+def not_modified(etag, cache_control="no-cache"):
+    """
+    @return: A 304 response for an ETag that matched.
+    """
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def compress_response(response):
+    """
+    Compress a buffered text response for the request's Accept-Encoding (after_request hook).
+
+    Streamed responses (server-sent events, NDJSON), small bodies, non-200 responses and responses that are
+    already encoded are left as they are. A strong ETag is suffixed with the encoding.
+
+    @param response: The Flask response.
+    @return: The response.
+    """
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(variant_etag(etag, encoding))
+    return response
+
+
+class StaticAsset:
+    """
+    One static file held in memory with its content-hash ETag and precompressed variants.
+    """
+
+    def __init__(self, path, stat, body):
+        """
+        @param path: The file path.
+        @param stat: The file's os.stat result (to detect changes).
+        @param body: The file content.
+        """
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {None: body}
+        if len(body) >= COMPRESS_MIN_BYTES and self.content_type in COMPRESSIBLE_TYPES:
+            for encoding in ENCODINGS:
+                compressed = compress(body, encoding, static=True)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+
+
+class StaticAssetStore:
+    """
+    Serves the files under STATIC_ROOTS from memory, with ETags and precompressed gzip/brotli variants.
+
+    Each file is read and compressed once per process (all of them by `preload`, otherwise on first request)
+    and rebuilt only if it changes on disk. Conditional requests get a 304; assets under a versioned path
+    are marked immutable for a year, everything else is revalidated with its ETag.
+    """
+
+    def __init__(self, roots=STATIC_ROOTS):
+        """
+        @param roots: Dictionary of root name to directory (relative to the app directory, like Flask's).
+        """
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        self.roots = {root: os.path.join(app_dir, directory) for root, directory in roots.items()}
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, root, path):
+        """
+        @param root: A root name from `roots`.
+        @param path: The path relative to the root directory.
+        @return: The StaticAsset, or None if there is no such file (or the path escapes the root).
+        """
+        full_path = safe_join(self.roots[root], path)
+        if full_path is None:
+            return None
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        asset = self._assets.get(full_path)
+        if asset is not None and asset.signature == (stat.st_mtime_ns, stat.st_size):
+            return asset
+        with self._lock:
+            asset = self._assets.get(full_path)
+            if asset is None or asset.signature != (stat.st_mtime_ns, stat.st_size):
+                with open(full_path, "rb") as f:
+                    asset = self._assets[full_path] = StaticAsset(full_path, stat, f.read())
+        return asset
+
+    def preload(self):
+        """
+        Read and compress every static file, so no request pays for it.
+
+        @return: A dictionary with the number of files and their identity and smallest encoded sizes in bytes.
+        """
+        files = raw = encoded = 0
+        for root, directory in self.roots.items():
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    asset = self.get(root, os.path.relpath(os.path.join(dirpath, filename), directory))
+                    if asset is None:
+                        continue
+                    files += 1
+                    raw += len(asset.variants[None])
+                    encoded += min(len(body) for body in asset.variants.values())
+        debug_print(f"🗜️ Preloaded {files} static files ({raw} bytes, {encoded} compressed)")
+        return {"files": files, "bytes": raw, "compressed_bytes": encoded}
+
+    def serve(self, root, path):
+        """
+        @param root: A root name from `roots`.
+        @param path: The requested path relative to the root directory.
+        @return: The Flask response: the asset in the best accepted encoding, a 304, or a 404.
+        """
+        asset = self.get(root, path)
+        if asset is None:
+            return Response("Not Found", status=404, mimetype="text/plain")
+        if _VERSIONED_PATH.search(path.replace(os.sep, "/")):
+            cache_control = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            cache_control = "no-cache"  # cache, but revalidate with the ETag
+        if etag_matches(asset.etag):
+            return not_modified(asset.etag, cache_control)
+
+        encoding = negotiate_encoding([encoding for encoding in asset.variants if encoding])
+        response = Response(asset.variants[encoding], mimetype=asset.content_type)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.set_etag(variant_etag(asset.etag, encoding))
+        response.headers["Cache-Control"] = cache_control
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+static_assets = StaticAssetStore()
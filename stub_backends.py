@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, List
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.llms import CustomLLM, CompletionResponse, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+# Matches the sentences produced by `humanize_triplet` (capitalized names, lowercase relation phrase)
+_TRIPLET_SENTENCE = re.compile(r"The entity ((?:[A-Z0-9]\S*)(?: [A-Z0-9]\S*)*) ([a-z][a-z ]*?) the entity (.+?)\.")
+_SYNONYM_QUERY = re.compile(r"QUERY: (.*?)\n----", re.S)
+_WORD = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+class StubLLM(CustomLLM):
+    """
+    Offline stand-in for the OpenAI LLM with configurable latency and deterministic outputs.
+
+    - Path-extraction prompts get a valid KGSchema JSON built from the triplet sentence in the prompt.
+    - Synonym-expansion prompts get the query's own words back, '^'-separated.
+    - Everything else gets a short answer derived from the first context facts and a prompt hash.
+    """
+
+    model_name: str = Field(default="stub-llm", description="Model name reported in metadata.")
+    latency_ms: float = Field(default=0.0, description="Simulated latency per completion call.")
+    token_latency_ms: float = Field(default=0.0, description="Simulated latency per streamed token.")
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model_name, context_window=16385, num_output=512)
+
+    def _respond(self, prompt: str) -> str:
+        if "KGSchema" in prompt:
+            # The extraction prompt embeds one triplet sentence: the document being extracted
+            matches = _TRIPLET_SENTENCE.findall(prompt)
+            triplets = [
+                {
+                    "subject": {"type": "ENTITY", "name": subj},
+                    "relation": {"type": rel.replace(" ", "_").upper()},
+                    "object": {"type": "ENTITY", "name": obj},
+                }
+                for subj, rel, obj in matches[-1:]
+            ]
+            return json.dumps({"triplets": triplets})
+
+        synonym_query = _SYNONYM_QUERY.search(prompt)
+        if synonym_query and "KEYWORDS:" in prompt:
+            words = _WORD.findall(synonym_query.group(1).lower())
+            return "^".join(dict.fromkeys(words)) or "marvel"
+
+        facts = [line.strip() for line in prompt.splitlines() if " -> " in line][:3]
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        if facts:
+            return f"Based on the graph: {'; '.join(facts)}. [stub:{digest}]"
+        return f"No graph facts were retrieved for this question. [stub:{digest}]"
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return CompletionResponse(text=self._respond(prompt))
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return CompletionResponse(text=self._respond(prompt))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        text = self._respond(prompt)
+
+        def gen():
+            so_far = ""
+            for token in re.findall(r"\S+\s*", text):
+                if self.token_latency_ms:
+                    time.sleep(self.token_latency_ms / 1000)
+                so_far += token
+                yield CompletionResponse(text=so_far, delta=token)
+
+        return gen()
+
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        text = self._respond(prompt)
+
+        async def gen():
+            so_far = ""
+            for token in re.findall(r"\S+\s*", text):
+                if self.token_latency_ms:
+                    await asyncio.sleep(self.token_latency_ms / 1000)
+                so_far += token
+                yield CompletionResponse(text=so_far, delta=token)
+
+        return gen()
+
+
+class StubEmbedding(BaseEmbedding):
+    """
+    Offline stand-in for OpenAIEmbedding with configurable latency and deterministic vectors.
+
+    Vectors are normalized hashed bags of words, so texts sharing words are similar, which keeps
+    retrieval and similarity-based caches meaningful in benchmarks.
+    """
+
+    embed_dim: int = Field(default=64, description="Dimension of the generated vectors.")
+    latency_ms: float = Field(default=0.0, description="Simulated latency per embedding call (per batch).")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StubEmbedding"
+
+    def _vector(self, text: str) -> List[float]:
+        vec = np.zeros(self.embed_dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()) or [text]:
+            h = int.from_bytes(hashlib.md5(word.encode('utf-8')).digest()[:8], "little")
+            vec[h % self.embed_dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def _sleep(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    async def _asleep(self):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        self._sleep()
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        await self._asleep()
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        self._sleep()
+        return self._vector(text)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        await self._asleep()
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self._sleep()
+        return [self._vector(t) for t in texts]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        await self._asleep()
+        return [self._vector(t) for t in texts]
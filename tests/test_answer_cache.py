@@ -0,0 +1,104 @@
+import pytest
+
+import answer_cache as answer_cache_module
+from answer_cache import AnswerCache, normalize_question
+
+KEY = ("gpt-4o-mini", "text-embedding-3-small", "v1", "llm")  # model, embedding model, graph version, mode
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache_module, "time", clock)
+    return clock
+
+
+def put(cache, question, answer, embedding=None, entities=None, key=KEY):
+    cache.put(question, *key, answer, embedding=embedding, entities=entities)
+
+
+def test_exact_hit_on_normalized_question():
+    cache = AnswerCache()
+    put(cache, "Which team is Wolverine part of?", "X-Men")
+    assert normalize_question("  which TEAM is  Wolverine part of ?! ") == "which team is wolverine part of"
+    assert cache.get("  which TEAM is  Wolverine part of ?! ", *KEY) == "X-Men"
+    assert cache.get("Which team is Wolverine part of?", "gpt-4o", *KEY[1:]) is None
+    assert cache.get("Which team is Wolverine part of?", *KEY[:3], "graph") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = AnswerCache(ttl_seconds=60, semantic=True)
+    put(cache, "q", "answer", embedding=[1.0, 0.0], entities={"Storm"})
+    clock.now += 60
+    assert cache.get("q", *KEY) == "answer"
+    clock.now += 1
+    assert cache.get_similar([1.0, 0.0], {"Storm"}, *KEY) is None
+    assert cache.get("q", *KEY) is None
+    assert len(cache) == 0
+
+
+def test_ttl_zero_never_expires(clock):
+    cache = AnswerCache(ttl_seconds=0)
+    put(cache, "q", "answer")
+    clock.now += 10 ** 9
+    assert cache.get("q", *KEY) == "answer"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    put(cache, "a", "A")
+    put(cache, "b", "B")
+    assert cache.get("a", *KEY) == "A"  # "b" is now the least recently used
+    put(cache, "c", "C")
+    assert [cache.get(q, *KEY) for q in ("a", "b", "c")] == ["A", None, "C"]
+
+
+def test_new_graph_version_drops_everything():
+    cache = AnswerCache()
+    put(cache, "a", "A")
+    assert cache.get("a", *KEY[:2], "v2", KEY[3]) is None
+    assert cache.get("a", *KEY) is None
+
+
+def test_semantic_hit_needs_same_entities():
+    cache = AnswerCache(semantic=True, similarity_threshold=0.95)
+    put(cache, "What are Storm's powers?", "Weather control", embedding=[1.0, 0.0, 0.0], entities={"Storm"})
+    put(cache, "What are Cyclops's powers?", "Optic blasts", embedding=[0.99, 0.1, 0.0], entities={"Cyclops"})
+
+    assert cache.get_similar([0.98, 0.05, 0.0], ["Storm"], *KEY) == "Weather control"
+    assert cache.get_similar([0.98, 0.05, 0.0], ["Cyclops"], *KEY) == "Optic blasts"
+    assert cache.get_similar([0.98, 0.05, 0.0], ["Storm", "Cyclops"], *KEY) is None
+    assert cache.get_similar([0.98, 0.05, 0.0], [], *KEY) is None
+    # Same entities, but not similar enough
+    assert cache.get_similar([0.0, 1.0, 0.0], ["Storm"], *KEY) is None
+    # Other embedding model or ingestion mode
+    assert cache.get_similar([1.0, 0.0, 0.0], ["Storm"], KEY[0], "other-embeddings", *KEY[2:]) is None
+    assert cache.get_similar([1.0, 0.0, 0.0], ["Storm"], *KEY[:3], "graph") is None
+
+
+def test_semantic_tier_disabled_or_without_embedding():
+    cache = AnswerCache(semantic=False)
+    put(cache, "q", "answer", embedding=[1.0, 0.0], entities={"Storm"})
+    assert cache.get_similar([1.0, 0.0], {"Storm"}, *KEY) is None
+
+    cache = AnswerCache(semantic=True)
+    put(cache, "q", "answer", entities={"Storm"})  # no embedding
+    assert cache.get_similar([1.0, 0.0], {"Storm"}, *KEY) is None
+    assert cache.get_similar([0.0, 0.0], {"Storm"}, *KEY) is None
+
+
+def test_semantic_hit_refreshes_lru_position():
+    cache = AnswerCache(max_entries=2, semantic=True)
+    put(cache, "storm", "S", embedding=[1.0, 0.0], entities={"Storm"})
+    put(cache, "beast", "B", embedding=[0.0, 1.0], entities={"Beast"})
+    assert cache.get_similar([1.0, 0.01], {"Storm"}, *KEY) == "S"
+    put(cache, "jean", "J", embedding=[0.7, 0.7], entities={"Jean Grey"})
+    assert cache.get("storm", *KEY) == "S" and cache.get("beast", *KEY) is None
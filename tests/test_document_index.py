@@ -0,0 +1,68 @@
+import pytest
+
+from document_index import DocumentIndex
+from graph_utils import build_triplet_documents, filter_documents_by_rules
+
+SENTENCES = [
+    "Wolverine possesses power Regeneration (confidence 0.95).",
+    "Wolverine is a member of X-Men (confidence 0.9).",
+    "Jean Grey has mutation X-Gene (confidence 0.85).",
+    "X-Gene confers Telekinesis (confidence 0.7).",
+    "Magneto is a member of Brotherhood of Mutants (confidence 0.6).",
+    "Storm possesses power Weather Control (confidence 0.92).",
+    "Beast is a member of X-Men (confidence 0.8).",
+    "Beast has mutation X-Gene (confidence 0.75).",
+    "Café Mutant possesses power ÉCLAIR (confidence 0.5).",
+    "Ab",
+]
+
+RULE_SETS = [
+    (None, None),
+    (["member of"], None),
+    (None, ["x-men"]),
+    # no match
+    (["no such keyword"], None),
+    (["zzz"], ["member of"]),
+    (["member of"], ["member of"]),
+    # several include and exclude rules
+    (["power", "mutation"], ["wolverine", "beast"]),
+    (["X-GENE", "magneto", "weather"], ["telekinesis", "0.6"]),
+    (["regeneration", "x-men", "brotherhood"], ["jean", "storm", "beast"]),
+    # phrases, case-insensitivity, non-ASCII text, keywords shorter than a trigram, empty keyword
+    (["possesses power weather"], None),
+    (["éclair"], None),
+    (["ab", "x"], ["e"]),
+    (["", "zz"], None),
+    (["b"], [""]),
+]
+
+
+@pytest.fixture(scope="module")
+def documents():
+    return list(build_triplet_documents(SENTENCES))
+
+
+@pytest.mark.parametrize("max_documents", [None, 0, 1, 3, 100])
+@pytest.mark.parametrize("include, exclude", RULE_SETS)
+def test_index_matches_linear_scan(documents, include, exclude, max_documents):
+    index = DocumentIndex(documents)
+    expected = filter_documents_by_rules(documents, include, exclude, max_documents)
+    actual = filter_documents_by_rules(index, include, exclude, max_documents)
+    assert [doc.id_ for doc in actual] == [doc.id_ for doc in expected]
+
+
+def test_memoized_keywords_match_linear_scan(documents):
+    # The same index answers every rule set, so later rules reuse memoized keyword matches
+    index = DocumentIndex(documents)
+    for include, exclude in RULE_SETS * 2:
+        expected = filter_documents_by_rules(documents, include, exclude, None)
+        actual = filter_documents_by_rules(index, include, exclude, None)
+        assert [doc.id_ for doc in actual] == [doc.id_ for doc in expected], (include, exclude)
+
+
+def test_no_match_returns_nothing(documents):
+    index = DocumentIndex(documents)
+    assert filter_documents_by_rules(index, ["no such keyword"], None, None) == []
+    assert filter_documents_by_rules(index, ["wolverine"], ["member of", "possesses"], None) == []
+    # The empty keyword is contained in every text
+    assert filter_documents_by_rules(index, None, [""], None) == []
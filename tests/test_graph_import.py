@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import pytest
+
+from graph_import import EdgeListBuilder, import_edge_list, normalize_entity, normalize_relation
+from graph_snapshot import GraphSnapshot
+from graph_utils import compute_graph_version
+
+ROWS = [
+    ("Wolverine", "Member Of", "X-Men", "0.5"),
+    ("wolverine ", "member-of", "x-men", "0.8"),  # same edge, other spelling
+    ("WOLVERINE", "member_of", "X-Men", None),  # duplicate without a score
+    ("Wolverine", "possesses power", "Regeneration", "0.9"),
+    ("Wolverine", "enemy of", "X-Men", "0.99"),  # same pair, other relation: conflict
+    ("", "member_of", "X-Men", "0.7"),  # skipped
+    ("Beast", "member_of", "X-Men", "not a number"),
+]
+
+
+def merged_confidences(merge):
+    builder = EdgeListBuilder(merge=merge)
+    builder.add_rows(ROWS[:3])
+    builder.add_rows(ROWS[3:])
+    snapshot = builder.build_snapshot()
+    return {(source, target): confidence
+            for source in snapshot.names for target, _, confidence in snapshot.out_edges(source)}, builder
+
+
+@pytest.mark.parametrize("merge, expected", [
+    ("max", 0.8),
+    ("mean", 0.65),
+    ("noisy_or", 0.9),  # 1 - (1 - 0.5) * (1 - 0.8)
+])
+def test_duplicate_confidences_are_merged(merge, expected):
+    confidences, builder = merged_confidences(merge)
+    assert confidences[("Wolverine", "X-Men")] == pytest.approx(expected)
+    assert confidences[("Wolverine", "Regeneration")] == pytest.approx(0.9)
+    assert confidences[("Beast", "X-Men")] is None
+    assert builder.stats == {"rows": 7, "skipped": 1, "duplicates": 2, "conflicts": 1}
+
+
+def test_entities_are_deduplicated_case_insensitively():
+    _, builder = merged_confidences("max")
+    assert builder.names == ["Wolverine", "X-Men", "Regeneration", "Beast"]
+    assert builder.relations == ["member_of", "possesses_power", "enemy_of"]
+    assert normalize_entity("  Jean  Grey ") == "Jean Grey"
+    assert normalize_relation("Has-Mutation") == "has_mutation"
+
+
+def test_unknown_merge_strategy():
+    with pytest.raises(ValueError, match="Unknown merge strategy"):
+        EdgeListBuilder(merge="min")
+
+
+def test_csv_and_gzipped_jsonl_imports_agree(tmp_path):
+    csv_path = tmp_path / "edges.csv"
+    csv_path.write_text("Source,Relation,Target,Confidence\n"
+                        + "".join(",".join(value or "" for value in row) + "\n" for row in ROWS), encoding="utf-8")
+    jsonl_path = tmp_path / "edges.jsonl.gz"
+    with gzip.open(jsonl_path, "wt", encoding="utf-8") as f:
+        for source, relation, target, confidence in ROWS:
+            f.write(json.dumps({"source": source, "relation": relation, "target": target,
+                                "confidence": confidence}) + "\n")
+
+    reports = [import_edge_list(str(path), output=str(tmp_path / f"{name}.bin"), merge="mean", chunk_size=2,
+                                progress=False)
+               for name, path in (("csv", csv_path), ("jsonl", jsonl_path))]
+    assert reports[0]["graph_version"] == reports[1]["graph_version"]
+    assert reports[0]["edges"] == 3 and reports[0]["nodes"] == 4
+
+    snapshot = GraphSnapshot.load(str(tmp_path / "csv.bin"))
+    assert snapshot.version == reports[0]["graph_version"] == compute_graph_version(snapshot.to_networkx())
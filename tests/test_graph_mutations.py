@@ -0,0 +1,96 @@
+import networkx as nx
+import pytest
+from llama_index.core import MockEmbedding
+from llama_index.core.indices.property_graph import ImplicitPathExtractor, PropertyGraphIndex
+from llama_index.core.llms import MockLLM
+
+from graph_utils import apply_edge_mutations, build_property_graph_nodes, humanize_triplet, triplet_document_id
+from index_store import update_index
+from vector_index import MatrixVectorStore
+
+
+def build_graph():
+    graph = nx.DiGraph()
+    graph.add_edge("Wolverine", "X-Men", relation="member_of", confidence=0.9)
+    graph.add_edge("Wolverine", "Regeneration", relation="possesses_power", confidence=0.95)
+    graph.add_edge("Beast", "X-Men", relation="member_of", confidence=0.8)
+    graph.add_edge("Jean Grey", "X-Gene", relation="has_mutation", confidence=0.85)
+    return graph
+
+
+UPSERTS = [
+    ("Wolverine", "X-Men", "member_of", 0.7),  # update
+    ("Storm", "X-Men", "member_of", 0.92),  # addition
+    ("Wolverine", "Regeneration", "possesses_power", 0.95),  # unchanged
+]
+REMOVALS = [("Beast", "X-Men"), ("Magneto", "X-Men")]  # the second matches no edge
+
+
+def test_apply_edge_mutations_leaves_input_untouched():
+    graph = build_graph()
+    before = (list(graph.nodes), [(u, v, dict(data)) for u, v, data in graph.edges(data=True)])
+    new_graph, changes, missing = apply_edge_mutations(graph, UPSERTS, REMOVALS)
+
+    assert (list(graph.nodes), list(graph.edges(data=True))) == before
+    assert missing == 1
+    assert sorted(changes, key=lambda change: change[:2]) == [
+        ("Beast", "X-Men", {"relation": "member_of", "confidence": 0.8}, None),
+        ("Storm", "X-Men", None, {"relation": "member_of", "confidence": 0.92}),
+        ("Wolverine", "X-Men", {"relation": "member_of", "confidence": 0.9},
+         {"relation": "member_of", "confidence": 0.7}),
+    ]
+    # Beast lost its only edge
+    assert "Beast" not in new_graph and "Storm" in new_graph
+
+
+def test_apply_edge_mutations_collapses_repeated_changes():
+    graph = build_graph()
+    upserts = [("Jean Grey", "X-Gene", "has_mutation", 0.5), ("Jean Grey", "X-Gene", "has_mutation", 0.85)]
+    new_graph, changes, missing = apply_edge_mutations(graph, upserts)
+    assert changes == [] and missing == 0
+    assert new_graph.edges["Jean Grey", "X-Gene"] == {"relation": "has_mutation", "confidence": 0.85}
+
+    new_graph, changes, _ = apply_edge_mutations(graph, [("Beast", "Avengers", "member_of", None)],
+                                                 [("Beast", "Avengers")])
+    assert changes == [("Beast", "Avengers", None, {"relation": "member_of"})]
+
+
+def build_index(graph):
+    return PropertyGraphIndex(nodes=list(build_property_graph_nodes(graph)), llm=MockLLM(),
+                              embed_model=MockEmbedding(embed_dim=4), kg_extractors=[ImplicitPathExtractor()],
+                              vector_store=MatrixVectorStore(), show_progress=False)
+
+
+def index_state(index):
+    docstore = index.docstore
+    return {
+        "triplets": sorted((s.id, r.label, o.id) for s, r, o in index.property_graph_store.get_triplets()),
+        "docs": sorted(docstore.docs),
+        "ref_docs": {doc_id: sorted(info.node_ids)
+                     for doc_id, info in (docstore.get_all_ref_doc_info() or {}).items()},
+        "vectors": sorted(index.vector_store.client.ids),
+    }
+
+
+@pytest.fixture
+def mutated():
+    graph = build_graph()
+    new_graph, changes, _ = apply_edge_mutations(graph, UPSERTS, REMOVALS)
+    return graph, new_graph, changes
+
+
+def test_update_index_leaves_original_untouched(mutated):
+    graph, new_graph, changes = mutated
+    index = build_index(graph)
+    before = index_state(index)
+
+    removed_ids = {triplet_document_id(humanize_triplet(u, v, old)) for u, v, old, _ in changes if old is not None}
+    added_nodes = list(build_property_graph_nodes(new_graph, edges=[(u, v, new) for u, v, _, new in changes
+                                                                    if new is not None]))
+    new_index = update_index(index, removed_ids, added_nodes, MockLLM(), MockEmbedding(embed_dim=4))
+
+    assert index_state(index) == before
+    after, rebuilt = index_state(new_index), index_state(build_index(new_graph))
+    assert after["triplets"] == rebuilt["triplets"]
+    assert after["vectors"] == rebuilt["vectors"]
+    assert sorted(after["ref_docs"]) == sorted(rebuilt["ref_docs"])
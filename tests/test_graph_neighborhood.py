@@ -0,0 +1,97 @@
+import networkx as nx
+import pytest
+
+import app as app_module
+import graph_utils
+from graph_utils import GRAPH_PATH, save_graph
+
+
+def build_graph():
+    graph = nx.DiGraph()
+    for i, member in enumerate(["Wolverine", "Storm", "Cyclops", "Beast", "Jean Grey"]):
+        graph.add_edge(member, "X-Men", relation="member_of", confidence=0.5 + i / 10)
+    graph.add_edge("X-Men", "Xavier Institute", relation="based_at", confidence=0.9)
+    graph.add_edge("Wolverine", "Regeneration", relation="possesses_power")
+    return graph
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # GRAPH_PATH is relative
+    monkeypatch.setattr(graph_utils, "_graph_cache", {})
+    save_graph(build_graph())
+    return app_module.app.test_client()
+
+
+def get_all_pages(client, character, params, limit):
+    connections, cursor = [], None
+    while True:
+        query = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+        data = client.get(f"/graph/{character}", query_string=query).get_json()
+        connections += data["connections"]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return connections
+
+
+@pytest.mark.parametrize("character, params", [
+    ("X-Men", {}),
+    ("X-Men", {"hops": 2}),
+    ("Wolverine", {"hops": 3, "direction": "out"}),
+])
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_pages_stitch_into_the_full_listing(client, character, params, limit):
+    full = client.get(f"/graph/{character}", query_string=dict(params, limit=500)).get_json()
+    assert full["next_cursor"] is None and len(full["connections"]) >= limit
+    assert get_all_pages(client, character, params, limit) == full["connections"]
+
+
+def test_neighborhood_filters(client):
+    data = client.get("/graph/X-Men?direction=in&min_confidence=0.7").get_json()
+    assert data["degree"] == {"out": 1, "in": 5}
+    assert [c["entity"] for c in data["connections"]] == ["Cyclops", "Beast", "Jean Grey"]
+    assert all(c["direction"] == "in" and c["relation"] == "member_of" for c in data["connections"])
+
+    data = client.get("/graph/Wolverine?relation=possesses_power,based_at&hops=2").get_json()
+    assert [(c["entity"], c["confidence"]) for c in data["connections"]] == [("Regeneration", None)]
+
+
+def test_cursor_from_another_graph_version_is_rejected(client):
+    cursor = client.get("/graph/X-Men?limit=2").get_json()["next_cursor"]
+    graph = build_graph()
+    graph.add_edge("Gambit", "X-Men", relation="member_of", confidence=0.8)
+    save_graph(graph, GRAPH_PATH)
+
+    response = client.get("/graph/X-Men", query_string={"limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+    assert "previous version" in response.get_json()["error"]
+    assert client.get("/graph/X-Men?limit=2&cursor=not-a-cursor").status_code == 400
+
+
+def test_unchanged_page_revalidates_with_etag(client):
+    first = client.get("/graph/X-Men?limit=2")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    again = client.get("/graph/X-Men?limit=2", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+    # Other parameters, other representation
+    assert client.get("/graph/X-Men?limit=3", headers={"If-None-Match": etag}).status_code == 200
+
+    graph = build_graph()
+    graph.add_edge("Gambit", "X-Men", relation="member_of", confidence=0.8)
+    save_graph(graph, GRAPH_PATH)
+    assert client.get("/graph/X-Men?limit=2", headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.mark.parametrize("query", ["min_confidence=1.5", "min_confidence=-0.1", "min_confidence=nan",
+                                   "min_confidence=high", "hops=0", "hops=4", "limit=0", "limit=501",
+                                   "direction=sideways"])
+def test_invalid_parameters(client, query):
+    assert client.get(f"/graph/X-Men?{query}").status_code == 400
+
+
+def test_unknown_character_and_missing_graph(client, tmp_path, monkeypatch):
+    assert client.get("/graph/Galactus").status_code == 404
+    monkeypatch.chdir(tmp_path / "graphs")  # no graph here
+    assert client.get("/graph/X-Men").status_code == 404
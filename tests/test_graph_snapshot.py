@@ -0,0 +1,61 @@
+import networkx as nx
+import pytest
+
+from graph_snapshot import GraphSnapshot
+from graph_utils import compute_graph_version
+
+
+def build_graph():
+    graph = nx.DiGraph()
+    graph.add_edge("Wolverine", "Regeneration", relation="possesses_power", confidence=0.95)
+    graph.add_edge("Wolverine", "X-Men", relation="member_of", confidence=0.9)
+    graph.add_edge("Jean Grey", "X-Gene", relation="has_mutation", confidence=0.85)
+    graph.add_edge("X-Gene", "Telekinesis", relation="confers", confidence=0.7)
+    graph.add_edge("Beast", "X-Men", relation="member_of")  # no confidence
+    graph.add_edge("Café Mutant", "ÉCLAIR", confidence=0.5)  # no relation
+    graph.add_edge("Storm", "Storm", relation="alias_of", confidence=1.0)  # self-loop
+    graph.add_node("Lonely")
+    return graph
+
+
+def edge_list(graph):
+    return [(u, v, data) for u, v, data in graph.edges(data=True)]
+
+
+def test_round_trip_through_file(tmp_path):
+    graph = build_graph()
+    path = str(tmp_path / "graph.bin")
+    GraphSnapshot.from_networkx(graph, version="v1").save(path)
+    snapshot = GraphSnapshot.load(path)
+
+    assert snapshot.version == "v1"
+    assert snapshot.num_nodes == graph.number_of_nodes() and snapshot.num_edges == graph.number_of_edges()
+    restored = snapshot.to_networkx()
+    assert list(restored.nodes) == list(graph.nodes)
+    assert edge_list(restored) == edge_list(graph)
+
+
+def test_edges_and_degrees():
+    snapshot = GraphSnapshot.from_networkx(build_graph())
+    assert snapshot.out_edges("Wolverine") == [("Regeneration", "possesses_power", 0.95), ("X-Men", "member_of", 0.9)]
+    assert sorted(snapshot.in_edges("X-Men")) == [("Beast", "member_of", None), ("Wolverine", "member_of", 0.9)]
+    assert snapshot.out_edges("Café Mutant") == [("ÉCLAIR", None, 0.5)]
+    assert snapshot.degree("Storm") == (1, 1)
+    assert snapshot.out_edges("Nobody") == [] and "Nobody" not in snapshot
+
+
+@pytest.mark.parametrize("graph", [build_graph(), nx.DiGraph(), nx.Graph(build_graph())])
+def test_compute_version_matches_networkx_hash(graph, tmp_path):
+    snapshot = GraphSnapshot.from_networkx(graph)
+    assert snapshot.compute_version() == compute_graph_version(graph)
+    path = str(tmp_path / "graph.bin")
+    snapshot.save(path)
+    assert GraphSnapshot.load(path).compute_version() == compute_graph_version(graph)
+
+
+def test_compute_version_tracks_confidence_changes():
+    graph = build_graph()
+    before = GraphSnapshot.from_networkx(graph).compute_version()
+    graph["X-Gene"]["Telekinesis"]["confidence"] = 0.71
+    after = GraphSnapshot.from_networkx(graph).compute_version()
+    assert before != after == compute_graph_version(graph)
@@ -0,0 +1,80 @@
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.graph_stores import SimplePropertyGraphStore
+from llama_index.core.graph_stores.types import EntityNode, Relation
+from llama_index.core.schema import QueryBundle, TextNode
+
+from hybrid_retriever import HybridContextRetriever, reciprocal_rank_fusion, select_top_k
+from vector_index import MatrixVectorStore
+
+DIM = 4
+# MockEmbedding embeds every query as [0.5] * DIM
+NEAR_QUERY = [1.0, 1.0, 1.0, 0.9]
+ORTHOGONAL = [1.0, -1.0, 1.0, -1.0]
+
+
+def build_retriever(similarity_top_k=3, hub_degree=0, **kwargs):
+    """
+    Graph with 20 "distractor" heroes whose embeddings are close to every query, and Beast, whose embedding is
+    orthogonal to it: Beast is never a vector candidate and can only be found by BM25. With `hub_degree`, a
+    "Hub" entity with that many triplets comes first in the graph store.
+    """
+    store = SimplePropertyGraphStore()
+    vector_store = MatrixVectorStore()
+    entities, relations, embedded = [], [], []
+    if hub_degree:
+        hub = EntityNode(name="Hub")
+        entities.append(hub)
+        for i in range(hub_degree):
+            team = EntityNode(name=f"Team{i}")
+            entities.append(team)
+            relations.append(Relation(label="MEMBER_OF", source_id=hub.id, target_id=team.id))
+        embedded.append(TextNode(id_=hub.id, text=hub.name, embedding=NEAR_QUERY))
+    for i in range(20):
+        hero, power = EntityNode(name=f"Hero{i}"), EntityNode(name=f"Power{i}")
+        entities += [hero, power]
+        relations.append(Relation(label="POSSESSES_POWER", source_id=hero.id, target_id=power.id))
+        embedded.append(TextNode(id_=hero.id, text=hero.name, embedding=NEAR_QUERY))
+    beast, xmen = EntityNode(name="Beast"), EntityNode(name="X-Men")
+    entities += [beast, xmen]
+    relations.append(Relation(label="MEMBER_OF", source_id=beast.id, target_id=xmen.id))
+    embedded += [TextNode(id_=beast.id, text=beast.name, embedding=ORTHOGONAL),
+                 TextNode(id_=xmen.id, text=xmen.name, embedding=ORTHOGONAL)]
+    store.upsert_nodes(entities)
+    store.upsert_relations(relations)
+    vector_store.add(embedded)
+    return HybridContextRetriever(store, include_text=False, embed_model=MockEmbedding(embed_dim=DIM),
+                                  vector_store=vector_store, similarity_top_k=similarity_top_k, **kwargs)
+
+
+def test_keyword_only_entity_is_retrieved():
+    retriever = build_retriever()
+    nodes = retriever.retrieve_from_graph(QueryBundle("Tell me about Beast"))
+    texts = [node.node.text for node in nodes]
+    assert any("Beast" in text for text in texts), texts
+    # The best vector entities still fill the other slots
+    assert any("Hero" in text for text in texts), texts
+
+
+def test_keyword_only_entity_is_lost_without_reserved_slots():
+    # Plain fusion: a keyword-only entity scores at most 0.5 / 61, below the 12th vector candidate (1 / 72)
+    retriever = build_retriever(keyword_slots=0)
+    nodes = retriever.retrieve_from_graph(QueryBundle("Tell me about Beast"))
+    assert not any("Beast" in node.node.text for node in nodes)
+
+
+def test_limit_keeps_the_best_entities_triplets():
+    # Hub's 10 triplets come first in the store; with Beast ranked first, its triplet must survive the limit
+    retriever = build_retriever(hub_degree=10, limit=5)
+    triplets = retriever._rel_map(["Beast", "Hub"], None)
+    assert len(triplets) == 5
+    assert triplets[0][0].id == "Beast"
+    assert [subj.id for subj, _, _ in triplets[1:]] == ["Hub"] * 4
+
+
+def test_select_top_k_keeps_reserved_items():
+    fused = reciprocal_rank_fusion([["a", "b", "c", "d"], ["z", "c"]], [1.0, 0.5])
+    assert [item for item, _ in fused[:3]] == ["c", "a", "b"]
+    selected = select_top_k(fused, ["z"], 3)
+    assert [item for item, _ in selected] == ["c", "a", "z"]
+    assert select_top_k(fused, ["missing"], 2) == fused[:2]
+    assert select_top_k(fused, [], 10) == fused
@@ -0,0 +1,104 @@
+import random
+
+import networkx as nx
+import pytest
+
+from path_engine import MUTATION_PATTERNS, GraphPath, PathEngine, format_paths
+
+
+def build_graph(seed=7, nodes=20, edges=90):
+    rng = random.Random(seed)
+    graph = nx.DiGraph()
+    relations = ["has_mutation", "confers", "possesses_power", "member_of"]
+    while graph.number_of_edges() < edges:
+        u, v = rng.sample(range(nodes), 2)
+        graph.add_edge(f"N{u}", f"N{v}", relation=rng.choice(relations), confidence=round(rng.uniform(0.1, 1.0), 2))
+    return graph
+
+
+def reference_paths(graph, source, target=None, pattern=None, max_hops=3, top_k=5):
+    """Every simple path by depth-first search, ranked like `PathEngine.find_paths`."""
+    lengths = {len(pattern)} if pattern else set(range(1, max_hops + 1))
+    found = []
+
+    def walk(nodes, edges):
+        if len(edges) in lengths and (target is None or nodes[-1] == target):
+            found.append(GraphPath(nodes, edges))
+        if len(edges) == max(lengths) or (target is not None and nodes[-1] == target):
+            return
+        for neighbor, data in graph.succ[nodes[-1]].items():
+            relation = data.get("relation", "related_to")
+            if neighbor in nodes or (pattern and relation != pattern[len(edges)]):
+                continue
+            walk(nodes + [neighbor], edges + [(relation, data.get("confidence"))])
+
+    walk([source], [])
+    found.sort(key=lambda p: (-p.score, len(p), p.nodes))
+    return [(p.nodes, p.edges) for p in found[:top_k]]
+
+
+def as_tuples(paths):
+    return [(p.nodes, p.edges) for p in paths]
+
+
+GRAPH = build_graph()
+PAIRS = [("N11", "N16"), ("N7", "N0"), ("N8", "N16"), ("N15", "N5"), ("N8", "N8")]
+
+
+@pytest.mark.parametrize("source, target", PAIRS)
+@pytest.mark.parametrize("max_hops", [1, 2, 3, 4])
+def test_bidirectional_matches_exhaustive_search(source, target, max_hops):
+    engine = PathEngine(GRAPH, "v1", beam_width=10_000)
+    assert as_tuples(engine.find_paths(source, target, max_hops=max_hops, top_k=10)) == \
+        reference_paths(GRAPH, source, target, max_hops=max_hops, top_k=10)
+
+
+@pytest.mark.parametrize("source, target", [("N8", "N16"), ("N7", "N16"), ("N15", "N5"), ("N11", None), ("N15", None)])
+@pytest.mark.parametrize("pattern", MUTATION_PATTERNS + (("member_of", "has_mutation", "confers"),))
+def test_pattern_mode_matches_exhaustive_search(source, target, pattern):
+    engine = PathEngine(GRAPH, "v1", beam_width=10_000)
+    paths = engine.find_paths(source, target, pattern=pattern, top_k=10)
+    assert as_tuples(paths) == reference_paths(GRAPH, source, target, pattern=pattern, top_k=10)
+    assert all(tuple(relation for relation, _ in p.edges) == pattern for p in paths)
+
+
+def test_expansion_without_target_matches_exhaustive_search():
+    engine = PathEngine(GRAPH, "v1", beam_width=10_000)
+    assert as_tuples(engine.find_paths("N11", max_hops=3, top_k=20)) == \
+        reference_paths(GRAPH, "N11", max_hops=3, top_k=20)
+
+
+def test_mutation_chain_is_ranked_by_path_confidence():
+    graph = nx.DiGraph()
+    graph.add_edge("Jean Grey", "X-Gene", relation="has_mutation", confidence=0.9)
+    graph.add_edge("X-Gene", "Telekinesis", relation="confers", confidence=0.8)
+    graph.add_edge("Jean Grey", "Telekinesis", relation="possesses_power", confidence=0.5)
+    graph.add_edge("Jean Grey", "X-Men", relation="member_of")
+    paths = PathEngine(graph).trace(["Jean Grey", "Telekinesis"])
+    assert [p.nodes for p in paths] == [("Jean Grey", "X-Gene", "Telekinesis"), ("Jean Grey", "Telekinesis")]
+    assert paths[0].score == pytest.approx(0.72)
+    assert "Jean Grey -[has_mutation 0.90]-> X-Gene -[confers 0.80]-> Telekinesis (path confidence: 0.72)" \
+        in format_paths(paths)
+    # Reversed mention order still finds the graph-direction paths
+    assert [p.nodes for p in PathEngine(graph).trace(["Telekinesis", "Jean Grey"])] == [p.nodes for p in paths]
+    assert PathEngine(graph).trace(["Nobody"]) == [] and format_paths([]) == ""
+
+
+def test_beam_width_bounds_each_layer():
+    hub = nx.DiGraph()
+    for i in range(50):
+        hub.add_edge("Team", f"Member{i}", relation="has_member", confidence=i / 50)
+        hub.add_edge(f"Member{i}", "Power", relation="possesses_power", confidence=1.0)
+    paths = PathEngine(hub, beam_width=3).find_paths("Team", pattern=("has_member", "possesses_power"), top_k=10)
+    # The first layer keeps the 3 most confident members only
+    assert [p.nodes[1] for p in paths] == ["Member49", "Member48", "Member47"]
+
+
+def test_results_are_memoized_per_graph_version():
+    engine = PathEngine(GRAPH, "v1", max_entries=2)
+    first = engine.find_paths("N11", "N16")
+    assert engine.find_paths("N11", "N16") is first
+    engine.graph_version = "v2"
+    assert engine.find_paths("N11", "N16") is not first
+    engine.find_paths("N7", "N0")
+    assert len(engine._memo) == 2
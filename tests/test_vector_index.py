@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters, VectorStoreQuery
+
+from config import VECTOR_IVF_RETRAIN_TAIL
+from vector_index import MatrixIndex, MatrixVectorStore
+
+FILTERS = MetadataFilters(filters=[MetadataFilter(key="label", value="Character")])
+
+
+@pytest.fixture
+def store():
+    store = MatrixVectorStore()
+    store.add([TextNode(id_="Storm", text="Storm", embedding=[1.0, 0.0]),
+               TextNode(id_="Beast", text="Beast", embedding=[0.0, 1.0])])
+    return store
+
+
+def test_query_and_delete(store):
+    result = store.query(VectorStoreQuery(query_embedding=[0.9, 0.1], similarity_top_k=1))
+    assert result.ids == ["Storm"]
+    store.delete_nodes(["Storm"])
+    assert store.query(VectorStoreQuery(query_embedding=[0.9, 0.1], similarity_top_k=2)).ids == ["Beast"]
+
+
+def test_metadata_filters_are_rejected(store):
+    with pytest.raises(ValueError, match="metadata filters"):
+        store.query(VectorStoreQuery(query_embedding=[1.0, 0.0], similarity_top_k=1, filters=FILTERS))
+    with pytest.raises(ValueError, match="metadata filters"):
+        store.delete_nodes(filters=FILTERS)
+    assert len(store.client) == 2
+
+
+ROWS, DIM, NLIST, TOP_K = 2000, 16, 16, 10
+
+
+def clustered_rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(40, DIM))
+    return centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(size=(count, DIM))
+
+
+@pytest.fixture(scope="module")
+def exact_index():
+    return MatrixIndex().with_added([f"row{i}" for i in range(ROWS)], clustered_rows(ROWS))
+
+
+@pytest.fixture(scope="module")
+def ivf_index(exact_index):
+    return exact_index.build_ivf(NLIST)
+
+
+@pytest.fixture(scope="module")
+def queries():
+    return clustered_rows(50, seed=1)
+
+
+def top_ids(index, query, **kwargs):
+    rows, _ = index.search(query, TOP_K, **kwargs)
+    return [index.ids[row] for row in rows.tolist()]
+
+
+def recall(ivf_index, exact_index, queries, nprobe):
+    hits = [len(set(top_ids(ivf_index, q, nprobe=nprobe)) & set(top_ids(exact_index, q))) for q in queries]
+    return sum(hits) / (TOP_K * len(queries))
+
+
+def test_ivf_training_lays_rows_out_by_list(exact_index, ivf_index):
+    assert ivf_index.centroids.shape == (NLIST, DIM)
+    assert ivf_index.offsets[0] == 0 and ivf_index.offsets[-1] == ivf_index.list_rows == ROWS
+    assert np.all(np.diff(ivf_index.offsets) >= 0)
+    assert sorted(ivf_index.ids) == sorted(exact_index.ids)
+    lists = np.repeat(np.arange(NLIST), np.diff(ivf_index.offsets))
+    assert np.array_equal(np.argmax(ivf_index.matrix @ ivf_index.centroids.T, axis=1), lists)
+    assert not ivf_index.needs_training()
+
+
+def test_ivf_recall_against_exact_scan(exact_index, ivf_index, queries):
+    recalls = [recall(ivf_index, exact_index, queries, nprobe) for nprobe in (1, 4, NLIST)]
+    assert recalls == sorted(recalls)
+    assert recalls[1] >= 0.9
+    assert recalls[2] == 1.0
+    for query in queries[:5]:
+        assert top_ids(ivf_index, query, exact=True) == top_ids(exact_index, query)
+
+
+def test_untrained_tail_is_always_scanned(ivf_index, queries):
+    tail = ivf_index.with_added(["new"], [queries[0]])
+    assert tail.list_rows == ROWS and len(tail) == ROWS + 1
+    assert not tail.needs_training()
+    assert top_ids(tail, queries[0], nprobe=1)[0] == "new"
+
+
+def test_retrain_once_tail_exceeds_threshold(ivf_index):
+    # The tail may reach VECTOR_IVF_RETRAIN_TAIL of all rows, trained and tail together
+    limit = int(VECTOR_IVF_RETRAIN_TAIL * ROWS / (1 - VECTOR_IVF_RETRAIN_TAIL))
+    rows = clustered_rows(limit + 2, seed=2)
+    assert not ivf_index.with_added([f"extra{i}" for i in range(limit - 1)], rows[:limit - 1]).needs_training()
+    extra = limit + 2
+    grown = ivf_index.with_added([f"extra{i}" for i in range(extra)], rows)
+    assert grown.needs_training()
+    store = MatrixVectorStore(mode="ivf")
+    store._index = grown
+    retrained = store.prepare()
+    assert retrained.list_rows == len(retrained) == ROWS + extra
+    assert not retrained.needs_training()
+
+
+def test_removed_rows_keep_lists_consistent(exact_index, ivf_index, queries):
+    removed = [f"row{i}" for i in range(0, ROWS, 3)]
+    shrunk, expected = ivf_index.without(removed), exact_index.without(removed)
+    assert shrunk.list_rows == len(shrunk) == int(shrunk.offsets[-1])
+    for query in queries[:5]:
+        assert top_ids(shrunk, query, nprobe=NLIST) == top_ids(expected, query)
+
+
+def test_npz_round_trip(tmp_path, ivf_index, queries):
+    store = MatrixVectorStore(mode="ivf", nprobe=4)
+    store._index = ivf_index.with_added(["new"], [queries[0]])
+    store.persist(str(tmp_path / "vector_store.json"))
+    loaded = MatrixVectorStore.from_persist_path(str(tmp_path / "vector_store.json"), mode="ivf", nprobe=4)
+    assert loaded.client.ids == store.client.ids
+    assert loaded.client.list_rows == store.client.list_rows
+    assert np.array_equal(loaded.client.matrix, store.client.matrix)
+    assert np.array_equal(loaded.client.centroids, store.client.centroids)
+    assert np.array_equal(loaded.client.offsets, store.client.offsets)
+    for query in queries[:5]:
+        query = VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=TOP_K)
+        assert loaded.query(query).ids == store.query(query).ids
@@ -0,0 +1,34 @@
+from llama_index.core.callbacks import TokenCountingHandler
+
+from cost_utils import TokenUsage, current_token_usage
+
+
+class ScopedTokenCountingHandler(TokenCountingHandler):
+    """
+    TokenCountingHandler that records into the active `token_usage_scope`, if any.
+
+    Outside a scope it behaves like a regular TokenCountingHandler.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._own_usage = TokenUsage()
+        super().__init__(*args, **kwargs)
+
+    def _usage(self):
+        return current_token_usage() or self._own_usage
+
+    @property
+    def llm_token_counts(self):
+        return self._usage().llm_token_counts
+
+    @llm_token_counts.setter
+    def llm_token_counts(self, value):
+        self._usage().llm_token_counts = value
+
+    @property
+    def embedding_token_counts(self):
+        return self._usage().embedding_token_counts
+
+    @embedding_token_counts.setter
+    def embedding_token_counts(self, value):
+        self._usage().embedding_token_counts = value
@@ -0,0 +1,318 @@
+import math
+import os
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore, VectorStoreQuery, VectorStoreQueryResult
+
+from config import VECTOR_INDEX, VECTOR_IVF_MIN_ROWS, VECTOR_IVF_NLIST, VECTOR_IVF_NPROBE, \
+    VECTOR_IVF_TRAIN_ITERATIONS, VECTOR_IVF_RETRAIN_TAIL
+from metrics import debug_print, span
+
+# Rows scored per matrix product, to bound temporary memory on large indexes
+_CHUNK_ROWS = 65_536
+# k-means training sample size per inverted list
+_TRAIN_ROWS_PER_LIST = 32
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.ascontiguousarray(vectors / np.where(norms > 0, norms, 1.0), dtype=np.float32)
+
+
+def _nearest_centroids(rows, centroids):
+    """
+    @return: The index of the most similar centroid for every row.
+    """
+    return np.concatenate([np.argmax(rows[start:start + _CHUNK_ROWS] @ centroids.T, axis=1)
+                           for start in range(0, len(rows), _CHUNK_ROWS)]) if len(rows) else np.zeros(0, np.int64)
+
+
+def train_centroids(matrix, nlist, iterations=VECTOR_IVF_TRAIN_ITERATIONS, seed=42):
+    """
+    Spherical k-means on a sample of the rows.
+
+    @param matrix: The (n, dim) normalized embeddings.
+    @param nlist: Number of centroids (inverted lists).
+    @param iterations: k-means iterations.
+    @param seed: Random seed for the sample and the initial centroids.
+    @return: An (nlist, dim) array of normalized centroids.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), nlist * _TRAIN_ROWS_PER_LIST)
+    sample = matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest_centroids(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        occupied = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[occupied]
+        # Empty lists keep their previous centroid
+        centroids[occupied] = _normalize(np.add.reduceat(sample[order], starts, axis=0))
+    return centroids
+
+
+class MatrixIndex:
+    """
+    Normalized embeddings in one contiguous float32 matrix, searched by exact dot product or through an
+    optional IVF (inverted file) index.
+
+    Instances are immutable: `with_added` and `without` return new indexes (sharing nothing mutable), so
+    searches running on the old one are never disturbed. With IVF, rows are laid out list by list, so each
+    probed list is a contiguous slice of the matrix; rows added after training form an unassigned tail that
+    is always scanned exactly, until it exceeds VECTOR_IVF_RETRAIN_TAIL of the rows and the lists are retrained.
+    """
+
+    def __init__(self, ids=(), matrix=None, centroids=None, offsets=None, list_rows=0):
+        """
+        @param ids: Row ids, aligned with the matrix rows.
+        @param matrix: (len(ids), dim) normalized float32 embeddings (None for an empty index).
+        @param centroids: Optional (nlist, dim) IVF centroids.
+        @param offsets: IVF list boundaries: list c holds rows offsets[c]:offsets[c + 1].
+        @param list_rows: Number of rows assigned to lists (rows after it form the unassigned tail).
+        """
+        self.ids = list(ids)
+        self.matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        self.centroids = centroids
+        self.offsets = offsets
+        self.list_rows = list_rows
+        self._positions = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def positions(self):
+        """
+        @return: Dictionary of row id to row number, built on first use.
+        """
+        if self._positions is None:
+            self._positions = {row_id: i for i, row_id in enumerate(self.ids)}
+        return self._positions
+
+    def with_added(self, ids, vectors):
+        """
+        @param ids: Ids of the new rows (existing ids are replaced).
+        @param vectors: Their embeddings (normalized here).
+        @return: A new MatrixIndex with the rows appended to the tail.
+        """
+        ids = list(ids)
+        if not ids:
+            return self
+        replaced = [row_id for row_id in ids if row_id in self.positions]
+        base = self.without(replaced) if replaced else self
+        vectors = _normalize(vectors)
+        matrix = vectors if not len(base) else np.concatenate([base.matrix, vectors])
+        return MatrixIndex(base.ids + ids, matrix, base.centroids, base.offsets, base.list_rows)
+
+    def without(self, ids):
+        """
+        @param ids: Ids of the rows to remove (unknown ids are ignored).
+        @return: A new MatrixIndex without those rows.
+        """
+        drop = [self.positions[row_id] for row_id in ids if row_id in self.positions]
+        if not drop:
+            return self
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[drop] = False
+        centroids, offsets, list_rows = self.centroids, self.offsets, self.list_rows
+        if centroids is not None:
+            lists = np.repeat(np.arange(len(centroids)), np.diff(offsets))
+            kept_per_list = np.bincount(lists[keep[:list_rows]], minlength=len(centroids))
+            offsets = np.concatenate(([0], np.cumsum(kept_per_list))).astype(np.int64)
+            list_rows = int(offsets[-1])
+        kept = np.flatnonzero(keep)
+        return MatrixIndex([self.ids[i] for i in kept.tolist()], np.ascontiguousarray(self.matrix[kept]), centroids,
+                           offsets, list_rows)
+
+    def wants_ivf(self, mode=VECTOR_INDEX):
+        """
+        @param mode: "exact", "ivf" or "auto" (IVF from VECTOR_IVF_MIN_ROWS rows on).
+        @return: Whether searches should go through IVF lists.
+        """
+        if mode == "exact" or len(self) < 2:
+            return False
+        return mode == "ivf" or len(self) >= VECTOR_IVF_MIN_ROWS
+
+    def needs_training(self):
+        """
+        @return: Whether the IVF lists are missing or the unassigned tail has grown too large.
+        """
+        return self.centroids is None or len(self) - self.list_rows > VECTOR_IVF_RETRAIN_TAIL * len(self)
+
+    def build_ivf(self, nlist=VECTOR_IVF_NLIST):
+        """
+        Train the IVF centroids and lay the rows out list by list.
+
+        @param nlist: Number of lists (default: sqrt of the row count).
+        @return: A new MatrixIndex with IVF lists and no tail.
+        """
+        nlist = max(1, min(len(self), nlist or int(math.sqrt(len(self)))))
+        with span("vector_ivf_build"):
+            centroids = train_centroids(self.matrix, nlist)
+            assign = _nearest_centroids(self.matrix, centroids)
+            order = np.argsort(assign, kind="stable")
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist)))).astype(np.int64)
+        debug_print(f"🗂️ IVF index: {len(self)} rows in {nlist} lists")
+        return MatrixIndex([self.ids[i] for i in order.tolist()], np.ascontiguousarray(self.matrix[order]),
+                           centroids, offsets, len(self))
+
+    def search(self, query, top_k, nprobe=VECTOR_IVF_NPROBE, exact=False):
+        """
+        @param query: The query embedding.
+        @param top_k: Number of results.
+        @param nprobe: IVF lists scanned per query (higher = better recall, slower); ignored without IVF.
+        @param exact: Scan every row even if IVF lists exist.
+        @return: A tuple (row numbers, cosine similarities), best first.
+        """
+        if not len(self) or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = _normalize(query)
+        if exact or self.centroids is None:
+            rows = None
+            sims = np.concatenate([self.matrix[start:start + _CHUNK_ROWS] @ query
+                                   for start in range(0, len(self), _CHUNK_ROWS)])
+        else:
+            nprobe = min(nprobe, len(self.centroids))
+            probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            slices = [(self.offsets[c], self.offsets[c + 1]) for c in probes.tolist()] + [(self.list_rows, len(self))]
+            slices = [(start, end) for start, end in slices if end > start]
+            rows = np.concatenate([np.arange(start, end) for start, end in slices])
+            sims = np.concatenate([self.matrix[start:end] @ query for start, end in slices])
+        top_k = min(top_k, len(sims))
+        best = np.argpartition(-sims, top_k - 1)[:top_k]
+        best = best[np.argsort(-sims[best], kind="stable")]
+        return (best if rows is None else rows[best]), sims[best]
+
+    def save(self, path):
+        """
+        @param path: Destination .npz file.
+        @return: None
+        """
+        arrays = {"ids": np.array(self.ids, dtype=str), "matrix": self.matrix,
+                  "list_rows": np.array(self.list_rows)}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, offsets=self.offsets)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        @param path: A file written by `save`.
+        @return: The MatrixIndex.
+        """
+        with np.load(path) as data:
+            return cls(data["ids"].tolist(), np.ascontiguousarray(data["matrix"], dtype=np.float32),
+                       data["centroids"] if "centroids" in data else None,
+                       data["offsets"] if "offsets" in data else None, int(data["list_rows"]))
+
+
+class MatrixVectorStore(BasePydanticVectorStore):
+    """
+    llama_index vector store over a MatrixIndex, used by the PropertyGraphIndex for its entity embeddings.
+
+    Replaces the default SimpleVectorStore, which rebuilds a Python list of vectors on every query. The IVF
+    lists are trained lazily (or by `prepare`, before a snapshot is saved) when `mode` asks for them.
+
+    Only embeddings and ids are stored, so metadata filters are not supported: `query` and `delete_nodes`
+    raise ValueError when given any (the property graph retrievers never pass them).
+    """
+
+    stores_text: bool = False
+    mode: str = Field(default=VECTOR_INDEX, description="exact, ivf or auto (IVF from VECTOR_IVF_MIN_ROWS rows).")
+    nprobe: int = Field(default=VECTOR_IVF_NPROBE, description="IVF lists scanned per query.")
+
+    _index: MatrixIndex = PrivateAttr(default_factory=MatrixIndex)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MatrixVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._index
+
+    def clone(self) -> "MatrixVectorStore":
+        """
+        @return: A store sharing this one's (immutable) index, for copy-on-write updates.
+        """
+        store = MatrixVectorStore(mode=self.mode, nprobe=self.nprobe)
+        store._index = self._index
+        return store
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        ids = [node.node_id for node in nodes]
+        with self._lock:
+            self._index = self._index.with_added(ids, [node.get_embedding() for node in nodes])
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        # Entity rows are keyed by their own id and have no source document
+        self.delete_nodes([ref_doc_id])
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters: Any = None, **delete_kwargs: Any) -> None:
+        _reject_filters(filters)
+        with self._lock:
+            self._index = self._index.without(node_ids or [])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = MatrixIndex()
+
+    def prepare(self) -> MatrixIndex:
+        """
+        Train the IVF lists if this store's mode wants them and they are missing or stale.
+
+        @return: The index to search.
+        """
+        index = self._index
+        if index.wants_ivf(self.mode) and index.needs_training():
+            with self._lock:
+                if self._index.wants_ivf(self.mode) and self._index.needs_training():
+                    self._index = self._index.build_ivf()
+                index = self._index
+        return index
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        _reject_filters(query.filters)
+        index = self.prepare()
+        rows, sims = index.search(query.query_embedding, query.similarity_top_k, self.nprobe,
+                                  exact=not index.wants_ivf(self.mode))
+        return VectorStoreQueryResult(ids=[index.ids[row] for row in rows.tolist()], similarities=sims.tolist())
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        # Binary arrays rather than the JSON the default file name suggests
+        self.prepare().save(npz_path(persist_path))
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, **kwargs: Any) -> "MatrixVectorStore":
+        """
+        @param persist_path: The path `persist` was called with.
+        @return: The loaded store.
+        """
+        store = cls(**kwargs)
+        store._index = MatrixIndex.load(npz_path(persist_path))
+        return store
+
+
+def _reject_filters(filters):
+    """
+    @param filters: The metadata filters passed to a MatrixVectorStore operation.
+    @raise ValueError: If there are any (the store keeps no metadata to filter on).
+    """
+    if filters is not None:
+        raise ValueError("MatrixVectorStore stores no metadata: metadata filters are not supported.")
+
+
+def npz_path(persist_path):
+    """
+    @return: The file a MatrixVectorStore persisted to a given path is written to.
+    """
+    return os.path.splitext(persist_path)[0] + ".npz"